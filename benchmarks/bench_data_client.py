@@ -0,0 +1,86 @@
+"""Compare construction cost of supabase.create_client vs the PostgREST-only DataClient.
+
+Each variant runs in a fresh interpreter so import cost and resident memory
+are measured in isolation. No network traffic is made; clients are only built.
+
+    python -m benchmarks.bench_data_client [--n 200]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKER = r"""
+import json, sys, time, resource
+t0 = time.perf_counter()
+variant = sys.argv[1]
+n = int(sys.argv[2])
+url = "https://example.supabase.co"
+key = "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoic2VydmljZV9yb2xlIn0.bench"
+
+def rss_kb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * resource.getpagesize() // 1024
+
+if variant == "create_client":
+    from supabase import create_client
+
+    def build():
+        client = create_client(url, key)
+        client.postgrest  # built lazily on the first .table() call in real use
+        return client
+else:
+    from config.data_client import DataClient
+    build = lambda: DataClient(url, key)
+import_ms = (time.perf_counter() - t0) * 1000
+
+rss_before = rss_kb()
+first_start = time.perf_counter()
+clients = [build()]
+first_ms = (time.perf_counter() - first_start) * 1000
+
+start = time.perf_counter()
+for _ in range(n - 1):
+    clients.append(build())
+per_client_us = (time.perf_counter() - start) / max(n - 1, 1) * 1e6
+rss_after = rss_kb()
+
+print(json.dumps({
+    "variant": variant,
+    "import_ms": round(import_ms, 1),
+    "first_client_ms": round(first_ms, 2),
+    "per_client_us": round(per_client_us, 1),
+    "rss_per_client_kb": round((rss_after - rss_before) / n, 1),
+    "rss_total_mb": round(rss_after / 1024, 1),
+}))
+"""
+
+
+def run(variant: str, n: int) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", WORKER, variant, str(n)],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=200, help="clients to build per variant")
+    args = parser.parse_args()
+
+    results = [run("create_client", args.n), run("data_client", args.n)]
+    cols = ["variant", "import_ms", "first_client_ms", "per_client_us", "rss_per_client_kb", "rss_total_mb"]
+    print(" | ".join(f"{c:>17}" for c in cols))
+    for r in results:
+        print(" | ".join(f"{str(r[c]):>17}" for c in cols))
+
+    base, slim = results
+    print(f"\nper-client construction speedup: {base['per_client_us'] / slim['per_client_us']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Accuracy and latency of the local form-field extractor (core/form_extract.py).
+
+Reads the labelled corpus ({"form_key", "today", "text", "expected"} JSONL)
+and reports, per field, precision (extracted values that are right) and
+recall (expected values that were extracted), the share of messages whose
+fields all came out exactly right, and per-message latency in microseconds.
+
+    python -m benchmarks.bench_form_extract [--samples data/extraction_samples.jsonl] [--errors]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+from datetime import date
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core.form_extract import extract_fields  # noqa: E402
+
+
+def percentile(values, share):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(share * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", default=os.path.join(ROOT, "data", "extraction_samples.jsonl"))
+    parser.add_argument("--repeat", type=int, default=200, help="Timing repetitions per row")
+    parser.add_argument("--errors", action="store_true", help="List the rows with a wrong or missing field")
+    args = parser.parse_args()
+
+    with open(args.samples, "r", encoding="utf-8") as file:
+        samples = [json.loads(line) for line in file if line.strip()]
+
+    extracted_counts, expected_counts, correct_counts = Counter(), Counter(), Counter()
+    latencies_us = []
+    exact = 0
+    errors = []
+    for sample in samples:
+        today = date.fromisoformat(sample["today"])
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            fields = extract_fields(sample["form_key"], sample["text"], today)
+        latencies_us.append((time.perf_counter() - start) / args.repeat * 1e6)
+
+        expected = sample["expected"]
+        extracted_counts.update(fields.keys())
+        expected_counts.update(expected.keys())
+        correct_counts.update(key for key, value in fields.items() if expected.get(key) == value)
+        if fields == expected:
+            exact += 1
+        else:
+            errors.append({"text": sample["text"], "expected": expected, "extracted": fields})
+
+    result = {
+        "rows": len(samples),
+        "exact_match": round(exact / len(samples), 3),
+        "fields": {
+            field: {
+                "expected": expected_counts[field],
+                "extracted": extracted_counts[field],
+                "precision": round(correct_counts[field] / extracted_counts[field], 3) if extracted_counts[field] else None,
+                "recall": round(correct_counts[field] / expected_counts[field], 3) if expected_counts[field] else None,
+            }
+            for field in sorted(set(expected_counts) | set(extracted_counts))
+        },
+        "precision": round(sum(correct_counts.values()) / sum(extracted_counts.values()), 3),
+        "recall": round(sum(correct_counts.values()) / sum(expected_counts.values()), 3),
+        "latency_us": {
+            "p50": round(percentile(latencies_us, 0.5), 1),
+            "p95": round(percentile(latencies_us, 0.95), 1),
+            "max": round(max(latencies_us), 1),
+        },
+    }
+    if args.errors:
+        result["errors"] = errors
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Accuracy, per-intent precision, coverage and latency of the local intent model.
+
+Reads held-out rows ({"text", "intent"} JSONL, written by
+scripts/train_intent_model.py) and reports how the model would have routed
+them: accuracy overall, precision per intent overall and above the serving
+threshold (by default the one calibrated into the model file), the share of
+rows it would serve without the LLM at several thresholds, and per-message
+latency in microseconds.
+
+    python -m benchmarks.bench_intent_model [--role farmer] [--eval data/intent_eval_farmer.jsonl]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core.classifier.intent_model import IntentModel  # noqa: E402
+from core.classifier.intent_rules import read_samples  # noqa: E402
+
+
+def percentile(values, share):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(share * len(ordered)))]
+
+
+def precision_by_intent(pairs):
+    predicted = Counter(prediction for prediction, _ in pairs)
+    correct = Counter(prediction for prediction, label in pairs if prediction == label)
+    return {str(intent): round(correct[intent] / count, 3) for intent, count in sorted(predicted.items())}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--role", default="farmer")
+    parser.add_argument("--model", help="Default: data/intent_model_<role>.json")
+    parser.add_argument("--eval", help="Default: data/intent_eval_<role>.jsonl")
+    parser.add_argument("--threshold", type=float, help="Default: the model's calibrated threshold")
+    parser.add_argument("--repeat", type=int, default=200, help="Timing repetitions per row")
+    args = parser.parse_args()
+
+    model = IntentModel.load(args.model or os.path.join(ROOT, "data", f"intent_model_{args.role}.json"))
+    samples = read_samples(args.eval or os.path.join(ROOT, "data", f"intent_eval_{args.role}.jsonl"))
+
+    latencies_us = []
+    predictions = []
+    for sample in samples:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            intent, confidence = model.predict(sample["text"])
+        latencies_us.append((time.perf_counter() - start) / args.repeat * 1e6)
+        predictions.append((intent, confidence, sample["intent"]))
+
+    def served(threshold):
+        if threshold is None:
+            return []
+        return [(intent, label) for intent, confidence, label in predictions
+                if confidence >= threshold and intent in model.routable]
+
+    threshold = args.threshold if args.threshold is not None else model.threshold
+    confident = served(threshold)
+    result = {
+        "role": model.role,
+        "rows": len(samples),
+        "accuracy": round(sum(intent == label for intent, _, label in predictions) / len(samples), 3),
+        "precision_by_intent": precision_by_intent([(intent, label) for intent, _, label in predictions]),
+        "served": {
+            "threshold": threshold,
+            "calibration": model.calibration,
+            "share": round(len(confident) / len(samples), 3),
+            "precision": round(sum(intent == label for intent, label in confident) / len(confident), 3) if confident else None,
+            "precision_by_intent": precision_by_intent(confident),
+        },
+        "coverage_by_threshold": {
+            str(threshold): round(len(served(threshold)) / len(samples), 3) for threshold in (0.5, 0.7, 0.8, 0.9, 0.95)
+        },
+        "latency_us": {
+            "p50": round(percentile(latencies_us, 0.5), 1),
+            "p95": round(percentile(latencies_us, 0.95), 1),
+            "max": round(max(latencies_us), 1),
+        },
+    }
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
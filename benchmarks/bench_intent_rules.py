@@ -0,0 +1,98 @@
+"""Coverage, agreement and latency of the rule-based intent fast path.
+
+Reads the labelled sample ({"text", "intent"} JSONL) and reports, per rule,
+how often it fires and how often it agrees with the label, plus the share of
+messages that would skip the LLM classifier. The shipped sample is labelled by
+hand against prompts/ask_farmer_intent, so its agreement is optimistic; the
+classifier's own decisions are the reference:
+
+- --logged reads a chat_messages export (JSONL/CSV with `message` and
+  `message_metadata`) and uses the farmer turns the LLM classified
+  (intent_source "llm") as the sample;
+- --llm runs the LLM classifier on the fast-pathed rows and reports agreement
+  with it (needs OPENAI_API_KEY).
+
+    python -m benchmarks.bench_intent_rules [--samples data/intent_samples.jsonl | --logged export.jsonl] [--llm]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from config.config import get_intent_rules_settings  # noqa: E402
+from core.classifier.intent_rules import IntentRules, read_samples  # noqa: E402
+from scripts.train_intent_model import read_rows  # noqa: E402
+
+
+def percentile(values, share):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(share * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rules", default=os.path.join(ROOT, "data", "intent_rules.json"))
+    parser.add_argument("--samples", default=os.path.join(ROOT, "data", "intent_samples.jsonl"))
+    parser.add_argument("--logged", help="chat_messages export; its LLM-classified farmer turns replace --samples")
+    parser.add_argument("--min-precision", type=float, default=0.95)
+    parser.add_argument("--min-support", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=200, help="Timing repetitions per row")
+    parser.add_argument("--llm", action="store_true", help="Also compare fast-pathed rows with the LLM classifier")
+    args = parser.parse_args()
+
+    samples = read_rows(args.logged, "farmer", {"llm"}) if args.logged else read_samples(args.samples)
+    rules = IntentRules.load(args.rules, args.min_precision, args.min_support, get_intent_rules_settings()["intents"])
+    rules.evaluate(samples)
+
+    latencies_us = []
+    fast_rows = []
+    for sample in samples:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            result = rules.match(sample["text"])
+        latencies_us.append((time.perf_counter() - start) / args.repeat * 1e6)
+        if result is not None:
+            fast_rows.append((sample, result))
+
+    labels = Counter(sample["intent"] for sample in samples)
+    fast_by_intent = Counter(sample["intent"] for sample, _ in fast_rows)
+    result = {
+        "reference": "logged LLM decisions" if args.logged else "hand labels",
+        "rows": len(samples),
+        **rules.sample,
+        "latency_us": {
+            "p50": round(percentile(latencies_us, 0.5), 1),
+            "p95": round(percentile(latencies_us, 0.95), 1),
+            "max": round(max(latencies_us), 1),
+        },
+        "recall_by_intent": {
+            str(intent): round(fast_by_intent[intent] / count, 3) for intent, count in sorted(labels.items())
+        },
+        "rules": {
+            rule.id: {"intent": rule.intent, "active": rule.active, "matched": rule.matched, "precision": rule.precision}
+            for rule in rules.rules
+        },
+    }
+
+    if args.llm:
+        from core.helper_core import handle_intent
+
+        agreement = Counter()
+        for sample, fast in fast_rows:
+            llm = handle_intent(sample["text"], "ask_farmer_intent", "classify_intent")
+            agreement[(fast["rule"], llm.get("id") == fast["id"])] += 1
+        result["llm_agreement"] = {
+            rule.id: round(agreement[(rule.id, True)] / (agreement[(rule.id, True)] + agreement[(rule.id, False)]), 3)
+            for rule in rules.rules if agreement[(rule.id, True)] + agreement[(rule.id, False)]
+        }
+
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Accuracy and latency of the on-box language identifier against LLM labels.
+
+Reads labelled rows ({"text", "language"} JSONL; the `language` labels come
+from the LLM detector, see scripts/train_language_model.py --label-with-llm)
+and reports how many rows the identifier would answer locally and how
+accurate those local answers are: at the per-language thresholds calibrated
+into the model file, and at several fixed thresholds. With --llm the LLM
+detector is also timed on the same rows (needs OPENAI_API_KEY).
+
+    python -m benchmarks.bench_language_id [--labels data/language_eval.jsonl] [--llm]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core.language_id import LanguageIdentifier  # noqa: E402
+
+THRESHOLDS = (0.5, 0.7, 0.8, 0.9, 0.95)
+
+
+def percentile(values, share):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(share * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--labels", default=os.path.join(ROOT, "data", "language_eval.jsonl"))
+    parser.add_argument("--model", default=os.path.join(ROOT, "data", "language_model.json"))
+    parser.add_argument("--repeat", type=int, default=200, help="Timing repetitions per row")
+    parser.add_argument("--llm", action="store_true", help="Also time the LLM detector")
+    args = parser.parse_args()
+
+    with open(args.labels, "r", encoding="utf-8") as file:
+        rows = [json.loads(line) for line in file if line.strip()]
+    identifier = LanguageIdentifier.load(args.model)
+
+    predictions = []
+    latencies_us = []
+    for row in rows:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            language, confidence = identifier.identify(row["text"])
+        latencies_us.append((time.perf_counter() - start) / args.repeat * 1e6)
+        predictions.append((language, confidence, row["language"]))
+
+    result = {
+        "rows": len(rows),
+        "accuracy": round(sum(p == label for p, _, label in predictions) / len(rows), 3),
+        "local_latency_us": {
+            "p50": round(percentile(latencies_us, 0.5), 1),
+            "p95": round(percentile(latencies_us, 0.95), 1),
+            "max": round(max(latencies_us), 1),
+        },
+        "thresholds": {},
+    }
+    calibrated = [(p, label) for p, confidence, label in predictions
+                  if identifier.threshold(p) is not None and confidence >= identifier.threshold(p)]
+    result["calibrated"] = {
+        "thresholds": identifier.thresholds,
+        "cross_validation": identifier.calibration,
+        "local_share": round(len(calibrated) / len(rows), 3),
+        "local_accuracy": round(sum(p == label for p, label in calibrated) / len(calibrated), 3) if calibrated else None,
+    }
+    for threshold in THRESHOLDS:
+        confident = [(p, label) for p, confidence, label in predictions if confidence >= threshold]
+        result["thresholds"][str(threshold)] = {
+            "local_share": round(len(confident) / len(rows), 3),
+            "local_accuracy": round(sum(p == label for p, label in confident) / len(confident), 3) if confident else None,
+        }
+
+    if args.llm:
+        from core.llm_common import detect_language_llm
+
+        llm_ms = []
+        agreement = 0
+        for row in rows:
+            start = time.perf_counter()
+            language = detect_language_llm(row["text"])
+            llm_ms.append((time.perf_counter() - start) * 1000)
+            agreement += language == row["language"]
+        result["llm_latency_ms"] = {"p50": round(statistics.median(llm_ms), 1), "p95": round(percentile(llm_ms, 0.95), 1)}
+        result["llm_self_agreement"] = round(agreement / len(rows), 3)
+
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Cold-start import report for the app, checked against benchmarks/import_budget.json.
+
+Runs `python -X importtime -c "import main"` in a fresh interpreter, prints the
+slowest modules by cumulative time and the self time spent per top-level
+package, then fails (exit 1) if the total, a package budget, or a forbidden
+import (a module that must only load lazily on first request) is exceeded.
+
+    python -m benchmarks.import_time [--repeat 3] [--top 25]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_FILE = os.path.join(ROOT, "benchmarks", "import_budget.json")
+
+
+def measure(target: str) -> List[Dict]:
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    if out.returncode != 0:
+        raise RuntimeError(f"import {target} failed:\n{out.stderr[-2000:]}")
+
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append({
+            "module": name.strip(),
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+        })
+    return rows
+
+
+def package_of(module: str, packages) -> str:
+    for pkg in packages:
+        if module == pkg or module.startswith(pkg + "."):
+            return pkg
+    return module.split(".")[0]
+
+
+def check(rows: List[Dict], budget: Dict) -> List[str]:
+    failures = []
+    target = budget.get("target", "main")
+
+    total = next((r["cumulative_ms"] for r in rows if r["module"] == target), 0.0)
+    if total > budget["total_ms"]:
+        failures.append(f"total {total:.0f} ms > budget {budget['total_ms']} ms")
+
+    per_package = defaultdict(float)
+    for r in rows:
+        per_package[package_of(r["module"], budget["packages_ms"])] += r["self_ms"]
+    for pkg, limit in budget["packages_ms"].items():
+        if per_package.get(pkg, 0.0) > limit:
+            failures.append(f"{pkg} {per_package[pkg]:.0f} ms > budget {limit} ms")
+
+    loaded = {r["module"] for r in rows}
+    for module in budget.get("forbidden", []):
+        if module in loaded:
+            failures.append(f"{module} is imported at startup (must be lazy)")
+
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=3, help="runs to take the fastest of")
+    parser.add_argument("--top", type=int, default=25, help="modules to list")
+    parser.add_argument("--budget", default=BUDGET_FILE)
+    args = parser.parse_args()
+
+    with open(args.budget, "r", encoding="utf-8") as file:
+        budget = json.load(file)
+    target = budget.get("target", "main")
+
+    # Keep the fastest run so one noisy sample does not trip the budget
+    runs = [measure(target) for _ in range(max(args.repeat, 1))]
+    rows = min(runs, key=lambda rs: next((r["cumulative_ms"] for r in rs if r["module"] == target), 0.0))
+
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for r in sorted(rows, key=lambda r: r["cumulative_ms"], reverse=True)[:args.top]:
+        print(f"{r['cumulative_ms']:>14.1f} {r['self_ms']:>9.1f}  {r['module']}")
+
+    per_package = defaultdict(float)
+    for r in rows:
+        per_package[package_of(r["module"], budget["packages_ms"])] += r["self_ms"]
+    print(f"\n{'self ms':>9}  package")
+    for pkg, ms in sorted(per_package.items(), key=lambda kv: kv[1], reverse=True)[:args.top]:
+        print(f"{ms:>9.1f}  {pkg}")
+
+    failures = check(rows, budget)
+    if failures:
+        print("\nIMPORT BUDGET EXCEEDED:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print("\nimport budget OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import inspect
+import threading
+from typing import Any, Callable, Dict, Optional
+
+
+def httpx_pool_stats(http_client) -> Dict[str, int]:
+    """Read connection counts from an httpx client's underlying httpcore pool"""
+    pool = getattr(getattr(http_client, "_transport", None), "_pool", None)
+    if pool is None:
+        return {"connections": 0, "idle_connections": 0}
+
+    connections = list(getattr(pool, "connections", []))
+    idle = sum(1 for conn in connections if conn.is_idle())
+    return {"connections": len(connections), "idle_connections": idle}
+
+
+class ClientRegistry:
+    """Holds one instance of each backend client per worker process.
+
+    Clients are registered with a factory and built on first use (or eagerly
+    by `open()` at app startup), then shared by every core class so that
+    requests reuse the same HTTP connection pools.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._closers: Dict[str, Optional[Callable[[Any], None]]] = {}
+        self._probes: Dict[str, Optional[Callable[[Any], Dict[str, int]]]] = {}
+        self._eager: Dict[str, bool] = {}
+        self._clients: Dict[str, Any] = {}
+        self._created: Dict[str, int] = {}
+        self._handouts: Dict[str, int] = {}
+
+    def register(
+        self,
+        name: str,
+        factory: Callable[[], Any],
+        close: Optional[Callable[[Any], None]] = None,
+        probe: Optional[Callable[[Any], Dict[str, int]]] = None,
+        eager: bool = True
+    ):
+        """Register a client factory, with optional close and connection probe hooks.
+
+        Clients registered with `eager=False` are only built on first `get()`.
+        """
+        self._factories[name] = factory
+        self._closers[name] = close
+        self._probes[name] = probe
+        self._eager[name] = eager
+        self._created.setdefault(name, 0)
+        self._handouts.setdefault(name, 0)
+
+    def get(self, name: str) -> Any:
+        client = self._clients.get(name)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(name)
+                if client is None:
+                    client = self._factories[name]()
+                    self._clients[name] = client
+                    self._created[name] += 1
+        self._handouts[name] += 1
+        return client
+
+    def open(self):
+        """Build every eager client up front (called on app startup)"""
+        for name in self._factories:
+            if self._eager[name]:
+                self.get(name)
+
+    def close(self):
+        """Close every live client and release its connections (called on app shutdown)"""
+        for name, result in self._close_all():
+            if inspect.isawaitable(result):
+                # Async clients need an event loop; use aclose() from async code
+                result.close()
+                print(f"Skipped closing async {name} client outside an event loop")
+
+    async def aclose(self):
+        """Async variant of close() that also awaits async client closers"""
+        for name, result in self._close_all():
+            if inspect.isawaitable(result):
+                try:
+                    await result
+                except Exception as e:
+                    print(f"Error closing {name} client: {e}")
+
+    def _close_all(self):
+        with self._lock:
+            clients, self._clients = self._clients, {}
+
+        for name, client in clients.items():
+            closer = self._closers.get(name)
+            if closer is None:
+                continue
+            try:
+                yield name, closer(client)
+            except Exception as e:
+                print(f"Error closing {name} client: {e}")
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Report created/live clients, handouts and pooled connections per backend"""
+        report = {}
+        for name in self._factories:
+            client = self._clients.get(name)
+            entry = {
+                "created": self._created[name],
+                "live": client is not None,
+                "handouts": self._handouts[name],
+            }
+            probe = self._probes.get(name)
+            if client is not None and probe is not None:
+                try:
+                    entry.update(probe(client))
+                except Exception as e:
+                    print(f"Error probing {name} client: {e}")
+            report[name] = entry
+        return report
@@ -1,30 +1,401 @@
-from supabase import create_client, Client
-from google import genai
-from openai import OpenAI
 import os
+from typing import TYPE_CHECKING
 from dotenv import load_dotenv
+from config.client_registry import ClientRegistry, httpx_pool_stats
 load_dotenv()
 
+# supabase, postgrest, openai and google-genai are imported inside the factories
+# below so that importing the app stays cheap on cold start
+if TYPE_CHECKING:
+  from openai import AsyncOpenAI, OpenAI
+  from supabase import Client
+  from config.data_client import AsyncDataClient, DataClient
+  from config.http_pool import AsyncSharedTransport, HttpPoolSettings, SharedTransport
+
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 GEMINI_KEY = os.getenv("GEMINI_API_KEY")
 model = "gemini-2.0-flash"
 gpt_model = "gpt-4.1-mini"
 
-def get_supabase_client() -> Client:
+# Startup warm-up (see core/warmup_core.py)
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+WARMUP_STEPS = os.getenv("WARMUP_STEPS", "prompts,data,llm,reference,language,intent_rules,intent_model,faq")
+# Serve traffic while warming up instead of blocking startup; /ready reports progress
+WARMUP_BACKGROUND = os.getenv("WARMUP_BACKGROUND", "false").lower() == "true"
+
+# Classify intent and detect the user language in one LLM call (see handle_intent_language_async)
+COMBINED_INTENT_LANGUAGE = os.getenv("COMBINED_INTENT_LANGUAGE", "true").lower() == "true"
+
+# On-box language identifier (see core/language_id.py); the LLM detector runs below the threshold.
+# The threshold defaults to the per-language ones calibrated into the model file
+LANGUAGE_ID_ENABLED = os.getenv("LANGUAGE_ID_ENABLED", "true").lower() == "true"
+LANGUAGE_ID_THRESHOLD = float(os.getenv("LANGUAGE_ID_THRESHOLD")) if os.getenv("LANGUAGE_ID_THRESHOLD") else None
+LANGUAGE_MODEL_PATH = os.getenv("LANGUAGE_MODEL_PATH", "data/language_model.json")
+# Language detected earlier in a conversation is reused for this long (see core/language_memo.py)
+LANGUAGE_MEMO_TTL_SECONDS = float(os.getenv("LANGUAGE_MEMO_TTL_SECONDS", "1800"))
+LANGUAGE_MEMO_MAX_ENTRIES = int(os.getenv("LANGUAGE_MEMO_MAX_ENTRIES", "10000"))
+
+# Keyword/regex intent rules tried before the LLM classifier (see core/classifier/intent_rules.py).
+# A rule serves traffic only with this precision on the labelled sample
+INTENT_RULES_ENABLED = os.getenv("INTENT_RULES_ENABLED", "true").lower() == "true"
+INTENT_RULES_PATH = os.getenv("INTENT_RULES_PATH", "data/intent_rules.json")
+INTENT_SAMPLES_PATH = os.getenv("INTENT_SAMPLES_PATH", "data/intent_samples.jsonl")
+INTENT_RULES_MIN_PRECISION = float(os.getenv("INTENT_RULES_MIN_PRECISION", "0.95"))
+INTENT_RULES_MIN_SUPPORT = int(os.getenv("INTENT_RULES_MIN_SUPPORT", "3"))
+# Intents prompts/ask_farmer_intent returns; a rule for any other intent (a chat mode) never serves traffic
+INTENT_RULES_INTENTS = os.getenv("INTENT_RULES_INTENTS", "1,4,5,6")
+
+# Locally trained intent classifier per chat role (scripts/train_intent_model.py); the LLM classifies below the threshold.
+# Off until the models are trained on the chat_messages export: the shipped seed models reach no calibrated threshold.
+# The threshold defaults to the one calibrated into each model file
+INTENT_MODEL_ENABLED = os.getenv("INTENT_MODEL_ENABLED", "false").lower() == "true"
+INTENT_MODEL_PATHS = os.getenv("INTENT_MODEL_PATHS", "farmer=data/intent_model_farmer.json,salesrep=data/intent_model_salesrep.json")
+INTENT_MODEL_THRESHOLD = float(os.getenv("INTENT_MODEL_THRESHOLD")) if os.getenv("INTENT_MODEL_THRESHOLD") else None
+
+# Route follow-ups of a half-filled log form straight to its handler (see core/form_flow.py);
+# a form idle for longer than the TTL is reclassified
+FORM_FLOW_STICKY = os.getenv("FORM_FLOW_STICKY", "true").lower() == "true"
+FORM_FLOW_TTL_MINUTES = float(os.getenv("FORM_FLOW_TTL_MINUTES", "30"))
+
+# Start the general-question handler while the LLM classifies the intent (see core/speculation.py):
+# "off", "context" (history, context and language reads only) or "full" (also the answer call)
+SPECULATIVE_GENERAL_QUESTIONS = os.getenv("SPECULATIVE_GENERAL_QUESTIONS", "off").lower()
+
+# Finalise a log form without the LLM once its schema's required fields (plus the extra ones below)
+# are filled and the latest message is a short answer read by core/form_extract.py
+LOCAL_LOG_COMPLETION = os.getenv("LOCAL_LOG_COMPLETION", "true").lower() == "true"
+LOCAL_LOG_COMPLETION_MAX_WORDS = int(os.getenv("LOCAL_LOG_COMPLETION_MAX_WORDS", "8"))
+LOCAL_LOG_COMPLETION_EXTRA_FIELDS = os.getenv("LOCAL_LOG_COMPLETION_EXTRA_FIELDS", "log_health_incident=affected_count,log_performance_report=mortality_count+average_weight_kg")
+
+# Reload prompts/*.txt|json when their mtime changes (development only; see core/prompt_registry.py)
+PROMPT_RELOAD = os.getenv("PROMPT_RELOAD", "false").lower() == "true"
+
+# Exact-match cache of function-call results (see core/llm_cache.py); only functions with a TTL are cached
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+LLM_CACHE_TTLS = os.getenv("LLM_CACHE_TTLS", "classify_intent=3600,classify_intent_and_language=3600,detect_language=86400")
+LLM_CACHE_DEFAULT_TTL_SECONDS = float(os.getenv("LLM_CACHE_DEFAULT_TTL_SECONDS", "0"))
+
+# LLM gateway (see llm/llm_gateway.py). Per-function values are "function_name=value" lists
+LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "30"))
+LLM_DEADLINES = os.getenv("LLM_DEADLINES", "classify_intent=10,classify_intent_and_language=10,detect_language=6,feed_advisory=45")
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRIES = os.getenv("LLM_RETRIES", "feed_advisory=1")
+LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", "0.5"))
+LLM_RETRY_MAX_SECONDS = float(os.getenv("LLM_RETRY_MAX_SECONDS", "4"))
+# Short calls that get a duplicate request once they run past their p95 latency
+LLM_HEDGE_FUNCTIONS = os.getenv("LLM_HEDGE_FUNCTIONS", "classify_intent,classify_intent_and_language,detect_language")
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+LLM_FALLBACKS_PATH = os.getenv("LLM_FALLBACKS_PATH", "data/llm_fallbacks.json")
+# Second provider (needs GEMINI_API_KEY; "" disables): used when OpenAI errors or runs past its budget
+LLM_FALLBACK_PROVIDER = os.getenv("LLM_FALLBACK_PROVIDER", "gemini")
+LLM_PRIMARY_BUDGET_SECONDS = float(os.getenv("LLM_PRIMARY_BUDGET_SECONDS", "10"))
+LLM_PRIMARY_BUDGETS = os.getenv("LLM_PRIMARY_BUDGETS", "classify_intent=4,classify_intent_and_language=4,detect_language=3,feed_advisory=15")
+
+# Per-call token/cost/latency records (see core/llm_usage.py)
+LLM_USAGE_WINDOW = int(os.getenv("LLM_USAGE_WINDOW", "5000"))
+# Prompts larger than this (tokens) raise a budget alarm; per-function overrides below
+LLM_PROMPT_TOKEN_BUDGET = int(os.getenv("LLM_PROMPT_TOKEN_BUDGET", "6000"))
+LLM_PROMPT_TOKEN_BUDGETS = os.getenv("LLM_PROMPT_TOKEN_BUDGETS", "classify_intent=2000,classify_intent_and_language=3000,detect_language=1500")
+# USD per 1M tokens as "model=input/cached input/output"
+LLM_PRICES = os.getenv("LLM_PRICES", "gpt-4.1-mini=0.40/0.10/1.60,gemini-2.0-flash=0.10/0.025/0.40")
+
+# Near-duplicate answer cache over past general questions (see core/faq_index.py)
+FAQ_CACHE_ENABLED = os.getenv("FAQ_CACHE_ENABLED", "true").lower() == "true"
+FAQ_CACHE_THRESHOLD = float(os.getenv("FAQ_CACHE_THRESHOLD", "0.85"))
+FAQ_CACHE_MIN_WORDS = int(os.getenv("FAQ_CACHE_MIN_WORDS", "4"))
+FAQ_CACHE_REFRESH_SECONDS = float(os.getenv("FAQ_CACHE_REFRESH_SECONDS", "300"))
+# Least recently matched questions are dropped past this many entries
+FAQ_CACHE_MAX_ENTRIES = int(os.getenv("FAQ_CACHE_MAX_ENTRIES", "5000"))
+# log_type values of ask_farmer_general_questions.json; other faq rows are log messages
+FAQ_CACHE_CATEGORIES = os.getenv(
+  "FAQ_CACHE_CATEGORIES",
+  "feeding_program,product_matching,switching_guidance,performance_check,feed_form,mixing_practices,other"
+)
+
+# Shared HTTP connection pool for PostgREST and OpenAI traffic (see config/http_pool.py)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", "30"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() == "true"
+HTTP_CONNECT_TIMEOUT_SECONDS = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "5"))
+HTTP_POOL_TIMEOUT_SECONDS = float(os.getenv("HTTP_POOL_TIMEOUT_SECONDS", "10"))
+SUPABASE_TIMEOUT_SECONDS = float(os.getenv("SUPABASE_TIMEOUT_SECONDS", "30"))
+OPENAI_TIMEOUT_SECONDS = float(os.getenv("OPENAI_TIMEOUT_SECONDS", "60"))
+
+def get_http_pool_settings() -> "HttpPoolSettings":
+  from config.http_pool import HttpPoolSettings
+  return HttpPoolSettings(
+    max_connections=HTTP_MAX_CONNECTIONS,
+    max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_SECONDS,
+    http2=HTTP2_ENABLED,
+    connect_timeout=HTTP_CONNECT_TIMEOUT_SECONDS,
+    pool_timeout=HTTP_POOL_TIMEOUT_SECONDS,
+    supabase_timeout=SUPABASE_TIMEOUT_SECONDS,
+    openai_timeout=OPENAI_TIMEOUT_SECONDS,
+  )
+
+def create_http_transport() -> "SharedTransport":
+  from config.http_pool import SharedTransport
+  return SharedTransport(get_http_pool_settings())
+
+def create_async_http_transport() -> "AsyncSharedTransport":
+  from config.http_pool import AsyncSharedTransport
+  return AsyncSharedTransport(get_http_pool_settings())
+
+def create_supabase_client() -> "Client":
+  from supabase import create_client
   return create_client(SUPABASE_URL, SUPABASE_KEY)
 
-def get_gemini_client():
-  return genai.Client(api_key=GEMINI_KEY)
+def create_data_client() -> "DataClient":
+  from config.data_client import DataClient
+  from config.http_pool import create_http_client
+  from core.request_scope import count_data_query
+  transport = get_http_transport()
+  # Data queries are counted against the current request (see core/request_scope.py)
+  http_client = create_http_client(
+    transport, transport.settings.supabase_timeout, event_hooks={"request": [count_data_query]})
+  return DataClient(SUPABASE_URL, SUPABASE_KEY, http_client=http_client)
 
-def get_llm_model():
-  return model
+def create_async_data_client() -> "AsyncDataClient":
+  from config.data_client import AsyncDataClient
+  from config.http_pool import create_async_http_client
+  from core.request_scope import count_data_query_async
+  transport = get_async_http_transport()
+  http_client = create_async_http_client(
+    transport, transport.settings.supabase_timeout, event_hooks={"request": [count_data_query_async]})
+  return AsyncDataClient(SUPABASE_URL, SUPABASE_KEY, http_client)
 
-def get_gpt_client():
+def create_gpt_client() -> "OpenAI":
+  from openai import OpenAI
+  from config.http_pool import create_http_client
+  transport = get_http_transport()
   return OpenAI(
     api_key=os.getenv("OPENAI_API_KEY"),
-    organization=os.getenv("OPENAI_ORG_ID")
+    organization=os.getenv("OPENAI_ORG_ID"),
+    http_client=create_http_client(transport, transport.settings.openai_timeout)
   )
 
+def create_async_gpt_client() -> "AsyncOpenAI":
+  from openai import AsyncOpenAI
+  from config.http_pool import create_async_http_client
+  transport = get_async_http_transport()
+  return AsyncOpenAI(
+    api_key=os.getenv("OPENAI_API_KEY"),
+    organization=os.getenv("OPENAI_ORG_ID"),
+    http_client=create_async_http_client(transport, transport.settings.openai_timeout)
+  )
+
+def create_gemini_client():
+  from google import genai
+  return genai.Client(api_key=GEMINI_KEY)
+
+def _close_supabase_client(client: "Client"):
+  # Only the postgrest sub-client opens connections for our usage
+  if client._postgrest is not None:
+    client._postgrest.aclose()
+
+def _probe_supabase_client(client: "Client"):
+  if client._postgrest is None:
+    return {"connections": 0, "idle_connections": 0}
+  return httpx_pool_stats(client._postgrest.session)
+
+client_registry = ClientRegistry()
+# One connection pool for every backend; its stats cover data and LLM traffic
+client_registry.register(
+  "http",
+  create_http_transport,
+  close=lambda transport: transport.shutdown(),
+  probe=lambda transport: transport.stats()
+)
+client_registry.register(
+  "data",
+  create_data_client,
+  close=lambda client: client.close()
+)
+# Full supabase client (auth/storage/realtime) is only built if something asks for it
+client_registry.register(
+  "supabase",
+  create_supabase_client,
+  close=_close_supabase_client,
+  probe=_probe_supabase_client,
+  eager=False
+)
+# LLM clients are built on the first call that needs them
+client_registry.register(
+  "openai",
+  create_gpt_client,
+  close=lambda client: client.close(),
+  eager=False
+)
+# Async counterparts used by the async chat pipeline; they need aclose() on shutdown
+client_registry.register(
+  "async_http",
+  create_async_http_transport,
+  close=lambda transport: transport.shutdown(),
+  probe=lambda transport: transport.stats()
+)
+client_registry.register(
+  "async_data",
+  create_async_data_client,
+  close=lambda client: client.close()
+)
+client_registry.register(
+  "async_openai",
+  create_async_gpt_client,
+  close=lambda client: client.close(),
+  eager=False
+)
+client_registry.register(
+  "gemini",
+  create_gemini_client,
+  eager=False
+)
+
+def get_client_registry() -> ClientRegistry:
+  return client_registry
+
+def get_http_transport() -> "SharedTransport":
+  return client_registry.get("http")
+
+def get_async_http_transport() -> "AsyncSharedTransport":
+  return client_registry.get("async_http")
+
+def get_supabase_client() -> "Client":
+  # Shared per-worker client, see ClientRegistry
+  return client_registry.get("supabase")
+
+def get_data_client() -> "DataClient":
+  # Shared per-worker PostgREST-only client used by the core classes
+  return client_registry.get("data")
+
+def get_async_data_client() -> "AsyncDataClient":
+  return client_registry.get("async_data")
+
+def get_gemini_client():
+  return client_registry.get("gemini")
+
+def get_llm_model():
+  return model
+
+def get_gpt_client() -> "OpenAI":
+  return client_registry.get("openai")
+
+def get_async_gpt_client() -> "AsyncOpenAI":
+  return client_registry.get("async_openai")
+
 def get_gpt_model():
-  return gpt_model
\ No newline at end of file
+  return gpt_model
+
+def get_combined_intent_language():
+  return COMBINED_INTENT_LANGUAGE
+
+def get_language_id_settings():
+  return {"enabled": LANGUAGE_ID_ENABLED, "threshold": LANGUAGE_ID_THRESHOLD, "model_path": LANGUAGE_MODEL_PATH}
+
+def get_intent_rules_settings():
+  return {
+    "enabled": INTENT_RULES_ENABLED,
+    "path": INTENT_RULES_PATH,
+    "samples_path": INTENT_SAMPLES_PATH,
+    "min_precision": INTENT_RULES_MIN_PRECISION,
+    "min_support": INTENT_RULES_MIN_SUPPORT,
+    "intents": [int(intent) for intent in INTENT_RULES_INTENTS.split(",") if intent.strip()],
+  }
+
+def get_intent_model_settings():
+  return {
+    "enabled": INTENT_MODEL_ENABLED,
+    "paths": _function_values(INTENT_MODEL_PATHS, str),
+    "threshold": INTENT_MODEL_THRESHOLD,
+  }
+
+def get_form_flow_settings():
+  return {"enabled": FORM_FLOW_STICKY, "ttl_minutes": FORM_FLOW_TTL_MINUTES}
+
+def get_speculation_mode():
+  return SPECULATIVE_GENERAL_QUESTIONS if SPECULATIVE_GENERAL_QUESTIONS in ("context", "full") else "off"
+
+def get_local_completion_settings():
+  return {
+    "enabled": LOCAL_LOG_COMPLETION,
+    "max_words": LOCAL_LOG_COMPLETION_MAX_WORDS,
+    "extra_fields": _function_values(LOCAL_LOG_COMPLETION_EXTRA_FIELDS, lambda fields: fields.strip().split("+")),
+  }
+
+def get_language_memo_settings():
+  return {"ttl_seconds": LANGUAGE_MEMO_TTL_SECONDS, "max_entries": LANGUAGE_MEMO_MAX_ENTRIES}
+
+def get_prompt_reload():
+  return PROMPT_RELOAD
+
+def _function_values(value: str, cast=float):
+  """Parse "name=value,name=value" into {name: cast(value)}"""
+  values = {}
+  for item in value.split(","):
+    name, _, raw = item.partition("=")
+    if name.strip() and raw.strip():
+      values[name.strip()] = cast(raw)
+  return values
+
+def get_llm_cache_settings():
+  return {
+    "enabled": LLM_CACHE_ENABLED,
+    "max_entries": LLM_CACHE_MAX_ENTRIES,
+    "ttls": _function_values(LLM_CACHE_TTLS),
+    "default_ttl": LLM_CACHE_DEFAULT_TTL_SECONDS,
+  }
+
+def get_llm_gateway_settings():
+  return {
+    "deadline_seconds": LLM_DEADLINE_SECONDS,
+    "deadlines": _function_values(LLM_DEADLINES),
+    "max_retries": LLM_MAX_RETRIES,
+    "retries": _function_values(LLM_RETRIES, int),
+    "retry_base_seconds": LLM_RETRY_BASE_SECONDS,
+    "retry_max_seconds": LLM_RETRY_MAX_SECONDS,
+    "hedge_functions": [name.strip() for name in LLM_HEDGE_FUNCTIONS.split(",") if name.strip()],
+    "hedge_min_samples": LLM_HEDGE_MIN_SAMPLES,
+    "breaker_failures": LLM_BREAKER_FAILURES,
+    "breaker_reset_seconds": LLM_BREAKER_RESET_SECONDS,
+    "fallbacks_path": LLM_FALLBACKS_PATH,
+    "fallback_provider": LLM_FALLBACK_PROVIDER if GEMINI_KEY or LLM_FALLBACK_PROVIDER != "gemini" else "",
+    "primary_budget_seconds": LLM_PRIMARY_BUDGET_SECONDS,
+    "primary_budgets": _function_values(LLM_PRIMARY_BUDGETS),
+  }
+
+def _model_prices(value: str):
+  """Parse "model=input/cached/output,..." into {model: (input, cached, output)}"""
+  prices = {}
+  for item in value.split(","):
+    model, _, raw = item.partition("=")
+    parts = [part.strip() for part in raw.split("/")]
+    if model.strip() and len(parts) == 3:
+      prices[model.strip()] = tuple(float(part) for part in parts)
+  return prices
+
+def get_llm_usage_settings():
+  return {
+    "window": LLM_USAGE_WINDOW,
+    "prompt_token_budget": LLM_PROMPT_TOKEN_BUDGET,
+    "prompt_token_budgets": _function_values(LLM_PROMPT_TOKEN_BUDGETS, int),
+    "prices": _model_prices(LLM_PRICES),
+  }
+
+def get_faq_cache_settings():
+  return {
+    "enabled": FAQ_CACHE_ENABLED,
+    "threshold": FAQ_CACHE_THRESHOLD,
+    "min_words": FAQ_CACHE_MIN_WORDS,
+    "refresh_seconds": FAQ_CACHE_REFRESH_SECONDS,
+    "max_entries": FAQ_CACHE_MAX_ENTRIES,
+    "categories": [category.strip() for category in FAQ_CACHE_CATEGORIES.split(",") if category.strip()],
+  }
+
+def get_warmup_settings():
+  steps = [step.strip() for step in WARMUP_STEPS.split(",") if step.strip()]
+  return {"enabled": WARMUP_ENABLED, "steps": steps, "background": WARMUP_BACKGROUND}
@@ -0,0 +1,90 @@
+from typing import Any, Dict, Optional
+
+import httpx
+from postgrest import DEFAULT_POSTGREST_CLIENT_HEADERS, SyncPostgrestClient
+from postgrest.constants import DEFAULT_POSTGREST_CLIENT_TIMEOUT
+
+from config.http_pool import get_ssl_context
+
+
+class DataClient:
+    """PostgREST-only data client.
+
+    Exposes the `.table()` / `.from_()` / `.rpc()` surface the core classes use,
+    without the auth, storage, realtime and functions sub-clients that
+    `supabase.create_client` builds on every construction.
+    """
+
+    def __init__(self, supabase_url: str, supabase_key: str, schema: str = "public", http_client=None):
+        self.rest_url = f"{supabase_url}/rest/v1"
+        headers = {
+            **DEFAULT_POSTGREST_CLIENT_HEADERS,
+            "apiKey": supabase_key,
+            "Authorization": f"Bearer {supabase_key}",
+        }
+        if http_client is None:
+            http_client = httpx.Client(
+                verify=get_ssl_context(),
+                timeout=DEFAULT_POSTGREST_CLIENT_TIMEOUT,
+                follow_redirects=True,
+                http2=True
+            )
+        self.postgrest = SyncPostgrestClient(
+            self.rest_url,
+            schema=schema,
+            headers=headers,
+            http_client=http_client
+        )
+
+    @property
+    def session(self):
+        """Underlying httpx client (for pool stats and shutdown)"""
+        return self.postgrest.session
+
+    def table(self, table_name: str):
+        return self.postgrest.from_(table_name)
+
+    def from_(self, table_name: str):
+        return self.postgrest.from_(table_name)
+
+    def rpc(self, fn: str, params: Optional[Dict[Any, Any]] = None, count=None, head: bool = False, get: bool = False):
+        return self.postgrest.rpc(fn, params or {}, count, head, get)
+
+    def close(self):
+        self.postgrest.aclose()
+
+
+class AsyncDataClient:
+    """Async PostgREST-only data client; queries are awaited with `await ....execute()`"""
+
+    def __init__(self, supabase_url: str, supabase_key: str, http_client: httpx.AsyncClient, schema: str = "public"):
+        from postgrest import AsyncPostgrestClient
+
+        self.rest_url = f"{supabase_url}/rest/v1"
+        headers = {
+            **DEFAULT_POSTGREST_CLIENT_HEADERS,
+            "apiKey": supabase_key,
+            "Authorization": f"Bearer {supabase_key}",
+        }
+        self.postgrest = AsyncPostgrestClient(
+            self.rest_url,
+            schema=schema,
+            headers=headers,
+            http_client=http_client
+        )
+
+    @property
+    def session(self):
+        return self.postgrest.session
+
+    def table(self, table_name: str):
+        return self.postgrest.from_(table_name)
+
+    def from_(self, table_name: str):
+        return self.postgrest.from_(table_name)
+
+    def rpc(self, fn: str, params: Optional[Dict[Any, Any]] = None, count=None, head: bool = False, get: bool = False):
+        return self.postgrest.rpc(fn, params or {}, count, head, get)
+
+    async def close(self):
+        await self.postgrest.aclose()
@@ -0,0 +1,184 @@
+import ssl
+import threading
+import weakref
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import httpx
+
+_ssl_context: Optional[ssl.SSLContext] = None
+_ssl_lock = threading.Lock()
+
+
+def get_ssl_context() -> ssl.SSLContext:
+    """Process-wide SSL context; loading the CA bundle dominates httpx client construction"""
+    global _ssl_context
+    if _ssl_context is None:
+        with _ssl_lock:
+            if _ssl_context is None:
+                _ssl_context = httpx.create_ssl_context()
+    return _ssl_context
+
+
+@dataclass
+class HttpPoolSettings:
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    http2: bool = True
+    connect_timeout: float = 5.0
+    pool_timeout: float = 10.0
+    supabase_timeout: float = 30.0
+    openai_timeout: float = 60.0
+
+    def timeout_for(self, read_timeout: float) -> httpx.Timeout:
+        return httpx.Timeout(read_timeout, connect=self.connect_timeout, pool=self.pool_timeout)
+
+
+def _limits(settings: HttpPoolSettings) -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.max_connections,
+        max_keepalive_connections=settings.max_keepalive_connections,
+        keepalive_expiry=settings.keepalive_expiry,
+    )
+
+
+class _PoolMetrics:
+    """Request/connection counters shared by the sync and async transports"""
+
+    def _init_metrics(self, settings: HttpPoolSettings):
+        self.settings = settings
+        self._lock = threading.Lock()
+        self._seen_connections = weakref.WeakSet()
+        self.requests = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.connections_opened = 0
+        self.pool_timeouts = 0
+
+    @property
+    def _pool(self):
+        return self._transport._pool
+
+    def _request_started(self):
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def _request_timed_out(self):
+        with self._lock:
+            self.pool_timeouts += 1
+
+    def _request_finished(self):
+        with self._lock:
+            self.in_flight -= 1
+            for conn in list(self._pool.connections):
+                if conn not in self._seen_connections:
+                    self._seen_connections.add(conn)
+                    self.connections_opened += 1
+
+    def stats(self) -> Dict[str, float]:
+        connections = list(self._pool.connections)
+        idle = sum(1 for conn in connections if conn.is_idle())
+        queued = sum(1 for req in list(self._pool._requests) if req.is_queued())
+        active = len(connections) - idle
+        return {
+            "requests": self.requests,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "connections": len(connections),
+            "active_connections": active,
+            "idle_connections": idle,
+            "queued_requests": queued,
+            "connections_opened": self.connections_opened,
+            "reuse_ratio": round(1 - self.connections_opened / self.requests, 3) if self.requests else None,
+            "pool_timeouts": self.pool_timeouts,
+            "max_connections": self.settings.max_connections,
+            "saturation": round(active / self.settings.max_connections, 3),
+            "http2": self.settings.http2,
+        }
+
+
+class SharedTransport(_PoolMetrics, httpx.BaseTransport):
+    """One keep-alive connection pool shared by every backend client.
+
+    Wraps httpx's HTTPTransport to count requests, in-flight requests, newly
+    opened connections and pool timeouts, so saturation and connection reuse
+    can be read from `stats()`. Closing an individual httpx.Client does not
+    close the pool; `shutdown()` does, once, at app shutdown.
+    """
+
+    def __init__(self, settings: HttpPoolSettings):
+        self._init_metrics(settings)
+        self._transport = httpx.HTTPTransport(
+            verify=get_ssl_context(),
+            http2=settings.http2,
+            limits=_limits(settings),
+        )
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        self._request_started()
+        try:
+            return self._transport.handle_request(request)
+        except httpx.PoolTimeout:
+            self._request_timed_out()
+            raise
+        finally:
+            self._request_finished()
+
+    def close(self):
+        # Shared by several httpx.Clients; see shutdown()
+        pass
+
+    def shutdown(self):
+        self._transport.close()
+
+
+class AsyncSharedTransport(_PoolMetrics, httpx.AsyncBaseTransport):
+    """Async counterpart of SharedTransport, used by the async chat pipeline"""
+
+    def __init__(self, settings: HttpPoolSettings):
+        self._init_metrics(settings)
+        self._transport = httpx.AsyncHTTPTransport(
+            verify=get_ssl_context(),
+            http2=settings.http2,
+            limits=_limits(settings),
+        )
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self._request_started()
+        try:
+            return await self._transport.handle_async_request(request)
+        except httpx.PoolTimeout:
+            self._request_timed_out()
+            raise
+        finally:
+            self._request_finished()
+
+    async def aclose(self):
+        # Shared by several httpx.AsyncClients; see shutdown()
+        pass
+
+    async def shutdown(self):
+        await self._transport.aclose()
+
+
+def create_http_client(transport: SharedTransport, read_timeout: float, event_hooks=None) -> httpx.Client:
+    """httpx.Client for one backend, with its own timeout, on the shared pool"""
+    return httpx.Client(
+        transport=transport,
+        timeout=transport.settings.timeout_for(read_timeout),
+        follow_redirects=True,
+        event_hooks=event_hooks,
+    )
+
+
+def create_async_http_client(transport: AsyncSharedTransport, read_timeout: float, event_hooks=None) -> httpx.AsyncClient:
+    """httpx.AsyncClient for one backend, with its own timeout, on the shared async pool"""
+    return httpx.AsyncClient(
+        transport=transport,
+        timeout=transport.settings.timeout_for(read_timeout),
+        follow_redirects=True,
+        event_hooks=event_hooks,
+    )
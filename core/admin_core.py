@@ -1,6 +1,6 @@
 from datetime import date, datetime
 from typing import List, Optional, Dict
-from config.config import get_supabase_client
+from config.config import get_data_client
 from collections import defaultdict
 import json
 import random
@@ -9,8 +9,8 @@ from exceptions.global_exception import GlobalException
 
 
 class Admin:
-    def __init__(self):
-        self.client = get_supabase_client()
+    def __init__(self, client=None):
+        self.client = client or get_data_client()
 
 
     def get_sales_data(self, company_id: int) -> List[Dict[str, object]]:
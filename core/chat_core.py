@@ -1,9 +1,25 @@
 from typing import List, Optional, Dict
-from config.config import get_supabase_client
+from config.config import get_async_data_client, get_data_client
 from datetime import datetime, timezone
+
+from core.request_scope import forget, load, load_async
+
+
+def format_recent_messages(raw_messages: List[Dict]) -> List[Dict]:
+    """Turn chat_messages rows into OpenAI chat messages"""
+    return [
+        {
+            "role": "assistant" if msg["role"] == "model" else "user",
+            "content": f"Previous message: " +  msg["message"]
+        }
+        for msg in raw_messages
+        if msg["role"] in ("user", "model") and msg["message"]
+    ]
+
+
 class Chat:
-    def __init__(self):
-        self.client = get_supabase_client()
+    def __init__(self, client=None):
+        self.client = client or get_data_client()
 
     def create_conversation(self, user_id: int) -> int:        
 
@@ -32,6 +48,7 @@ class Chat:
             "form_data": form_data,
             "last_message_at": "now()",
         }).eq("id", conversation_id).execute()
+        forget("conversation", conversation_id)
 
     def add_message(self, conversation_id: int, role: str, message: str, metadata: Optional[Dict] = None) -> Dict:
 
@@ -72,23 +89,89 @@ class Chat:
 
         raw_messages = response.data or []
 
-        formatted_messages = [
-            {
-                "role": "assistant" if msg["role"] == "model" else "user",
-                "content": f"Previous message: " +  msg["message"]
-            }
-            for msg in raw_messages
-            if msg["role"] in ("user", "model") and msg["message"]
-        ]
-
-        return formatted_messages
+        return format_recent_messages(raw_messages)
 
     
     def get_conversations_record(self, convo_id: int):
+        # Read once per request: the form flow check and the log handler share it
+        return load("conversation", convo_id, lambda: self._fetch_conversations_record(convo_id))
+
+    def _fetch_conversations_record(self, convo_id: int):
         convo = self.client.table("chat_conversations").select(
             "*").eq("id", convo_id).single().execute()
         print("Convo:", convo.data)
         if convo.data:
             return convo.data
         return None
-    
\ No newline at end of file
+
+
+class AsyncChat:
+    """Async counterpart of Chat for the async chat pipeline"""
+
+    def __init__(self, client=None):
+        self.client = client or get_async_data_client()
+
+    async def create_conversation(self, user_id: int) -> int:
+        existing = await (
+            self.client.table("chat_conversations")
+            .select("id")
+            .eq("user_profile_id", user_id)
+            .limit(1)
+            .execute()
+        )
+
+        if existing.data and len(existing.data) > 0:
+            return existing.data[0]["id"]
+
+        response = await (
+            self.client.table("chat_conversations")
+            .insert({"user_profile_id": user_id})
+            .execute()
+        )
+
+        return response.data[0]["id"] if response.data else None
+
+    async def update_conversation(self, conversation_id: int, form_data):
+        await self.client.table("chat_conversations").update({
+            "form_data": form_data,
+            "last_message_at": "now()",
+        }).eq("id", conversation_id).execute()
+        forget("conversation", conversation_id)
+
+    async def add_message(self, conversation_id: int, role: str, message: str, metadata: Optional[Dict] = None) -> Dict:
+        message_data = {
+            "conversation_id": conversation_id,
+            "role": role,
+            "message": message,
+            "message_metadata": metadata or {},
+        }
+
+        insert_resp = await self.client.table(
+            "chat_messages").insert(message_data).execute()
+
+        return insert_resp.data[0] if insert_resp.data else None
+
+    async def get_recent_messages(self, conversation_id: int, max_messages=None) -> List[Dict]:
+        start_of_day = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+
+        response = await (
+            self.client
+            .table("chat_messages")
+            .select("role, message, created_at")
+            .eq("conversation_id", conversation_id)
+            .gte("created_at", start_of_day.isoformat())
+            .order("created_at", desc=False)
+            .execute()
+        )
+
+        return format_recent_messages(response.data or [])
+
+    async def get_conversations_record(self, convo_id: int):
+        return await load_async("conversation", convo_id, lambda: self._fetch_conversations_record(convo_id))
+
+    async def _fetch_conversations_record(self, convo_id: int):
+        convo = await self.client.table("chat_conversations").select(
+            "*").eq("id", convo_id).single().execute()
+        if convo.data:
+            return convo.data
+        return None
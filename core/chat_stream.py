@@ -0,0 +1,69 @@
+import asyncio
+import json
+import time
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastapi.responses import StreamingResponse
+
+from core.step_executor import step_metrics
+
+# Set for the duration of a streamed chat turn; the handler's main LLM call
+# pushes the reply text here as it is generated (see call_openai_async)
+response_stream: ContextVar[Optional[asyncio.Queue]] = ContextVar("response_stream", default=None)
+
+
+def sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+def stream_chat(pipeline: str, run: Callable[[], Awaitable[Dict]]) -> StreamingResponse:
+    """Run a chat turn and send it as Server-Sent Events.
+
+    `delta` events carry pieces of the reply text while the model is still
+    writing it; a closing `done` event carries the same payload the
+    non-streaming endpoint returns. Time to the first event is recorded
+    under `pipeline` in the step metrics.
+    """
+
+    async def events():
+        start = time.perf_counter()
+        first_event_ms = None
+        queue: asyncio.Queue = asyncio.Queue()
+
+        token = response_stream.set(queue)
+        try:
+            turn = asyncio.create_task(run())
+        finally:
+            response_stream.reset(token)
+
+        def elapsed_ms():
+            return round((time.perf_counter() - start) * 1000, 1)
+
+        try:
+            while True:
+                next_delta = asyncio.ensure_future(queue.get())
+                await asyncio.wait({next_delta, turn}, return_when=asyncio.FIRST_COMPLETED)
+                if not next_delta.done():
+                    next_delta.cancel()
+                    break
+                first_event_ms = first_event_ms or elapsed_ms()
+                yield sse_event("delta", {"text": next_delta.result()})
+
+            while not queue.empty():
+                yield sse_event("delta", {"text": queue.get_nowait()})
+
+            first_event_ms = first_event_ms or elapsed_ms()
+            yield sse_event("done", turn.result())
+        finally:
+            # Client went away mid-turn
+            if not turn.done():
+                turn.cancel()
+            if first_event_ms is not None:
+                step_metrics.record(pipeline, {"first_event": {"duration_ms": first_event_ms}}, elapsed_ms())
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,150 @@
+import json
+import math
+import threading
+from collections import Counter
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.config import get_intent_model_settings
+from core.language_id import char_ngrams, normalize
+
+# How the current chat turn's intent was decided; written into the user message's metadata
+# so that logged conversations can be exported as training data (scripts/train_intent_model.py)
+intent_decision: ContextVar[Optional[Dict[str, Any]]] = ContextVar("intent_decision", default=None)
+
+
+def record_intent(role: str, intent_id: int, source: str, confidence: Optional[float] = None):
+    """source: "client" (chat mode picked in the app), "flow" (form in progress), "rule", "model" or "llm" """
+    intent_decision.set({
+        "intent_id": intent_id,
+        "intent_source": source,
+        "intent_role": role,
+        "intent_confidence": confidence,
+    })
+
+
+def intent_metadata() -> Dict[str, Any]:
+    return dict(intent_decision.get() or {})
+
+
+def features(text: str, char_orders=(2, 3, 4), word_orders=(1, 2)) -> Counter:
+    """Character n-grams within words plus word n-grams, as "c:"/"w:" prefixed features"""
+    grams = Counter({f"c:{gram}": count for gram, count in char_ngrams(text, char_orders).items()})
+    words = normalize(text).split(" ")
+    for n in word_orders:
+        for i in range(len(words) - n + 1):
+            grams["w:" + " ".join(words[i:i + n])] += 1
+    return grams
+
+
+def scaled(grams: Counter) -> Dict[str, float]:
+    """Log-scaled counts with unit L2 norm, so short and long messages score alike"""
+    values = {gram: 1.0 + math.log(count) for gram, count in grams.items()}
+    norm = math.sqrt(sum(value * value for value in values.values())) or 1.0
+    return {gram: value / norm for gram, value in values.items()}
+
+
+class IntentModel:
+    """Multinomial logistic regression over char/word n-grams.
+
+    The model file is produced offline by scripts/train_intent_model.py from
+    chat messages whose intent the LLM decided. Only `routable` intents are
+    served from it: intents whose handlers need nothing else from the
+    classifier (a reply, a guide or a help request) to run. `threshold` is
+    calibrated by cross-validation at training time; None means no
+    confidence reached the target precision and the model serves nothing.
+    """
+
+    def __init__(self, model: Dict[str, Any]):
+        self.role: str = model["role"]
+        self.intents: List[int] = model["intents"]
+        self.routable = set(model["routable"])
+        self.char_orders = tuple(model["char_orders"])
+        self.word_orders = tuple(model["word_orders"])
+        self.bias: List[float] = model["bias"]
+        self.weights: Dict[str, List[float]] = model["weights"]
+        self.threshold: Optional[float] = model.get("threshold")
+        self.calibration: Dict[str, Any] = model.get("calibration") or {}
+
+    @classmethod
+    def load(cls, path: str) -> "IntentModel":
+        with open(path, "r", encoding="utf-8") as file:
+            return cls(json.load(file))
+
+    def probabilities(self, text: str) -> List[float]:
+        scores = list(self.bias)
+        for gram, value in scaled(features(text, self.char_orders, self.word_orders)).items():
+            weights = self.weights.get(gram)
+            if weights is not None:
+                for i, weight in enumerate(weights):
+                    scores[i] += weight * value
+        top = max(scores)
+        exps = [math.exp(score - top) for score in scores]
+        total = sum(exps)
+        return [value / total for value in exps]
+
+    def predict(self, text: str) -> Tuple[int, float]:
+        probabilities = self.probabilities(text)
+        best = max(range(len(probabilities)), key=probabilities.__getitem__)
+        return self.intents[best], round(probabilities[best], 4)
+
+
+class IntentModelStats:
+    """How often each role's model was confident enough to skip the LLM classifier"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts: Dict[str, Counter] = {}
+
+    def record(self, role: str, outcome: str):
+        with self._lock:
+            self.counts.setdefault(role, Counter())[outcome] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            result = {}
+            for role, counts in self.counts.items():
+                total = sum(counts.values())
+                result[role] = {**counts, "local_ratio": round(counts["local"] / total, 3) if total else None}
+            return result
+
+
+intent_model_stats = IntentModelStats()
+
+_models: Dict[str, Optional[IntentModel]] = {}
+_models_lock = threading.Lock()
+
+
+def get_intent_model(role: str) -> Optional[IntentModel]:
+    """Process-wide model of a role ("farmer", "salesrep"), loaded once; None if disabled or missing"""
+    settings = get_intent_model_settings()
+    if not settings["enabled"] or role not in settings["paths"]:
+        return None
+    if role not in _models:
+        with _models_lock:
+            if role not in _models:
+                try:
+                    _models[role] = IntentModel.load(settings["paths"][role])
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"Intent model for {role} not loaded, using the LLM classifier only: {e}")
+                    _models[role] = None
+    return _models[role]
+
+
+def predict_intent(role: str, prompt: str) -> Optional[Dict[str, Any]]:
+    """Intent result in the classify_intent shape when the model is confident, else None"""
+    model = get_intent_model(role)
+    if model is None:
+        return None
+    threshold = get_intent_model_settings()["threshold"]
+    if threshold is None:
+        threshold = model.threshold
+    if threshold is None:
+        intent_model_stats.record(role, "uncalibrated")
+        return None
+    intent, confidence = model.predict(prompt)
+    if confidence < threshold or intent not in model.routable:
+        intent_model_stats.record(role, "llm_fallback")
+        return None
+    intent_model_stats.record(role, "local")
+    return {"id": intent, "confidence": confidence, "response": "", "download_guide": None, "help_request": None}
@@ -0,0 +1,177 @@
+import json
+import re
+import threading
+from typing import Any, Dict, List, Optional
+
+from config.config import get_intent_rules_settings
+from core.language_id import normalize
+
+
+class IntentRule:
+    """One compiled rule of data/intent_rules.json"""
+
+    def __init__(self, spec: Dict[str, Any]):
+        self.id: str = spec["id"]
+        self.intent: int = int(spec["intent"])
+        self.full = spec.get("match", "search") == "full"
+        self.patterns = [re.compile(pattern) for pattern in spec["patterns"]]
+        self.exclude = [re.compile(pattern) for pattern in spec.get("exclude", [])]
+        self.response: str = spec.get("response", "")
+        # Filled in from the labelled sample by IntentRules.evaluate()
+        self.matched = 0
+        self.agreed = 0
+        self.active = False
+
+    @property
+    def precision(self) -> Optional[float]:
+        return round(self.agreed / self.matched, 3) if self.matched else None
+
+    def fires(self, lowered: str, normalized: str) -> bool:
+        if any(pattern.search(lowered) for pattern in self.exclude):
+            return False
+        if self.full:
+            return any(pattern.fullmatch(normalized) for pattern in self.patterns)
+        return any(pattern.search(lowered) for pattern in self.patterns)
+
+
+class IntentRules:
+    """Deterministic pre-classifier for the farmer chat, tried before the LLM intent call.
+
+    Rules are checked against the labelled sample when loaded; only rules
+    with at least `min_support` matches and `min_precision` agreement serve
+    traffic, and only for an intent in `intents`, the ones the LLM classifier
+    returns. A message is fast-pathed when the active rules that fire all
+    agree on one intent; anything else goes to the LLM classifier.
+    """
+
+    def __init__(self, rules: List[IntentRule], min_precision: float, min_support: int,
+                 intents: Optional[List[int]] = None):
+        self.rules = rules
+        self.min_precision = min_precision
+        self.min_support = min_support
+        self.intents = set(intents) if intents is not None else None
+        for rule in rules:
+            if self.intents is not None and rule.intent not in self.intents:
+                print(f"Intent rule {rule.id} returns intent {rule.intent}, which the classifier never does; it stays inactive")
+        self.sample: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self.checks = 0
+        self.conflicts = 0
+        self.hits = {rule.id: 0 for rule in rules}
+
+    @classmethod
+    def load(cls, path: str, min_precision: float, min_support: int,
+             intents: Optional[List[int]] = None) -> "IntentRules":
+        with open(path, "r", encoding="utf-8") as file:
+            spec = json.load(file)
+        return cls([IntentRule(rule) for rule in spec["rules"]], min_precision, min_support, intents)
+
+    def _firing(self, text: str, active_only: bool = True) -> List[IntentRule]:
+        lowered = text.lower().strip()
+        normalized = normalize(text)
+        return [rule for rule in self.rules if (rule.active or not active_only) and rule.fires(lowered, normalized)]
+
+    @staticmethod
+    def _decide(firing: List[IntentRule]) -> Optional[IntentRule]:
+        if not firing or len({rule.intent for rule in firing}) > 1:
+            return None
+        return firing[0]
+
+    def evaluate(self, samples: List[Dict[str, Any]]):
+        """Per-rule agreement with the labelled sample; sets which rules are active"""
+        for rule in self.rules:
+            rule.matched = rule.agreed = 0
+        for sample in samples:
+            for rule in self._firing(sample["text"], active_only=False):
+                rule.matched += 1
+                rule.agreed += rule.intent == sample["intent"]
+        for rule in self.rules:
+            rule.active = (rule.matched >= self.min_support and rule.agreed / rule.matched >= self.min_precision
+                           and (self.intents is None or rule.intent in self.intents))
+
+        # What the active rules would have done on the sample
+        decided = [(self._decide(self._firing(sample["text"])), sample["intent"]) for sample in samples]
+        fast = [(rule, label) for rule, label in decided if rule is not None]
+        self.sample = {
+            "rows": len(samples),
+            "fast_path_share": round(len(fast) / len(samples), 3) if samples else None,
+            "fast_path_agreement": round(sum(rule.intent == label for rule, label in fast) / len(fast), 3) if fast else None,
+        }
+
+    def match(self, prompt: str) -> Optional[Dict[str, Any]]:
+        """Intent result in the classify_intent shape, or None when the LLM should classify"""
+        firing = self._firing(prompt)
+        rule = self._decide(firing)
+        with self._lock:
+            self.checks += 1
+            if rule is None:
+                self.conflicts += len(firing) > 0
+                return None
+            self.hits[rule.id] += 1
+        return {
+            "id": rule.intent,
+            "confidence": rule.precision,
+            "response": rule.response,
+            "download_guide": None,
+            "help_request": None,
+            "rule": rule.id,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            fast = sum(self.hits.values())
+            return {
+                "checks": self.checks,
+                "fast_path": fast,
+                "llm_calls_saved": fast,
+                "hit_rate": round(fast / self.checks, 3) if self.checks else None,
+                "conflicts": self.conflicts,
+                "min_precision": self.min_precision,
+                "sample": self.sample,
+                "rules": {
+                    rule.id: {
+                        "intent": rule.intent,
+                        "active": rule.active,
+                        "hits": self.hits[rule.id],
+                        "hit_rate": round(self.hits[rule.id] / self.checks, 3) if self.checks else None,
+                        "sample_matched": rule.matched,
+                        "sample_precision": rule.precision,
+                    }
+                    for rule in self.rules
+                },
+            }
+
+
+def read_samples(path: str) -> List[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+_rules: Optional[IntentRules] = None
+_rules_lock = threading.Lock()
+_rules_failed = False
+
+
+def get_intent_rules() -> Optional[IntentRules]:
+    """Process-wide rules, loaded and checked against the sample on first use; None if disabled or missing"""
+    global _rules, _rules_failed
+    settings = get_intent_rules_settings()
+    if not settings["enabled"]:
+        return None
+    if _rules is None and not _rules_failed:
+        with _rules_lock:
+            if _rules is None and not _rules_failed:
+                try:
+                    rules = IntentRules.load(settings["path"], settings["min_precision"], settings["min_support"],
+                                             settings["intents"])
+                    rules.evaluate(read_samples(settings["samples_path"]))
+                    _rules = rules
+                except (OSError, ValueError, KeyError, re.error) as e:
+                    print(f"Intent rules not loaded, using the LLM classifier only: {e}")
+                    _rules_failed = True
+    return _rules
+
+
+def match_intent_rules(prompt: str) -> Optional[Dict[str, Any]]:
+    rules = get_intent_rules()
+    return rules.match(prompt) if rules is not None else None
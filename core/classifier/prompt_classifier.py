@@ -17,6 +17,17 @@ class PromptClassifier:
             user_id, prompt, chat_history
         )
 
+        return self._build_classification(prompt, relevant_contexts)
+
+    async def classify_and_get_context_async(self, user_id: int, prompt: str, chat_history: List[Dict] = None) -> Dict[str, Any]:
+        """Async variant of classify_and_get_context"""
+        relevant_contexts = await self.context_manager.get_relevant_contexts_async(
+            user_id, prompt, chat_history
+        )
+
+        return self._build_classification(prompt, relevant_contexts)
+
+    def _build_classification(self, prompt: str, relevant_contexts: List[ContextData]) -> Dict[str, Any]:
         # Determine if any context is needed
         needs_context = len(relevant_contexts) > 0
 
@@ -54,6 +65,28 @@ class PromptClassifier:
                     context.relevance_score = 1.0
                     relevant_contexts.append(context)
 
+        return self._build_specific_contexts(relevant_contexts)
+
+    async def get_specific_contexts_async(
+        self,
+        user_id: int,
+        context_types: list
+    ) -> Dict[str, Any]:
+        """Async variant of get_specific_contexts"""
+
+        relevant_contexts = []
+
+        for context_type in context_types:
+            if context_type in self.context_manager.providers:
+                provider = self.context_manager.providers[context_type]
+                context = await provider.get_context_async(user_id)
+                if context:
+                    context.relevance_score = 1.0
+                    relevant_contexts.append(context)
+
+        return self._build_specific_contexts(relevant_contexts)
+
+    def _build_specific_contexts(self, relevant_contexts: List[ContextData]) -> Dict[str, Any]:
         context_string = ""
         if relevant_contexts:
             context_string = self.context_manager.format_contexts_for_prompt(
@@ -1,16 +1,21 @@
 
 
 from typing import List
-from config.config import get_supabase_client
+from config.config import get_async_data_client, get_data_client
+from core.request_scope import load, load_async
 from exceptions.global_exception import GlobalException
 
 
 class Company:
-    def __init__(self):
-        self.client = get_supabase_client()
+    def __init__(self, client=None):
+        self.client = client or get_data_client()
 
     # THIS IS FOR FARMERS ONLY
     def get_farmer_associated_company_id(self, farmer_user_profile_id: int) -> List[dict]:
+        return load("farmer_company", farmer_user_profile_id,
+                    lambda: self._fetch_farmer_associated_company_id(farmer_user_profile_id))
+
+    def _fetch_farmer_associated_company_id(self, farmer_user_profile_id: int):
         response = self.client.table("company_farmers") \
             .select("company_id") \
             .eq("farmer_user_profile_id", farmer_user_profile_id) \
@@ -26,6 +31,9 @@ class Company:
     # Function for fetching the ID of the user using user_profile_id
     # THIS IS FOR ADMIN/SALES REP
     def get_user_company(self, user_profile_id: int):
+        return load("user_company", user_profile_id, lambda: self._fetch_user_company(user_profile_id))
+
+    def _fetch_user_company(self, user_profile_id: int):
         print(user_profile_id)
 
         # Get user role
@@ -75,3 +83,58 @@ class Company:
                 "The user is not associated with a company.", 404)
 
         return company_id
+
+
+class AsyncCompany:
+    """Async counterpart of Company for the async chat pipeline"""
+
+    def __init__(self, client=None):
+        self.client = client or get_async_data_client()
+
+    async def get_user_company(self, user_profile_id: int):
+        return await load_async("user_company", user_profile_id, lambda: self._fetch_user_company(user_profile_id))
+
+    async def _fetch_user_company(self, user_profile_id: int):
+        role_response = await self.client.table("user_roles") \
+            .select("role_id") \
+            .eq("user_profile_id", user_profile_id) \
+            .execute()
+
+        if not role_response.data or len(role_response.data) == 0:
+            raise GlobalException("User role not found.", 404)
+
+        role_id = role_response.data[0]["role_id"]
+        company_id = None
+
+        if role_id in [1, 2]:
+            response = await self.client.table("user_profiles") \
+                .select("company_id") \
+                .eq("id", user_profile_id) \
+                .execute()
+
+            if not response.data or len(response.data) == 0:
+                raise GlobalException("User profile not found.", 404)
+
+            company_id = response.data[0]['company_id']
+
+        elif role_id == 3:
+            response = await self.client.table("company_farmers") \
+                .select("company_id") \
+                .eq("farmer_user_profile_id", user_profile_id) \
+                .execute()
+
+            if not response.data or len(response.data) == 0:
+                raise GlobalException(
+                    "Farmer company association not found.", 404)
+
+            company_id = response.data[0]["company_id"]
+
+        else:
+            raise GlobalException("Unknown user role.", 400)
+
+        if company_id is None:
+            raise GlobalException(
+                "The user is not associated with a company.", 404)
+
+        return company_id
+
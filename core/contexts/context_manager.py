@@ -1,17 +1,21 @@
 from typing import Dict, List
 from core.contexts.context_provider import ContextData, ContextProvider, ContextType
 from core.contexts.feed_program_context_provider import FeedProgramContextProvider
+from core.farmer_core_v2 import AsyncFarmerV2, FarmerV2
 
 
 class ContextManager:
     """Manages multiple context providers and determines which contexts to use"""
 
-    def __init__(self):
+    def __init__(self, client=None, async_client=None):
         self.providers: Dict[ContextType, ContextProvider] = {}
         self.relevance_threshold = 0.3  # Minimum relevance score to include context
 
         # Register providers
-        self.register_provider(FeedProgramContextProvider())
+        self.register_provider(FeedProgramContextProvider(
+            FarmerV2(client),
+            AsyncFarmerV2(async_client) if async_client is not None else None
+        ))
 
     def register_provider(self, provider: ContextProvider):
         """Register a new context provider"""
@@ -42,6 +46,35 @@ class ContextManager:
         relevant_contexts.sort(key=lambda x: x.relevance_score, reverse=True)
         return relevant_contexts[:max_contexts]
 
+    async def get_relevant_contexts_async(self, user_id: int, prompt: str, chat_history: List[Dict] = None,
+                                          max_contexts: int = 3) -> List[ContextData]:
+        """Async variant of get_relevant_contexts"""
+        relevant_contexts = []
+
+        for provider in self.providers.values():
+            try:
+                relevance = provider.is_relevant(
+                    prompt, chat_history=chat_history)
+
+                if relevance >= self.relevance_threshold:
+                    context = await provider.get_context_async(user_id)
+                    if context:
+                        context.relevance_score = relevance
+                        relevant_contexts.append(context)
+            except Exception as e:
+                print(
+                    f"Error getting context from {provider.get_context_type()}: {e}")
+
+        relevant_contexts.sort(key=lambda x: x.relevance_score, reverse=True)
+        return relevant_contexts[:max_contexts]
+
+    def may_need_context(self, prompt: str) -> bool:
+        """Whether any provider would consider the prompt relevant; keyword-only, no I/O"""
+        return any(
+            provider.is_relevant(prompt) >= self.relevance_threshold
+            for provider in self.providers.values()
+        )
+
     def format_contexts_for_prompt(self, contexts: List[ContextData]) -> str:
         """Format multiple contexts into a single context string for the AI"""
         if not contexts:
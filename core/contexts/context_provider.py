@@ -25,6 +25,11 @@ class ContextProvider(ABC):
         """Get context data for a specific user"""
         pass
     
+    async def get_context_async(self, user_id: int, **kwargs) -> Optional[ContextData]:
+        """Async variant of get_context; providers without async I/O run the sync one in a worker thread"""
+        from fastapi.concurrency import run_in_threadpool
+        return await run_in_threadpool(self.get_context, user_id, **kwargs)
+
     @abstractmethod
     def is_relevant(self, prompt: str, **kwargs) -> float:
         """Return relevance score (0.0-1.0) for this context given the prompt"""
@@ -1,13 +1,14 @@
 from typing import Dict, Optional
 from core.contexts.context_provider import ContextData, ContextProvider, ContextType
-from core.farmer_core_v2 import FarmerV2
+from core.farmer_core_v2 import AsyncFarmerV2, FarmerV2
 
 
 class FeedProgramContextProvider(ContextProvider):
     """Provides feed program context"""
     
-    def __init__(self):
-        self.farmer = FarmerV2()
+    def __init__(self, farmer: Optional[FarmerV2] = None, async_farmer: Optional[AsyncFarmerV2] = None):
+        self.farmer = farmer or FarmerV2()
+        self.async_farmer = async_farmer
         self.feed_related_keywords = [
             'feed', 'feeding', 'nutrition', 'diet', 'program', 'stage', 
             'starter', 'grower', 'finisher', 'broiler', 'layer', 'current',
@@ -21,25 +22,38 @@ class FeedProgramContextProvider(ContextProvider):
         try:
             feed_program = self.farmer.get_active_feed_program(user_id)
             feed_product = self.farmer.get_active_feed_product(user_id)
-            
-            context_data = {
-                "feed_program": feed_program,
-                "feed_product": feed_product,
-                "formatted_context": self._format_feed_program_context(feed_program, feed_product)
-            }
-            
-            return ContextData(
-                context_type=ContextType.FEED_PROGRAM,
-                data=context_data,
-                relevance_score=1.0,
-                metadata={
-                    "days_on_feed": feed_program.get("days_on_feed", 0),
-                    "feed_stage": feed_product.get("feed_stage") if feed_product else None
-                }
-            )
+            return self._build_context(feed_program, feed_product)
         except Exception as e:
             print(f"Error getting feed program context: {e}")
             return None
+
+    async def get_context_async(self, user_id: int, **kwargs) -> Optional[ContextData]:
+        """Get active feed program context without blocking a worker thread"""
+        try:
+            farmer = self.async_farmer or AsyncFarmerV2()
+            feed_program = await farmer.get_active_feed_program(user_id)
+            feed_product = await farmer.get_active_feed_product(user_id)
+            return self._build_context(feed_program, feed_product)
+        except Exception as e:
+            print(f"Error getting feed program context: {e}")
+            return None
+
+    def _build_context(self, feed_program: Dict, feed_product: Optional[Dict]) -> ContextData:
+        context_data = {
+            "feed_program": feed_program,
+            "feed_product": feed_product,
+            "formatted_context": self._format_feed_program_context(feed_program, feed_product)
+        }
+
+        return ContextData(
+            context_type=ContextType.FEED_PROGRAM,
+            data=context_data,
+            relevance_score=1.0,
+            metadata={
+                "days_on_feed": feed_program.get("days_on_feed", 0),
+                "feed_stage": feed_product.get("feed_stage") if feed_product else None
+            }
+        )
     
     def is_relevant(self, prompt: str, **kwargs) -> float:
         """Calculate relevance score based on keywords"""
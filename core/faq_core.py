@@ -1,12 +1,12 @@
 from datetime import datetime
 from typing import List, Optional, Dict
-from config.config import get_supabase_client
+from config.config import get_async_data_client, get_data_client
 
 
 
 class Faq:
-  def __init__(self):
-    self.client = get_supabase_client()
+  def __init__(self, client=None):
+    self.client = client or get_data_client()
 
   def insert_faq(self, question: str, answer: str, category: str, company_id: int):
     response = self.client.table("faq").insert({
@@ -37,4 +37,33 @@ class Faq:
         .execute()
 
     return response.data if response.data else []
-    
\ No newline at end of file
+
+  def get_faq_rows_since(self, last_id: int, categories: List[str], limit: int = 1000):
+    """Answered questions with id > last_id, oldest first; used to build the near-duplicate index"""
+    response = self.client.table("faq") \
+        .select("id, question, answer, category, company_id") \
+        .gt("id", last_id) \
+        .in_("category", categories) \
+        .order("id") \
+        .limit(limit) \
+        .execute()
+
+    return response.data if response.data else []
+
+
+class AsyncFaq:
+  """Async counterpart of Faq for the async chat pipeline"""
+
+  def __init__(self, client=None):
+    self.client = client or get_async_data_client()
+
+  async def insert_faq(self, question: str, answer: str, category: str, company_id: int):
+    response = await self.client.table("faq").insert({
+      "category": category,
+      "question": question,
+      "answer": answer,
+      "company_id": company_id
+    }).execute()
+
+    return response.data[0]["id"] if response.data[0] else None
+
@@ -0,0 +1,211 @@
+import asyncio
+import random
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from config.config import get_faq_cache_settings
+from core.contexts.context_manager import ContextManager
+from core.faq_core import Faq
+from core.language_id import normalize
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def shingles(text: str, size: int = 4) -> Set[int]:
+    """Hashed character shingles of the normalised text"""
+    text = normalize(text)
+    if len(text) <= size:
+        return {zlib.crc32(text.encode("utf-8"))} if text else set()
+    return {zlib.crc32(text[i:i + size].encode("utf-8")) for i in range(len(text) - size + 1)}
+
+
+class FaqIndex:
+    """MinHash LSH index over answered general questions from the `faq` table.
+
+    `query()` returns the stored answer of the most similar question whose
+    estimated Jaccard similarity (character 4-gram shingles) reaches
+    `threshold`, within the same company. Near-duplicates of an indexed
+    question replace its answer instead of adding an entry, so the index
+    stays the size of the set of distinct questions; past `max_entries` the
+    least recently matched or added question is dropped.
+    """
+
+    def __init__(self, threshold: float = 0.85, num_perm: int = 32, bands: int = 8, min_words: int = 4, seed: int = 7,
+                 max_entries: int = 5000):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.min_words = min_words
+        self.max_entries = max_entries
+        generator = random.Random(seed)
+        self._permutations = [
+            (generator.randrange(1, _PRIME), generator.randrange(0, _PRIME)) for _ in range(num_perm)
+        ]
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, Dict]" = OrderedDict()
+        self._signatures: Dict[int, Tuple[int, ...]] = {}
+        self._buckets: Dict[Tuple, Set[int]] = {}
+        self._next_key = 0
+        self.last_faq_id = 0
+        self.loaded_at: Optional[float] = None
+        self.lookups = 0
+        self.hits = 0
+        self.evictions = 0
+
+    def signature(self, text: str) -> Optional[Tuple[int, ...]]:
+        hashes = shingles(text)
+        if not hashes:
+            return None
+        return tuple(
+            min((a * value + b) % _PRIME for value in hashes) & _MAX_HASH
+            for a, b in self._permutations
+        )
+
+    def _band_keys(self, company_id, signature: Tuple[int, ...]):
+        for band in range(self.bands):
+            yield (company_id, band, signature[band * self.rows:(band + 1) * self.rows])
+
+    @staticmethod
+    def similarity(left: Tuple[int, ...], right: Tuple[int, ...]) -> float:
+        return sum(a == b for a, b in zip(left, right)) / len(left)
+
+    def _eligible(self, question: str) -> bool:
+        return len(normalize(question).split(" ")) >= self.min_words
+
+    def _best_match(self, company_id, signature) -> Tuple[Optional[int], float]:
+        candidates = set()
+        for band_key in self._band_keys(company_id, signature):
+            candidates.update(self._buckets.get(band_key, ()))
+        best_key, best_score = None, 0.0
+        for key in candidates:
+            score = self.similarity(signature, self._signatures[key])
+            if score > best_score:
+                best_key, best_score = key, score
+        return best_key, best_score
+
+    def add(self, question: str, answer: str, category: str, company_id=None, faq_id: Optional[int] = None) -> bool:
+        if not answer or not self._eligible(question):
+            return False
+        signature = self.signature(question)
+        if signature is None:
+            return False
+        with self._lock:
+            if faq_id is not None:
+                self.last_faq_id = max(self.last_faq_id, faq_id)
+            key, score = self._best_match(company_id, signature)
+            if key is not None and score >= self.threshold:
+                self._entries[key].update(answer=answer, category=category)
+                self._entries.move_to_end(key)
+                return True
+            while len(self._entries) >= self.max_entries:
+                self._evict_oldest()
+            key = self._next_key
+            self._next_key += 1
+            self._entries[key] = {"question": question, "answer": answer, "category": category, "company_id": company_id}
+            self._signatures[key] = signature
+            for band_key in self._band_keys(company_id, signature):
+                self._buckets.setdefault(band_key, set()).add(key)
+        return True
+
+    def _evict_oldest(self):
+        key, entry = self._entries.popitem(last=False)
+        for band_key in self._band_keys(entry["company_id"], self._signatures.pop(key)):
+            bucket = self._buckets[band_key]
+            bucket.discard(key)
+            if not bucket:
+                del self._buckets[band_key]
+        self.evictions += 1
+
+    def query(self, question: str, company_id=None) -> Optional[Dict]:
+        """Stored answer for a near-duplicate question, with its similarity, or None"""
+        if not self._eligible(question):
+            return None
+        signature = self.signature(question)
+        if signature is None:
+            return None
+        with self._lock:
+            self.lookups += 1
+            key, score = self._best_match(company_id, signature)
+            if key is None or score < self.threshold:
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return {**self._entries[key], "similarity": round(score, 3)}
+
+    def load(self, fetch_rows: Callable[[int], List[Dict]], is_context_free: Callable[[str], bool]) -> int:
+        """Add faq rows newer than the last one seen; returns how many were indexed.
+
+        `fetch_rows(last_id)` returns the next page of rows ordered by id.
+        Rows whose question could have pulled in per-user context are skipped,
+        since their stored answer may be specific to that user.
+        """
+        added = 0
+        while True:
+            rows = fetch_rows(self.last_faq_id)
+            if not rows:
+                break
+            for row in rows:
+                self.last_faq_id = max(self.last_faq_id, row["id"])
+                if is_context_free(row["question"] or "") and self.add(
+                        row["question"], row["answer"], row["category"], row.get("company_id"), row["id"]):
+                    added += 1
+        self.loaded_at = time.monotonic()
+        return added
+
+    def stats(self) -> Dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "evictions": self.evictions,
+            "last_faq_id": self.last_faq_id,
+            "threshold": self.threshold,
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_ratio": round(self.hits / self.lookups, 3) if self.lookups else None,
+        }
+
+
+_settings = get_faq_cache_settings()
+faq_index = FaqIndex(threshold=_settings["threshold"], min_words=_settings["min_words"], max_entries=_settings["max_entries"])
+_refresh_lock = threading.Lock()
+
+
+def refresh_faq_index(client=None) -> Dict:
+    """Index faq rows added since the last load (by any worker); safe to call from a worker thread"""
+    if not _refresh_lock.acquire(blocking=False):
+        return {"skipped": True}
+    try:
+        faq = Faq(client)
+        context_manager = ContextManager(client)
+        added = faq_index.load(
+            lambda last_id: faq.get_faq_rows_since(last_id, _settings["categories"]),
+            lambda question: not context_manager.may_need_context(question),
+        )
+        return {"added": added, **faq_index.stats()}
+    finally:
+        _refresh_lock.release()
+
+
+def faq_cache_enabled() -> bool:
+    return _settings["enabled"]
+
+
+def faq_index_is_stale() -> bool:
+    return faq_index.loaded_at is None or time.monotonic() - faq_index.loaded_at > _settings["refresh_seconds"]
+
+
+def _report_refresh_error(future: asyncio.Future):
+    if not future.cancelled() and future.exception() is not None:
+        print(f"Error refreshing FAQ index: {future.exception()}")
+
+
+def schedule_faq_refresh():
+    """From the event loop: refresh a stale index in a worker thread without waiting for it"""
+    if faq_index_is_stale() and not _refresh_lock.locked():
+        asyncio.get_running_loop().run_in_executor(None, refresh_faq_index).add_done_callback(_report_refresh_error)
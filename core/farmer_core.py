@@ -1,14 +1,14 @@
 from datetime import datetime, timezone
 from typing import List, Optional, Dict
-from config.config import get_supabase_client
+from config.config import get_data_client
 from core.company_core import Company
 from exceptions.global_exception import GlobalException
 
 
 class Farmer:
-    def __init__(self):
-        self.client = get_supabase_client()
-        self.Company = Company()
+    def __init__(self, client=None):
+        self.client = client or get_data_client()
+        self.Company = Company(self.client)
 
     def get_feed_use(self, user_id: int) -> List[dict]:
         # Get latest feed usage
@@ -1,16 +1,43 @@
 from dateutil.parser import parse
 from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Optional
-from config.config import get_supabase_client
+from config.config import get_async_data_client, get_data_client
 from core.company_core import Company
+from core.reference_data import reference_data
+from core.request_scope import forget, load, load_async
 from exceptions.global_exception import GlobalException
 from models.feed_calculator_model import CreateFeedCalculatorPayload, FeedCalculatorDto, UpdateFeedCalculatorPayload
 
 
+def days_on_feed_since(start_date_str: str, now_utc: datetime) -> int:
+    """Day number of a feed program (day 1 is the start date)"""
+    start_date = parse(start_date_str)
+    if start_date.tzinfo is None:
+        start_date = start_date.replace(tzinfo=timezone.utc)
+
+    time_diff = now_utc - start_date
+    total_hours = time_diff.total_seconds() / 3600
+
+    return int(total_hours // 24) + 1
+
+
+def build_feed_product_dto(feed_program: Dict, feed_product: Dict) -> Dict:
+    return {
+        "feed_program_id": feed_program["id"],
+        "feed_name": feed_product["name"],
+        "status": feed_program["status"],
+        "feed_stage": feed_product["feed_stage"],
+        "age_range_start": feed_product["age_range_start"],
+        "age_range_end": feed_product["age_range_end"],
+        "feed_goal": feed_product["goal"],
+        "days_on_feed": feed_program["days_on_feed"],
+    }
+
+
 class FarmerV2:
-    def __init__(self):
-        self.Client = get_supabase_client()
-        self.Company = Company()
+    def __init__(self, client=None):
+        self.Client = client or get_data_client()
+        self.Company = Company(self.Client)
 
     # Create feed program
     def create_feed_program(self, farmer_user_profile_id: int, feed_product_id: int, animal_quantity: int):
@@ -28,44 +55,58 @@ class FarmerV2:
             "feed_product_id": feed_product_id,
             "animal_quantity": animal_quantity,
         }).execute()
+        forget("active_feed_program", farmer_user_profile_id)
         return None
 
-    # Get active feed program (NOTE ONLY ONE ACTIVE PROGRAM IS ALLOWED)
-    def get_active_feed_program(self, farmer_user_profile_id: int):
+    def user_profile_exists(self, user_profile_id: int) -> bool:
+        return load("user_profile", user_profile_id, lambda: self._fetch_user_profile_exists(user_profile_id))
+
+    def _fetch_user_profile_exists(self, user_profile_id: int) -> bool:
         response = (
-            self.Client.table("feed_programs")
-            .select("*")
-            .eq("farmer_user_profile_id", farmer_user_profile_id)
-            .eq("status", "active")
+            self.Client.table("user_profiles")
+            .select("id")
+            .eq("id", user_profile_id)
             .limit(1)
             .execute()
         )
+        return bool(response.data)
 
-        if not response.data or len(response.data) == 0:
+    # Get active feed program (NOTE ONLY ONE ACTIVE PROGRAM IS ALLOWED)
+    def get_active_feed_program(self, farmer_user_profile_id: int):
+        feed_program = self._get_active_feed_program_row(farmer_user_profile_id)
+
+        if feed_program is None:
             raise GlobalException(
                 "There is no current active feed program.", 404)
 
-        feed_program = response.data[0]
-
         updated_program = self._update_days_on_feed(feed_program)
 
         return updated_program
 
+    # One read per request, shared by get_active_feed_program and get_active_feed_product
+    def _get_active_feed_program_row(self, farmer_user_profile_id: int) -> Optional[Dict]:
+        return load("active_feed_program", farmer_user_profile_id,
+                    lambda: self._fetch_active_feed_program(farmer_user_profile_id))
+
+    def _fetch_active_feed_program(self, farmer_user_profile_id: int) -> Optional[Dict]:
+        response = (
+            self.Client.table("feed_programs")
+            .select("*")
+            .eq("farmer_user_profile_id", farmer_user_profile_id)
+            .eq("status", "active")
+            .limit(1)
+            .execute()
+        )
+        return response.data[0] if response.data else None
+
     def _update_days_on_feed(self, feed_program: dict) -> dict:
         try:
             start_date_str = feed_program.get("start_date")
             if not start_date_str:
                 return feed_program
 
-            start_date = parse(start_date_str)
-            if start_date.tzinfo is None:
-                start_date = start_date.replace(tzinfo=timezone.utc)
-
             now_utc = datetime.now(timezone.utc)
-            time_diff = now_utc - start_date
-            total_hours = time_diff.total_seconds() / 3600
-
-            new_days_on_feed = int(total_hours // 24) + 1
+            new_days_on_feed = days_on_feed_since(start_date_str, now_utc)
             current_days_on_feed = feed_program.get("days_on_feed", 1)
 
             if new_days_on_feed != current_days_on_feed:
@@ -114,6 +155,7 @@ class FarmerV2:
             self.Client.table("feed_programs").update({
                 "status": "switched"
             }).eq("id", active_id).execute()
+            forget("active_feed_program", farmer_user_profile_id)
 
             return active_id
 
@@ -134,6 +176,7 @@ class FarmerV2:
             self.Client.table("feed_programs").update({
                 "status": "completed"
             }).eq("id", active_id).execute()
+            forget("active_feed_program", farmer_user_profile_id)
             return active_id
 
         return None
@@ -153,6 +196,7 @@ class FarmerV2:
             self.Client.table("feed_programs").update({
                 "status": "incomplete"
             }).eq("id", active_id).execute()
+            forget("active_feed_program", farmer_user_profile_id)
             return active_id
 
         return None
@@ -161,47 +205,31 @@ class FarmerV2:
 
     # Method to get current feed product associated with active feed program
     def get_active_feed_product(self, farmer_user_profile_id: int):
-        feed_program_response = (
-            self.Client.table("feed_programs")
-            .select("id, feed_product_id, days_on_feed, status")
-            .eq("farmer_user_profile_id", farmer_user_profile_id)
-            .eq("status", "active")
-            .limit(1)
-            .execute()
-        )
+        feed_program = self._get_active_feed_program_row(farmer_user_profile_id)
 
-        if not feed_program_response.data:
+        if feed_program is None:
             return None  # No active feed program
 
-        feed_program = feed_program_response.data[0]
+        # Fetch feed product details (from the warm reference cache when loaded)
+        feed_product = reference_data.get_feed_product(feed_program["feed_product_id"])
+        if feed_product is None:
+            feed_product = load("feed_product", feed_program["feed_product_id"],
+                                lambda: self._fetch_feed_product(feed_program["feed_product_id"]))
+
+            if feed_product is None:
+                return None  # No feed product found
+
+        return build_feed_product_dto(feed_program, feed_product)
 
-        # Fetch feed product details
+    def _fetch_feed_product(self, feed_product_id: int) -> Optional[Dict]:
         feed_product_response = (
             self.Client.table("feed_products")
             .select("id, name, feed_stage, age_range_start, age_range_end, goal")
-            .eq("id", feed_program["feed_product_id"])
+            .eq("id", feed_product_id)
             .limit(1)
             .execute()
         )
-
-        if not feed_product_response.data:
-            return None  # No feed product found
-
-        feed_product = feed_product_response.data[0]
-
-        # Build DTO
-        feed_product_dto = {
-            "feed_program_id": feed_program["id"],
-            "feed_name": feed_product["name"],
-            "status": feed_program["status"],
-            "feed_stage": feed_product["feed_stage"],
-            "age_range_start": feed_product["age_range_start"],
-            "age_range_end": feed_product["age_range_end"],
-            "feed_goal": feed_product["goal"],
-            "days_on_feed": feed_program["days_on_feed"],
-        }
-
-        return feed_product_dto
+        return feed_product_response.data[0] if feed_product_response.data else None
 
     # FEED CALCULATOR
 
@@ -259,13 +287,7 @@ class FarmerV2:
 
     def read_growth_performance(self, farmer_user_profile_id: int) -> Dict:
         try:
-            user_exists = (self.Client.table("user_profiles")
-                           .select("id")
-                           .eq("id", farmer_user_profile_id)
-                           .limit(1)
-                           .execute())
-
-            if not user_exists.data:
+            if not self.user_profile_exists(farmer_user_profile_id):
                 raise GlobalException(
                     f"User profile ID {farmer_user_profile_id} does not exist", 404)
 
@@ -416,13 +438,7 @@ class FarmerV2:
 
     def read_feed_intake_behavior(self, farmer_user_profile_id: int):
         try:
-            user_exists = (self.Client.table("user_profiles")
-                           .select("id")
-                           .eq("id", farmer_user_profile_id)
-                           .limit(1)
-                           .execute())
-
-            if not user_exists.data:
+            if not self.user_profile_exists(farmer_user_profile_id):
                 raise GlobalException(
                     f"User profile ID {farmer_user_profile_id} does not exist.")
 
@@ -520,13 +536,7 @@ class FarmerV2:
 
     def read_health_watch(self, farmer_user_profile_id: int, filter_type: Optional[str] = None) -> Dict:
         try:
-            user_exists = (self.Client.table("user_profiles")
-                           .select("id")
-                           .eq("id", farmer_user_profile_id)
-                           .limit(1)
-                           .execute())
-
-            if not user_exists.data:
+            if not self.user_profile_exists(farmer_user_profile_id):
                 raise GlobalException(
                     f"User profile ID {farmer_user_profile_id} does not exist.", status_code=404)
 
@@ -856,6 +866,10 @@ class FarmerV2:
         if not feed_product_id:
             return 0.0
 
+        cached = reference_data.get_target_weight(feed_product_id)
+        if cached is not None:
+            return cached
+
         try:
             target_weight_response = self.Client.table("feed_growth_targets").select("target_weight_kg") \
                 .eq("feed_product_id", feed_product_id).limit(1).single().execute()
@@ -920,3 +934,94 @@ def create_performance_log_with_program(farmer_instance: FarmerV2, user_id: int,
     except Exception as e:
         print(f"Error creating performance log: {e}")
         return False
+
+
+class AsyncFarmerV2:
+    """Async counterpart of the FarmerV2 reads used during a chat turn"""
+
+    def __init__(self, client=None):
+        self.Client = client or get_async_data_client()
+
+    async def get_active_feed_program(self, farmer_user_profile_id: int):
+        feed_program = await self._get_active_feed_program_row(farmer_user_profile_id)
+
+        if feed_program is None:
+            raise GlobalException(
+                "There is no current active feed program.", 404)
+
+        return await self._update_days_on_feed(feed_program)
+
+    async def _get_active_feed_program_row(self, farmer_user_profile_id: int) -> Optional[Dict]:
+        return await load_async("active_feed_program", farmer_user_profile_id,
+                                lambda: self._fetch_active_feed_program(farmer_user_profile_id))
+
+    async def _fetch_active_feed_program(self, farmer_user_profile_id: int) -> Optional[Dict]:
+        response = await (
+            self.Client.table("feed_programs")
+            .select("*")
+            .eq("farmer_user_profile_id", farmer_user_profile_id)
+            .eq("status", "active")
+            .limit(1)
+            .execute()
+        )
+        return response.data[0] if response.data else None
+
+    async def _update_days_on_feed(self, feed_program: dict) -> dict:
+        try:
+            start_date_str = feed_program.get("start_date")
+            if not start_date_str:
+                return feed_program
+
+            now_utc = datetime.now(timezone.utc)
+            new_days_on_feed = days_on_feed_since(start_date_str, now_utc)
+
+            if new_days_on_feed != feed_program.get("days_on_feed", 1):
+                update_response = await (
+                    self.Client.table("feed_programs")
+                    .update({
+                        "days_on_feed": new_days_on_feed,
+                        "updated_at": now_utc.isoformat()
+                    })
+                    .eq("id", feed_program["id"])
+                    .execute()
+                )
+
+                if update_response.data:
+                    feed_program["days_on_feed"] = new_days_on_feed
+                    feed_program["updated_at"] = now_utc.isoformat()
+                else:
+                    print(
+                        f"Failed to update days_on_feed for feed program {feed_program['id']}")
+
+            return feed_program
+
+        except Exception as e:
+            print(f"Error updating days_on_feed: {e}")
+            return feed_program
+
+    async def get_active_feed_product(self, farmer_user_profile_id: int):
+        feed_program = await self._get_active_feed_program_row(farmer_user_profile_id)
+
+        if feed_program is None:
+            return None
+
+        feed_product = reference_data.get_feed_product(feed_program["feed_product_id"])
+        if feed_product is None:
+            feed_product = await load_async("feed_product", feed_program["feed_product_id"],
+                                            lambda: self._fetch_feed_product(feed_program["feed_product_id"]))
+
+            if feed_product is None:
+                return None
+
+        return build_feed_product_dto(feed_program, feed_product)
+
+    async def _fetch_feed_product(self, feed_product_id: int) -> Optional[Dict]:
+        feed_product_response = await (
+            self.Client.table("feed_products")
+            .select("id, name, feed_stage, age_range_start, age_range_end, goal")
+            .eq("id", feed_product_id)
+            .limit(1)
+            .execute()
+        )
+        return feed_product_response.data[0] if feed_product_response.data else None
+
@@ -0,0 +1,146 @@
+import re
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from config.config import get_local_completion_settings
+from core.form_flow import PENDING_KEY, form_fields
+from core.language_id import normalize
+
+# Read-back of values read by pattern, and the reply once the user confirms them; Tagalog for Tagalog and Taglish
+QUESTIONS = {
+    "incident_details": {
+        "English": "I read this from your message:\n{summary}\nShall I log the health incident? Reply yes, or tell me what to correct.",
+        "Tagalog": "Ito po ang nabasa ko sa inyong mensahe:\n{summary}\nIla-log ko na po ba ang health incident? Sumagot lang po ng oo, o sabihin kung ano ang itatama.",
+    },
+    "report_details": {
+        "English": "I read this from your message:\n{summary}\nShall I record the performance report? Reply yes, or tell me what to correct.",
+        "Tagalog": "Ito po ang nabasa ko sa inyong mensahe:\n{summary}\nIre-record ko na po ba ang performance report? Sumagot lang po ng oo, o sabihin kung ano ang itatama.",
+    },
+}
+CONFIRMATIONS = {
+    "incident_details": {
+        "English": "Thank you! I've logged this health incident:\n{summary}\nPlease still have a veterinarian check your animals, especially if more get sick.",
+        "Tagalog": "Salamat po! Na-log na po ang health incident:\n{summary}\nMainam pa rin pong ipatingin sa beterinaryo ang inyong mga alaga, lalo na kung may madagdag pang magkasakit.",
+    },
+    "report_details": {
+        "English": "Thank you! I've recorded your performance report:\n{summary}\nKeep logging regularly so we can track your flock's progress.",
+        "Tagalog": "Salamat po! Na-record na po ang inyong performance report:\n{summary}\nMag-log lang po kayo ulit para masubaybayan natin ang progreso ng inyong alaga.",
+    },
+}
+TAGALOG_LANGUAGES = {"Tagalog", "Taglish"}
+SUMMARY_FIELDS = {
+    "incident_details": ["incident_type", "incident_date", "affected_count", "symptoms"],
+    "report_details": ["average_weight_kg", "mortality_count", "bags_used", "feed_intake_kg", "eggs_per_day"],
+}
+# A whole-message yes to the read-back ("yes", "oo po", "tama yan", "sige i-log mo na")
+YES_PATTERN = re.compile(
+    r"(?:yes|yep|yeah|yup|correct|right|confirm(?:ed)?|oo|opo|oho|tama|tumpak|sige|ok|okay|go)"
+    r"(?: (?:po|na|yes|yan|iyan|lahat|that's right|thats right|please|log it|i log mo na|ilog mo na|tama|correct))*"
+)
+
+
+def _present(value: Any) -> bool:
+    return value not in (None, "", [], {})
+
+
+def _label(field: str) -> str:
+    return field.replace("_", " ").capitalize()
+
+
+def required_fields(functions: Dict[str, Any], form_key: str) -> List[str]:
+    """The form's required fields from its function schema, plus any configured for the function"""
+    form_schema = functions["parameters"]["properties"].get(form_key) or {}
+    extra = get_local_completion_settings()["extra_fields"].get(functions["name"], [])
+    return list(dict.fromkeys(form_schema.get("required", []) + extra))
+
+
+def _render(templates: Dict[str, Dict[str, str]], form_key: str, language: Optional[str], fields: Dict[str, Any],
+            summary_fields: List[str]) -> str:
+    summary = "\n".join(f"- {_label(field)}: {fields[field]}" for field in summary_fields if _present(fields.get(field)))
+    template = templates[form_key]["Tagalog" if language in TAGALOG_LANGUAGES else "English"]
+    return template.format(summary=summary)
+
+
+def _result(functions: Dict[str, Any], form_key: str, response: str, fields: Dict[str, Any], next_action: str):
+    return {
+        "response": response,
+        "log_type": functions["parameters"]["properties"]["log_type"]["enum"][0],
+        form_key: fields,
+        "next_action": next_action,
+        "intent": "None",
+        "completed_locally": next_action == "log_complete",
+    }
+
+
+def local_completion(prompt: str, functions: Dict[str, Any], form_key: str, form_data: Dict[str, Any],
+                     extracted: Dict[str, str], language: Optional[str]) -> Optional[Dict[str, Any]]:
+    """This turn's result when the form can be finished without the LLM, or None when the LLM should take it.
+
+    Values read by pattern are never logged unchecked. A short, plain answer
+    whose new values fill the form's last required fields gets them read back
+    ("ask_next"); they are kept in `form_data` under PENDING_KEY. A yes to the
+    read-back finalises the form ("log_complete"); any other reply drops them
+    from `form_data` and the LLM takes the turn. A yes to a form whose required
+    fields the LLM had already collected finalises it too. Values already in
+    the form are never overwritten. `form_data` is updated in place.
+    """
+    settings = get_local_completion_settings()
+    if not settings["enabled"] or form_key not in CONFIRMATIONS:
+        return None
+
+    pending = form_data.pop(PENDING_KEY, None)
+    if pending is not None:
+        if YES_PATTERN.fullmatch(normalize(prompt)):
+            fields = form_fields(form_data)
+            if _present(fields.get("notes")):
+                # The summary was written before the values were read; add them
+                fields["notes"] = f"{fields['notes']} " + "; ".join(f"{_label(field)}: {fields[field]}" for field in pending)
+            response = _render(CONFIRMATIONS, form_key, language, fields, SUMMARY_FIELDS[form_key])
+            return _result(functions, form_key, response, fields, "log_complete")
+        for field in pending:
+            form_data.pop(field, None)
+        completion_stats.record(functions["name"], "rejected")
+        return None
+
+    required = required_fields(functions, form_key)
+    fields = form_fields(form_data)
+    if all(_present(fields.get(field)) for field in required) and YES_PATTERN.fullmatch(normalize(prompt)):
+        # Every required field is in and the LLM is waiting for the go-ahead
+        response = _render(CONFIRMATIONS, form_key, language, fields, SUMMARY_FIELDS[form_key])
+        return _result(functions, form_key, response, fields, "log_complete")
+
+    new = {field: value for field, value in extracted.items() if not _present(form_data.get(field))}
+    if not new or "?" in prompt or len(prompt.split()) > settings["max_words"]:
+        return None
+    fields = {**fields, **new}
+    if not all(_present(fields.get(field)) for field in required):
+        return None
+
+    form_data.update(new)
+    form_data[PENDING_KEY] = list(new)
+    response = _render(QUESTIONS, form_key, language, new, list(new))
+    return _result(functions, form_key, response, fields, "ask_next")
+
+
+class CompletionStats:
+    """Per log function: forms finalised by the LLM's log_complete versus locally, and local read-backs and rejections"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts: Dict[str, Counter] = {}
+
+    def record(self, function_name: str, outcome: str):
+        with self._lock:
+            self.counts.setdefault(function_name, Counter())[outcome] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            result = {}
+            for function_name, counts in self.counts.items():
+                total = counts["local"] + counts["llm"]
+                result[function_name] = {**counts, "local_ratio": round(counts["local"] / total, 3) if total else None}
+            return result
+
+
+completion_stats = CompletionStats()
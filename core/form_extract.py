@@ -0,0 +1,225 @@
+import re
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+# English and Tagalog number words; Tagalog numbers before a noun take the "-ng" linker ("limang manok").
+# English "May" is left out of MONTHS: it is also the Tagalog "there is" ("may 5 na patay").
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8, "nine": 9,
+    "ten": 10, "eleven": 11, "twelve": 12, "fifteen": 15, "twenty": 20, "thirty": 30, "forty": 40,
+    "fifty": 50, "hundred": 100, "a hundred": 100, "one hundred": 100,
+    "isa": 1, "isang": 1, "dalawa": 2, "dalawang": 2, "tatlo": 3, "tatlong": 3, "apat": 4, "lima": 5,
+    "limang": 5, "anim": 6, "pito": 7, "pitong": 7, "walo": 8, "walong": 8, "siyam": 9,
+    "sampu": 10, "sampung": 10, "dalawampu": 20, "dalawampung": 20, "tatlumpu": 30, "tatlumpung": 30,
+    "limampu": 50, "limampung": 50, "sandaan": 100, "isang daan": 100, "isandaan": 100,
+}
+WEEKDAYS = {
+    "monday": 0, "tuesday": 1, "wednesday": 2, "thursday": 3, "friday": 4, "saturday": 5, "sunday": 6,
+    "lunes": 0, "martes": 1, "miyerkules": 2, "miyerkoles": 2, "huwebes": 3, "biyernes": 4, "sabado": 5, "linggo": 6,
+}
+MONTHS = {
+    "jan": 1, "january": 1, "feb": 2, "february": 2, "mar": 3, "march": 3, "apr": 4, "april": 4,
+    "jun": 6, "june": 6, "jul": 7, "july": 7, "aug": 8, "august": 8, "sep": 9, "sept": 9,
+    "september": 9, "oct": 10, "october": 10, "nov": 11, "november": 11, "dec": 12, "december": 12,
+    "enero": 1, "pebrero": 2, "marso": 3, "abril": 4, "mayo": 5, "hunyo": 6, "hulyo": 7, "agosto": 8,
+    "setyembre": 9, "oktubre": 10, "nobyembre": 11, "disyembre": 12,
+}
+
+_number_word = "|".join(sorted((re.escape(word) for word in NUMBER_WORDS), key=len, reverse=True))
+NUMBER = rf"(\d+(?:,\d{{3}})*(?:\.\d+)?|\d+,\d+|(?:{_number_word}))"
+ANIMALS = r"(?:heads?|ulo|birds?|chicks?|chickens?|manok|sisiw|broilers?|layers?|pigs?|piglets?|baboy|biik|hogs?|animals?)"
+
+# A weight right before "bag" is the bag size ("50kg bags"), not a reading
+WEIGHT = re.compile(rf"\b{NUMBER}\s*(kg|kgs|kilos?|kilograms?|g|grams?|gramo|grms?)\b(?!\s*(?:na\s+)?(?:bags?|sako|sacks?))")
+# So is one right after the bag count ("2 bags of 50kg") or one given per bag ("50kg bawat sako")
+BAG_SIZE_BEFORE = re.compile(r"\b(?:bags?|sako|sacks?)\s+(?:of|na|ng)\s*$")
+BAG_SIZE_AFTER = re.compile(r"\s*(?:per|a|each|bawat|kada|isang)\s+(?:bags?|sako|sacks?)\b")
+HEADS = re.compile(rf"\b{NUMBER}\s*(?:na\s+|ng\s+)?(?:more\s+|pang\s+)?{ANIMALS}\b")
+BAGS = re.compile(rf"\b{NUMBER}\s*(?:na\s+)?(?:bags?|sako|sacks?)\b")
+EGGS = re.compile(rf"\b{NUMBER}\s*(?:na\s+)?(?:eggs?|itlog)\b")
+MORTALITY = [
+    re.compile(rf"\b{NUMBER}\s*(?:na\s+)?(?:more\s+)?(?:{ANIMALS}\s*)?(?:have\s+|has\s+|were\s+|are\s+|ang\s+|na\s+)?(?:died|dead|namatay|patay|tigok)\b"),
+    re.compile(rf"\b(?:namatay|namatayan|patay|died|mortality|deaths?)\b(?:\s+(?:is|was|of|ang|na|ng|ako|kami|po|today|ngayon|kahapon|yesterday|:))*\s*{NUMBER}\b"),
+]
+NO_MORTALITY = re.compile(r"\b(?:walang namatay|walang patay|no (?:deaths?|mortality)|nobody died|none died|zero mortality|0 mortality)\b")
+AFFECTED = re.compile(rf"\b{NUMBER}\s*(?:na\s+)?(?:{ANIMALS}\s*)?(?:are\s+|is\s+|ang\s+|na\s+)?(?:sick|affected|apektado|may sakit|matamlay|nagtatae|inuubo|coughing|lethargic|limping)\b")
+
+WEIGHT_WORDS = re.compile(r"\b(?:weights?|weighs?|weighed|timbang|bigat|average|avg|ave|abw)\b")
+FEED_WORDS = re.compile(r"\b(?:feeds?|feed intake|intake|pakain|patuka|kinain|naubos|consumed|ate)\b")
+
+# Relative and explicit dates
+TODAY = re.compile(r"\b(?:today|this morning|this afternoon|tonight|ngayon|ngayong araw|kanina|kaninang umaga|kaninang hapon)\b")
+YESTERDAY = re.compile(r"\b(?:yesterday|last night|kahapon|kagabi)\b")
+BEFORE_YESTERDAY = re.compile(r"\b(?:day before yesterday|kamakalawa)\b")
+DAYS_AGO = re.compile(rf"\b{NUMBER}\s*(?:days?\s+ago|araw\s+na\s+(?:ang\s+)?(?:nakalipas|nakaraan))\b|\b(?:nakaraang|nakalipas\s+na)\s+{NUMBER}\s*araw\b")
+LAST_WEEK = re.compile(r"\b(?:last week|noong isang linggo|nung isang linggo|nakaraang linggo)\b")
+LAST_WEEKDAY = re.compile(r"\b(?:(?:last|noong|nung|nakaraang|this past|on)\s+)?(monday|tuesday|wednesday|thursday|friday|saturday|sunday|lunes|martes|miyerkules|miyerkoles|huwebes|biyernes|sabado)\b")
+ISO_DATE = re.compile(r"\b(\d{4})[-/](\d{1,2})[-/](\d{1,2})\b")
+SLASH_DATE = re.compile(r"\b(\d{1,2})/(\d{1,2})(?:/(\d{2,4}))?\b")
+_month = "|".join(sorted(MONTHS, key=len, reverse=True))
+MONTH_DAY = re.compile(rf"\b({_month})\.?\s+(\d{{1,2}})(?:st|nd|rd|th)?\b|\b(\d{{1,2}})(?:st|nd|rd|th)?\s+(?:ng\s+|of\s+)?({_month})\b")
+
+
+def to_number(token: str) -> Optional[float]:
+    token = token.strip()
+    if token in NUMBER_WORDS:
+        return float(NUMBER_WORDS[token])
+    if re.fullmatch(r"\d+,\d{3}(?:,\d{3})*(?:\.\d+)?", token):
+        token = token.replace(",", "")
+    return float(token.replace(",", "."))
+
+
+def _format(value: float) -> str:
+    return str(int(value)) if value == int(value) else f"{value:.3f}".rstrip("0").rstrip(".")
+
+
+def _first_number(pattern: re.Pattern, text: str) -> Optional[float]:
+    match = pattern.search(text)
+    if not match:
+        return None
+    return to_number(next(group for group in match.groups() if group))
+
+
+def _mortality(text: str) -> Optional[float]:
+    for pattern in MORTALITY:
+        count = _first_number(pattern, text)
+        if count is not None:
+            return count
+    return None
+
+
+def _safe_date(year: int, month: int, day: int) -> Optional[date]:
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def _past(moment: Optional[date], today: date) -> Optional[date]:
+    """A month/day without a year that would be in the future means last year's"""
+    if moment is not None and moment > today:
+        return _safe_date(moment.year - 1, moment.month, moment.day)
+    return moment
+
+
+def extract_date(text: str, today: date) -> Optional[date]:
+    """The date a report refers to, from relative ("kahapon", "last Monday") or explicit wording"""
+    lowered = text.lower()
+    match = ISO_DATE.search(lowered)
+    moment = _safe_date(int(match.group(1)), int(match.group(2)), int(match.group(3))) if match else None
+    if moment is not None:
+        return moment
+    match = MONTH_DAY.search(lowered)
+    if match:
+        month, day = (match.group(1), match.group(2)) if match.group(1) else (match.group(4), match.group(3))
+        moment = _past(_safe_date(today.year, MONTHS[month], int(day)), today)
+        if moment is not None:
+            return moment
+    match = SLASH_DATE.search(lowered)
+    if match:
+        # Month first, as dates are written in the Philippines
+        year = int(match.group(3)) if match.group(3) else today.year
+        year = year + 2000 if year < 100 else year
+        moment = _safe_date(year, int(match.group(1)), int(match.group(2)))
+        moment = moment if match.group(3) else _past(moment, today)
+        if moment is not None:
+            return moment
+    if BEFORE_YESTERDAY.search(lowered):
+        return today - timedelta(days=2)
+    if YESTERDAY.search(lowered):
+        return today - timedelta(days=1)
+    match = DAYS_AGO.search(lowered)
+    if match:
+        return today - timedelta(days=int(to_number(next(group for group in match.groups() if group))))
+    if LAST_WEEK.search(lowered):
+        return today - timedelta(days=7)
+    match = LAST_WEEKDAY.search(lowered)
+    if match:
+        # The most recent such weekday before today
+        return today - timedelta(days=(today.weekday() - WEEKDAYS[match.group(1)] - 1) % 7 + 1)
+    if TODAY.search(lowered):
+        return today
+    return None
+
+
+def _weights(text: str) -> List[Tuple[float, int]]:
+    """(kg, position) of every weight in the text, bag sizes left out"""
+    weights = []
+    for match in WEIGHT.finditer(text):
+        if BAG_SIZE_BEFORE.search(text, 0, match.start()) or BAG_SIZE_AFTER.match(text, match.end()):
+            continue
+        value = to_number(match.group(1))
+        unit = match.group(2)
+        weights.append((value if unit.startswith("k") else value / 1000, match.start()))
+    return weights
+
+
+def extract_report_details(text: str, today: date) -> Dict[str, str]:
+    """Fields of ask_farmer_log's report_details that can be read without the LLM"""
+    lowered = text.lower()
+    fields = {}
+    mortality = _mortality(lowered)
+    if mortality is not None:
+        fields["mortality_count"] = _format(mortality)
+    elif NO_MORTALITY.search(lowered):
+        fields["mortality_count"] = "0"
+    bags = _first_number(BAGS, lowered)
+    if bags is not None:
+        fields["bags_used"] = _format(bags)
+    eggs = _first_number(EGGS, lowered)
+    if eggs is not None:
+        fields["eggs_per_day"] = _format(eggs)
+
+    weights = _weights(lowered)
+    if weights:
+        kg = weights[0][0]
+        weight_word = WEIGHT_WORDS.search(lowered)
+        feed_word = FEED_WORDS.search(lowered)
+        if feed_word and not weight_word:
+            fields["feed_intake_kg"] = _format(kg)
+        elif weight_word and not feed_word:
+            fields["average_weight_kg"] = _format(kg)
+        elif weight_word and feed_word:
+            # Each weight goes to the keyword nearest before it
+            for value, position in weights:
+                before = lowered[:position]
+                last_weight = max((m.start() for m in WEIGHT_WORDS.finditer(before)), default=-1)
+                last_feed = max((m.start() for m in FEED_WORDS.finditer(before)), default=-1)
+                key = "average_weight_kg" if last_weight > last_feed else "feed_intake_kg"
+                fields.setdefault(key, _format(value))
+        elif kg <= 10:
+            # A bare per-bird sized weight ("1.2 kg") is a body weight
+            fields["average_weight_kg"] = _format(kg)
+    return fields
+
+
+def extract_incident_details(text: str, today: date) -> Dict[str, str]:
+    """Fields of ask_farmer_health_log's incident_details that can be read without the LLM"""
+    lowered = text.lower()
+    fields = {}
+    moment = extract_date(lowered, today)
+    if moment is not None:
+        fields["incident_date"] = moment.strftime("%Y/%m/%d")
+    mortality = _mortality(lowered)
+    affected = mortality if mortality is not None else _first_number(AFFECTED, lowered)
+    if affected is None:
+        affected = _first_number(HEADS, lowered)
+    if affected is not None:
+        fields["affected_count"] = _format(affected)
+    if mortality is not None:
+        fields["incident_type"] = "mortality"
+    return fields
+
+
+EXTRACTORS = {
+    "report_details": extract_report_details,
+    "incident_details": extract_incident_details,
+}
+
+
+def extract_fields(form_key: str, text: str, today: Optional[date] = None) -> Dict[str, str]:
+    """Form fields read from the message by pattern, for the forms that have an extractor"""
+    extractor = EXTRACTORS.get(form_key)
+    if extractor is None:
+        return {}
+    return extractor(text, today or date.today())
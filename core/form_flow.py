@@ -0,0 +1,112 @@
+import re
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from config.config import get_form_flow_settings
+from core.classifier.intent_model import intent_metadata
+
+# Reserved form_data key holding the intent whose log form the conversation is filling.
+# It is not a form field: summaries, message metadata and on_complete only see form_fields().
+FLOW_KEY = "_flow"
+# Reserved form_data key listing fields read by pattern that wait for the user's yes (see core/form_completion.py)
+PENDING_KEY = "_pending"
+RESERVED_KEYS = {FLOW_KEY, PENDING_KEY}
+
+# Explicit "drop this form" replies; the conversation's form is cleared
+CANCEL_PATTERN = re.compile(
+    r"^(?:cancel|stop|never ?mind|nvm|wag na|huwag na|ayoko na|tama na|hindi ko na itutuloy)\b"
+    r"|\b(?:cancel (?:the|this|my|ko|na)|forget it|start over|ibang tanong|kalimutan mo na)\b"
+)
+# Questions carry no number, unlike answers to the form ("is 50 ok?" stays in the flow)
+QUESTION_START = re.compile(
+    r"^(?:what|how|why|when|which|where|can|should|is|are|do|does|ano|anong|paano|bakit|kailan|saan|pwede|puwede|magkano|gaano)\b"
+)
+
+
+def form_fields(form_data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    return {key: value for key, value in (form_data or {}).items() if key not in RESERVED_KEYS}
+
+
+def active_flow(form_data: Optional[Dict[str, Any]]) -> Optional[int]:
+    flow = (form_data or {}).get(FLOW_KEY)
+    return int(flow) if flow is not None else None
+
+
+def mark_flow(form_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Record the current turn's intent as the form's flow, so follow-ups skip classification"""
+    intent_id = intent_metadata().get("intent_id")
+    if intent_id:
+        form_data[FLOW_KEY] = intent_id
+    return form_data
+
+
+def _minutes_since(timestamp: Optional[str]) -> Optional[float]:
+    if not timestamp:
+        return None
+    try:
+        moment = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return (datetime.now(timezone.utc) - moment).total_seconds() / 60
+
+
+def abandon_reason(prompt: str, last_message_at: Optional[str], ttl_minutes: float) -> Optional[str]:
+    """Cheap local signal that the user left the form: "cancel", "question", "stale" or None"""
+    lowered = prompt.lower().strip()
+    if CANCEL_PATTERN.search(lowered):
+        return "cancel"
+    if ("?" in lowered or QUESTION_START.match(lowered)) and not re.search(r"\d", lowered):
+        return "question"
+    idle = _minutes_since(last_message_at)
+    if idle is not None and idle > ttl_minutes:
+        return "stale"
+    return None
+
+
+class FormFlowStats:
+    """Per role: turns routed back to the form's handler, and why the others were reclassified"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts: Dict[str, Counter] = {}
+
+    def record(self, role: str, outcome: str):
+        with self._lock:
+            self.counts.setdefault(role, Counter())[outcome] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            result = {}
+            for role, counts in self.counts.items():
+                total = sum(counts.values())
+                result[role] = {**counts, "resumed_ratio": round(counts["resumed"] / total, 3) if total else None}
+            return result
+
+
+form_flow_stats = FormFlowStats()
+
+
+async def resume_flow(chat, chat_id: int, prompt: str, role: str) -> Optional[int]:
+    """Intent of the form this conversation is filling, or None when the turn should be classified.
+
+    A cancel reply clears the form. Questions and stale forms are only
+    reclassified: the form stays, so the user can pick it up again.
+    """
+    settings = get_form_flow_settings()
+    if not settings["enabled"]:
+        return None
+    conversation = await chat.get_conversations_record(chat_id) or {}
+    form_data = conversation.get("form_data") or {}
+    flow = active_flow(form_data)
+    if flow is None:
+        return None
+
+    reason = abandon_reason(prompt, conversation.get("last_message_at"), settings["ttl_minutes"])
+    form_flow_stats.record(role, reason or "resumed")
+    if reason == "cancel":
+        await chat.update_conversation(chat_id, None)
+    return None if reason else flow
@@ -2,52 +2,52 @@ import re
 import json
 from datetime import datetime
 
-from config.config import get_gpt_model, get_gpt_client
-from core.chat_core import Chat
-from core.company_core import Company
+from fastapi.concurrency import run_in_threadpool
+
+from config.config import get_async_data_client, get_data_client
+from core.chat_core import AsyncChat, Chat
+from core.company_core import AsyncCompany, Company
 from core.faq_core import Faq
+from core.form_flow import form_fields, mark_flow
+from core.llm_common import call_openai_async, detect_conversation_language_async, detect_language_local
+from core.message_store import store_message_faq_async
+from core.prompt_assembly import build_messages
+from core.prompt_registry import get_prompt
 from core.farmer_core import Farmer
 from core.salesrep_core import SalesRep
-
-client = get_gpt_client()
-gptModel = get_gpt_model()
+from core.step_executor import StepExecutor
+from llm.llm_gateway import llm_gateway
 
 
 def load_prompt(file_path):
-    with open(file_path, "r", encoding="utf-8") as file:
-        return file.read()
+    return get_prompt(file_path).instruction
 
 
 def load_functions(file_path):
-    with open(file_path, "r", encoding="utf-8") as file:
-        return json.load(file)
+    return get_prompt(file_path).functions
 
 def detect_language(prompt):
+  local_language = detect_language_local(prompt)
+  if local_language:
+    return local_language
+
   # detect language
-  system_instruction_language = load_prompt("prompts/language_detector.txt")
-  functions_language = load_functions("prompts/language_detector.json")
+  language_prompt = get_prompt("language_detector")
+  system_instruction_language = language_prompt.instruction
+  functions_language = language_prompt.functions
 
   messages = [
     {"role": "system", "content": system_instruction_language},
     {"role": "user", "content": prompt}
   ]
 
-  language = call_openai(messages, functions_language, "detect_language")
+  language = call_openai(messages, functions_language, "detect_language", prompt_key=language_prompt.key)
 
   return language.get("user_language")
 
 
-def call_openai(messages, functions, function_name):
-    response = client.chat.completions.create(
-        model=gptModel,
-        messages=messages,
-        functions=[functions],
-        function_call={"name": function_name}
-    )
-
-    # Extract the function call arguments as JSON
-    arguments = response.choices[0].message.function_call.arguments
-    return json.loads(arguments)
+def call_openai(messages, functions, function_name, cache=True, prompt_key=None):
+    return llm_gateway.call(messages, functions, function_name, cache, prompt_key=prompt_key)
 
 
 def extract_json(text):
@@ -62,33 +62,36 @@ def extract_json(text):
         raise ValueError(f"Invalid JSON response: {cleaned}")
 
 
-def store_message_faq(chat_id, prompt, response, category, user_company_id, metadata=None):
-    chat = Chat()
-    faq = Faq()
+def store_message_faq(chat_id, prompt, response, category, user_company_id, metadata=None, client=None):
+    client = client or get_data_client()
+    chat = Chat(client)
+    faq = Faq(client)
     chat.add_message(chat_id, "user", prompt, metadata)
     chat.add_message(chat_id, "model", response, metadata)
     faq.insert_faq(prompt, response, category, user_company_id)
 
 
 def handle_log(chat_id, user_id, prompt, prompt_file, form_key, function_name, on_complete):
-  chat = Chat()
-  farmer = Farmer()
-  company = Company()
+  client = get_data_client()
+  chat = Chat(client)
+  farmer = Farmer(client)
+  company = Company(client)
 
   print(user_id)
   # Get user company
   user_company_id = company.get_user_company(user_id)
   today = datetime.today().strftime("%Y/%m/%d")
 
-  system_instruction = load_prompt(f"{prompt_file}.txt")
-  functions = load_functions(f"{prompt_file}.json")
+  prompt_entry = get_prompt(prompt_file)
+  system_instruction = prompt_entry.instruction
+  functions = prompt_entry.functions
 
   convo_res = chat.get_conversations_record(chat_id)
   form_data = convo_res.get("form_data") or {}
 
   chat_history = chat.get_recent_messages(chat_id, get_max_messages())
   
-  form_summary = "\n".join([f"{k.replace('_', ' ').capitalize()}: {v}" for k, v in form_data.items() if v]) or "None yet"
+  form_summary = "\n".join([f"{k.replace('_', ' ').capitalize()}: {v}" for k, v in form_fields(form_data).items() if v]) or "None yet"
 
   chat_history.append({
     "role": "user",
@@ -98,79 +101,79 @@ def handle_log(chat_id, user_id, prompt, prompt_file, form_key, function_name, o
   messages = [
       {"role": "system", "content": system_instruction}] + chat_history
   # response_text = call_openai(messages)
-  parsed = call_openai(messages, functions, function_name)
+  parsed = call_openai(messages, functions, function_name, cache=False, prompt_key=prompt_entry.key)
 
   if form_key != "":
       new_fields = parsed.get(form_key, {})
       form_data.update({k: v for k, v in new_fields.items() if v})
 
-      chat.update_conversation(chat_id, form_data=form_data)
+      chat.update_conversation(chat_id, form_data=mark_flow(form_data))
 
       if parsed["next_action"] == "log_complete":
-          on_complete(farmer, user_id, form_data, parsed)
+          on_complete(farmer, user_id, form_fields(form_data), parsed)
           chat.update_conversation(chat_id, None)
 
   store_message_faq(chat_id, prompt, parsed["response"], parsed["log_type"], user_company_id,
-                    metadata={"form_data": form_data, "next_action": parsed["next_action"]})
+                    metadata={"form_data": form_fields(form_data), "next_action": parsed["next_action"]}, client=client)
   return parsed
 
 
-def handle_log_sales(chat_id, user_id, prompt, prompt_file, form_key, function_name, on_complete):
-  chat = Chat()
-  salesrep = SalesRep()
-  company = Company()
+async def handle_log_sales_async(chat_id, user_id, prompt, prompt_file, form_key, function_name, on_complete, language=None):
+  """One turn of a sales rep log form; `on_complete` still runs on a sync SalesRep in a worker thread"""
+  client = get_async_data_client()
+  chat = AsyncChat(client)
+  company = AsyncCompany(client)
 
-  # Get user company
-  user_company_id = company.get_user_company(user_id)
   today = datetime.today().strftime("%Y/%m/%d")
 
-  system_instruction = load_prompt(f"{prompt_file}.txt")
-  functions = load_functions(f"{prompt_file}.json")
-
-  convo_res = chat.get_conversations_record(chat_id)
-  form_data = convo_res.get("form_data") or {}
-
-  chat_history = chat.get_recent_messages(chat_id, get_max_messages())
+  prompt_entry = get_prompt(prompt_file)
+  system_instruction = prompt_entry.instruction
+  functions = prompt_entry.functions
+
+  steps = StepExecutor("handle_log_sales")
+  steps.add("company", lambda: company.get_user_company(user_id))
+  steps.add("conversation", lambda: chat.get_conversations_record(chat_id))
+  steps.add("history", lambda: chat.get_recent_messages(chat_id, get_max_messages()))
+  steps.add("language", lambda: detect_conversation_language_async(chat_id, prompt, language))
+  results = await steps.run()
+
+  user_company_id = results["company"]
+  form_data = results["conversation"].get("form_data") or {}
+  chat_history = results["history"]
+  detected_language = results["language"]
   form_summary = "\n".join(
-      [f"{k.replace('_', ' ').capitalize()}: {v}"for k, v in form_data.items() if v]) or "None yet"
-
-  chat_history.append({
-    "role": "user",
-    "content": f"{prompt}\n\nToday’s date is {today}. \n\n(Previously collected info):\n{form_summary}"
-  })
-
-  detected_language = detect_language(prompt)
-
-  chat_history.append({
-      "role": "system", 
-      "content": f" Strictly follow this language: {detected_language} when responding." + system_instruction 
-  })
-
-  messages = chat_history
-
-  parsed = call_openai(messages, functions, function_name)  
+      [f"{k.replace('_', ' ').capitalize()}: {v}"for k, v in form_fields(form_data).items() if v]) or "None yet"
+
+  messages = build_messages(
+    system_instruction, chat_history,
+    f"{prompt}\n\nToday’s date is {today}. \n\n(Previously collected info):\n{form_summary}",
+    f"Strictly follow this language: {detected_language} when responding.")
+  parsed = await call_openai_async(
+    messages, functions, function_name, stream_response=True, cache=False, prompt_key=prompt_entry.key)
   new_fields = parsed.get(form_key, {})
   form_data.update({k: v for k, v in new_fields.items() if v})
 
-  chat.update_conversation(chat_id, form_data=form_data)
-  store_message_faq(chat_id, prompt, parsed["response"], parsed["log_type"], user_company_id,
-                    metadata={"form_data": form_data, "next_action": parsed["next_action"]})
+  # The form's intent is kept with it, so follow-up turns skip classification
+  await chat.update_conversation(chat_id, form_data=mark_flow(form_data))
+  await store_message_faq_async(chat_id, prompt, parsed["response"], parsed["log_type"], user_company_id,
+                                metadata={"form_data": form_fields(form_data), "next_action": parsed["next_action"]}, client=client)
 
-  if parsed["next_action"] == "log_complete":    
-    on_complete(salesrep, user_id, form_data, parsed)
-    chat.update_conversation(chat_id, None)
+  if parsed["next_action"] == "log_complete":
+    await run_in_threadpool(on_complete, SalesRep(), user_id, form_fields(form_data), parsed)
+    await chat.update_conversation(chat_id, None)
 
   return parsed
 
 
 def handle_intent(prompt, prompt_file, function_name):
-  system_instruction = load_prompt(f"{prompt_file}.txt")
-  functions = load_functions(f"{prompt_file}.json")
+  prompt_entry = get_prompt(prompt_file)
+  system_instruction = prompt_entry.instruction
+  functions = prompt_entry.functions
   messages = [
     {"role": "system", "content": system_instruction},
     {"role": "user", "content": prompt}
   ]
-  parsed = call_openai(messages, functions, function_name)
+  parsed = call_openai(messages, functions, function_name, prompt_key=prompt_entry.key)
   return parsed
 
 
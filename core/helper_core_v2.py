@@ -3,59 +3,34 @@ import json
 from datetime import datetime
 from typing import Any, Dict, Optional
 
-from config.config import get_gpt_model, get_gpt_client
-from core.chat_core import Chat
+from fastapi.concurrency import run_in_threadpool
+
+from config.config import get_async_data_client
+from core.chat_core import AsyncChat
+from core.chat_stream import response_stream
 from core.classifier.prompt_classifier import PromptClassifier
-from core.company_core import Company
+from core.company_core import AsyncCompany
 from core.contexts.context_manager import ContextManager
-from core.faq_core import Faq
+from core.form_completion import completion_stats, local_completion
+from core.form_extract import extract_fields
+from core.form_flow import form_fields, mark_flow
 from core.farmer_core import Farmer
-from core.farmer_core_v2 import FarmerV2
+from core.farmer_core_v2 import AsyncFarmerV2, FarmerV2
+from core.llm_common import call_openai_async, detect_conversation_language_async
+from core.message_store import store_message_faq_async
+from core.prompt_assembly import answer_in, build_messages
+from core.prompt_registry import get_prompt
 from core.salesrep_core import SalesRep
+from core.step_executor import StepExecutor
 from exceptions.global_exception import GlobalException
 
-client = get_gpt_client()
-gptModel = get_gpt_model()
-
 
 def load_prompt(file_path):
-    with open(file_path, "r", encoding="utf-8") as file:
-        return file.read()
+    return get_prompt(file_path).instruction
 
 
 def load_functions(file_path):
-    with open(file_path, "r", encoding="utf-8") as file:
-        return json.load(file)
-
-
-def detect_language(prompt):
-    # detect language
-    system_instruction_language = load_prompt("prompts/language_detector.txt")
-    functions_language = load_functions("prompts/language_detector.json")
-
-    messages = [
-        {"role": "system", "content": system_instruction_language},
-        {"role": "user", "content": prompt}
-    ]
-
-    language = call_openai(messages, functions_language, "detect_language")
-
-    return language.get("user_language")
-
-
-def call_openai(messages, functions, function_name):
-
-    response = client.chat.completions.create(
-        model=gptModel,
-        messages=messages,
-        functions=[functions],
-        function_call={"name": function_name}
-    )
-
-    # Extract the function call arguments as JSON
-    arguments = response.choices[0].message.function_call.arguments
-
-    return json.loads(arguments)
+    return get_prompt(file_path).functions
 
 
 def extract_json(text):
@@ -70,15 +45,7 @@ def extract_json(text):
         raise ValueError(f"Invalid JSON response: {cleaned}")
 
 
-def store_message_faq(chat_id, prompt, response, category, user_company_id=None, metadata=None):
-    chat = Chat()
-    faq = Faq()
-    chat.add_message(chat_id, "user", prompt, metadata)
-    chat.add_message(chat_id, "model", response, metadata)
-    faq.insert_faq(prompt, response, category, user_company_id)
-
-
-def handle_log(
+async def handle_log_async(
     chat_id,
     user_id,
     prompt,
@@ -86,82 +53,111 @@ def handle_log(
     form_key,
     function_name,
     on_complete,
-    context_types: Optional[list] = None
+    context_types: Optional[list] = None,
+    language: Optional[str] = None
 ):
-
-    chat = Chat()
-    farmer = FarmerV2()
-    company = Company()
-
-    # Check if user has active feed program first
-    try:
-        active_program = farmer.get_active_feed_program(user_id)
-        has_active_program = True
-    except GlobalException:
-        has_active_program = False
-        # Return graceful response if no active program
-        return handle_no_active_program_response(prompt, form_key)
-
-    # Get user company
-    user_company_id = company.get_user_company(user_id)
+    """One turn of a farmer log form (health incident, performance report).
+
+    Every read, LLM call and message write is awaited on the async clients.
+    `on_complete` keeps its sync signature and runs in a worker thread, since
+    it only fires on the turn that finalises a form. `language` is passed when
+    the intent call already detected it; otherwise the conversation's earlier
+    language is reused unless the user appears to have switched.
+    """
+    client = get_async_data_client()
+    chat = AsyncChat(client)
+    farmer = AsyncFarmerV2(client)
+    company = AsyncCompany(client)
     today = datetime.today().strftime("%Y/%m/%d")
 
-    # Initialize context system
-    context_manager = ContextManager()
+    context_manager = ContextManager(async_client=client)
     classifier = PromptClassifier(context_manager)
 
-    convo_res = chat.get_conversations_record(chat_id)
-    form_data = convo_res.get("form_data") or {}
-
-    chat_history = chat.get_recent_messages(chat_id, get_max_messages())
-
-    if context_types:
-        classification_result = classifier.get_specific_contexts(
-            user_id, context_types
-        )
-
-    # Load system instruction for ai and also the function that will be used by ai to populate form
-    system_instruction = load_prompt(f"{prompt_file}.txt")
-    functions = load_functions(f"{prompt_file}.json")
+    async def get_contexts():
+        if not context_types:
+            return {"needs_context": False}
+        return await classifier.get_specific_contexts_async(user_id, context_types)
+
+    # None of these depend on each other, so the turn waits for the slowest one only.
+    # A missing active program cancels the rest and returns the canned response.
+    steps = StepExecutor("handle_log")
+    steps.add("active_program", lambda: farmer.get_active_feed_program(user_id))
+    steps.add("company", lambda: company.get_user_company(user_id))
+    steps.add("conversation", lambda: chat.get_conversations_record(chat_id))
+    steps.add("history", lambda: chat.get_recent_messages(chat_id, get_max_messages()))
+    steps.add("context", get_contexts)
+    steps.add("language", lambda: detect_conversation_language_async(chat_id, prompt, language))
+    try:
+        results = await steps.run()
+    except GlobalException:
+        if steps.failed_step == "active_program":
+            return handle_no_active_program_response(prompt, form_key)
+        raise
+
+    active_program = results["active_program"]
+    user_company_id = results["company"]
+    form_data = results["conversation"].get("form_data") or {}
+    chat_history = results["history"]
+    classification_result = results["context"]
+    detected_language = results["language"]
+    extracted = extract_fields(form_key, prompt)
+
+    prompt_entry = get_prompt(prompt_file)
+    system_instruction = prompt_entry.instruction
+    functions = prompt_entry.functions
+
+    # A short answer that fills the form's last required fields is read back, and a yes to that, or to a
+    # form that was already complete, logs it without the LLM
+    parsed = local_completion(prompt, functions, form_key, form_data, extracted, detected_language)
+    if parsed is not None and parsed["next_action"] == "log_complete":
+        if await run_in_threadpool(on_complete, FarmerV2(), user_id, user_company_id, parsed[form_key], parsed):
+            completion_stats.record(function_name, "local")
+            await chat.update_conversation(chat_id, None)
+        else:
+            parsed = None
+    elif parsed is not None:
+        completion_stats.record(function_name, "read_back")
+        await chat.update_conversation(chat_id, form_data=mark_flow(form_data))
+    if parsed is not None:
+        queue = response_stream.get()
+        if queue is not None:
+            queue.put_nowait(parsed["response"])
+        await store_message_faq_async(chat_id, prompt, parsed["response"], parsed["log_type"], user_company_id,
+                                      metadata={"form_data": parsed[form_key], "extracted": extracted, "next_action": parsed["next_action"], "completed_locally": parsed["completed_locally"], "feed_program_id": active_program.get("id")},
+                                      client=client)
+        return parsed
 
-    # Build comprehensive context for logging
     logging_context = build_logging_context(
         classification_result,
         form_data,
-        today
+        today,
+        extracted
     )
+    # Values read by pattern only fill gaps; the LLM's reply below may still correct them
+    for field, value in extracted.items():
+        form_data.setdefault(field, value)
 
-    # Build user message with intelligent context
-    user_message = f"{prompt}\n\n{logging_context}"
+    messages = build_messages(
+        system_instruction, chat_history, f"{prompt}\n\n{logging_context}", answer_in(detected_language))
+    parsed = await call_openai_async(
+        messages, functions, function_name, stream_response=True, cache=False, prompt_key=prompt_entry.key)
 
-    chat_history.append({
-        "role": "user",
-        "content": user_message
-    })
-
-    detected_language = detect_language(prompt)
-    chat_history.append({
-        "role": "system",
-        "content": f"Always answer in {detected_language}.\n{system_instruction}"
-    })
-
-    messages = chat_history
-    parsed = call_openai(messages, functions, function_name)
-
-    # Handle form data updates
     if form_key != "":
         new_fields = parsed.get(form_key, {})
         form_data.update({k: v for k, v in new_fields.items() if v})
-        chat.update_conversation(chat_id, form_data=form_data)
+        # The form's intent is kept with it, so follow-up turns skip classification
+        await chat.update_conversation(chat_id, form_data=mark_flow(form_data))
 
         if parsed["next_action"] == "log_complete":
-            success = on_complete(
-                farmer, user_id, user_company_id, form_data, parsed)
+            success = await run_in_threadpool(
+                on_complete, FarmerV2(), user_id, user_company_id, form_fields(form_data), parsed)
             if success:
-                chat.update_conversation(chat_id, None)
+                completion_stats.record(function_name, "llm")
+                await chat.update_conversation(chat_id, None)
 
-    store_message_faq(chat_id, prompt, parsed["response"], parsed["log_type"], user_company_id,
-                      metadata={"form_data": form_data, "next_action": parsed["next_action"], "feed_program_id": active_program.get("id") if has_active_program else None})
+    await store_message_faq_async(chat_id, prompt, parsed["response"], parsed["log_type"], user_company_id,
+                                  metadata={"form_data": form_fields(form_data), "extracted": extracted, "next_action": parsed["next_action"], "feed_program_id": active_program.get("id")},
+                                  client=client)
 
     return parsed
 
@@ -170,6 +166,7 @@ def build_logging_context(
     classification_result: Dict[str, Any],
     form_data: Dict[str, Any],
     today: str,
+    extracted: Optional[Dict[str, str]] = None,
 ) -> str:
     """Build comprehensive context for logging operations"""
 
@@ -181,22 +178,62 @@ def build_logging_context(
     # Add previously collected information
     form_summary = "\n".join([
         f"{k.replace('_', ' ').capitalize()}: {v}"
-        for k, v in form_data.items() if v
+        for k, v in form_fields(form_data).items() if v
     ]) or "None yet"
 
     context_parts.append(f"Previously collected info:\n{form_summary}")
 
+    if extracted:
+        extracted_summary = "\n".join(f"{k.replace('_', ' ').capitalize()}: {v}" for k, v in extracted.items())
+        context_parts.append(f"Read from this message (correct them if the message says otherwise):\n{extracted_summary}")
+
     return "\n\n".join(context_parts)
 
-def handle_intent(prompt, prompt_file, function_name):
-    system_instruction = load_prompt(f"{prompt_file}.txt")
-    functions = load_functions(f"{prompt_file}.json")
+async def handle_intent_async(prompt, prompt_file, function_name):
+    prompt_entry = get_prompt(prompt_file)
+    system_instruction = prompt_entry.instruction
+    functions = prompt_entry.functions
     messages = [
         {"role": "system", "content": system_instruction},
         {"role": "user", "content": prompt}
     ]
-    parsed = call_openai(messages, functions, function_name)
-    return parsed
+    return await call_openai_async(messages, functions, function_name, prompt_key=prompt_entry.key)
+
+
+def build_intent_language_functions(intent_functions, language_functions):
+    """Merges an intent schema with the language detector schema into one function"""
+    intent_parameters = intent_functions["parameters"]
+    language_parameters = language_functions["parameters"]
+    return {
+        "name": f"{intent_functions['name']}_and_language",
+        "description": f"{intent_functions['description']} Also {language_functions['description'][0].lower()}{language_functions['description'][1:]}.",
+        "parameters": {
+            "type": "object",
+            "properties": {**intent_parameters["properties"], **language_parameters["properties"]},
+            "required": intent_parameters["required"] + language_parameters["required"],
+        },
+    }
+
+
+async def handle_intent_language_async(prompt, prompt_file):
+    """Classifies intent and detects the user language in a single call.
+
+    Returns the intent fields plus `user_language`, so the handler chosen by
+    the intent can skip its own detect_language round trip.
+    """
+    intent_prompt = get_prompt(prompt_file)
+    language_prompt = get_prompt("language_detector")
+    functions = build_intent_language_functions(intent_prompt.functions, language_prompt.functions)
+    system_instruction = (
+        intent_prompt.instruction
+        + "\n\nAlso classify the language of the user's prompt into user_language.\n"
+        + language_prompt.instruction
+    )
+    messages = [
+        {"role": "system", "content": system_instruction},
+        {"role": "user", "content": prompt}
+    ]
+    return await call_openai_async(messages, functions, functions["name"], prompt_key=intent_prompt.key)
 
 
 def get_max_messages():
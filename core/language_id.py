@@ -0,0 +1,136 @@
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+LANGUAGE_MODEL_PATH = os.path.join("data", "language_model.json")
+
+_whitespace = re.compile(r"\s+")
+_strip = re.compile(r"[^\w\s']", re.UNICODE)
+
+
+def normalize(text: str) -> str:
+    text = _strip.sub(" ", text.lower())
+    return _whitespace.sub(" ", text).strip()
+
+
+def char_ngrams(text: str, orders: Iterable[int] = (1, 2, 3)) -> Counter:
+    """Character n-grams of each word, padded with spaces so word boundaries count"""
+    grams = Counter()
+    for word in normalize(text).split(" "):
+        if not word:
+            continue
+        padded = f" {word} "
+        for n in orders:
+            for i in range(len(padded) - n + 1):
+                grams[padded[i:i + n]] += 1
+    return grams
+
+
+class LanguageIdentifier:
+    """Multinomial naive Bayes over character n-grams.
+
+    The model file is produced offline by scripts/train_language_model.py and
+    holds per-language n-gram log probabilities, an unseen-gram floor per
+    language and the priors. `identify()` returns the best language with a
+    confidence in [0, 1]; callers fall back to the LLM detector below the
+    language's threshold. `thresholds` are calibrated per language by
+    cross-validation at training time; a language without one is never
+    answered locally.
+    """
+
+    def __init__(self, model: Dict):
+        self.orders = tuple(model["orders"])
+        self.languages: List[str] = model["languages"]
+        self.priors: Dict[str, float] = model["priors"]
+        self.unseen: Dict[str, float] = model["unseen"]
+        self.log_probs: Dict[str, Dict[str, float]] = model["log_probs"]
+        # Posteriors are computed on the per-n-gram mean log likelihood times this factor
+        self.scale: float = model.get("scale", 8.0)
+        self.min_chars: int = model.get("min_chars", 4)
+        self.thresholds: Dict[str, float] = model.get("thresholds", {})
+        self.calibration: Dict = model.get("calibration", {})
+
+    @classmethod
+    def load(cls, path: str = LANGUAGE_MODEL_PATH) -> "LanguageIdentifier":
+        with open(path, "r", encoding="utf-8") as file:
+            return cls(json.load(file))
+
+    def scores(self, text: str) -> Dict[str, float]:
+        grams = char_ngrams(text, self.orders)
+        total = sum(grams.values())
+        if not total:
+            return {}
+        scores = {}
+        for language in self.languages:
+            table = self.log_probs[language]
+            floor = self.unseen[language]
+            likelihood = sum(count * table.get(gram, floor) for gram, count in grams.items())
+            scores[language] = self.scale * likelihood / total + self.priors[language]
+        return scores
+
+    def threshold(self, language: Optional[str], override: Optional[float] = None) -> Optional[float]:
+        """Confidence `language` needs to be answered locally; None when it never is"""
+        if language is None:
+            return None
+        return override if override is not None else self.thresholds.get(language)
+
+    def identify(self, text: str) -> Tuple[Optional[str], float]:
+        """Return (language, confidence); (None, 0.0) when the text is too short to judge"""
+        if len(normalize(text)) < self.min_chars:
+            return None, 0.0
+        scores = self.scores(text)
+        if not scores:
+            return None, 0.0
+        best = max(scores, key=scores.get)
+        top = scores[best]
+        total = sum(math.exp(score - top) for score in scores.values())
+        return best, round(1.0 / total, 4)
+
+
+class LanguageIdStats:
+    """How often the local identifier was confident enough to skip the LLM detector"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.local = 0
+        self.fallback = 0
+
+    def record(self, confident: bool):
+        with self._lock:
+            if confident:
+                self.local += 1
+            else:
+                self.fallback += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        total = self.local + self.fallback
+        return {
+            "local": self.local,
+            "llm_fallback": self.fallback,
+            "local_ratio": round(self.local / total, 3) if total else None,
+        }
+
+
+language_id_stats = LanguageIdStats()
+
+_identifier: Optional[LanguageIdentifier] = None
+_identifier_lock = threading.Lock()
+_identifier_failed = False
+
+
+def get_language_identifier(path: str = LANGUAGE_MODEL_PATH) -> Optional[LanguageIdentifier]:
+    """Process-wide identifier, loaded on first use; None if the model file is missing"""
+    global _identifier, _identifier_failed
+    if _identifier is None and not _identifier_failed:
+        with _identifier_lock:
+            if _identifier is None and not _identifier_failed:
+                try:
+                    _identifier = LanguageIdentifier.load(path)
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"Language model not loaded, using the LLM detector only: {e}")
+                    _identifier_failed = True
+    return _identifier
@@ -0,0 +1,111 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from config.config import get_language_memo_settings
+from core.language_id import normalize
+
+# Function words are enough to tell whether a message leans English, Tagalog or Visayan
+ENGLISH_WORDS = {
+    "the", "a", "an", "is", "are", "was", "were", "my", "i", "you", "we", "they", "it", "of",
+    "to", "and", "in", "on", "for", "with", "this", "that", "what", "how", "when", "can",
+    "do", "does", "have", "has", "not", "be", "will", "should", "please", "today",
+}
+TAGALOG_WORDS = {
+    "ang", "ng", "mga", "sa", "ako", "ko", "mo", "po", "ba", "na", "pa", "ay", "hindi",
+    "yung", "kasi", "dahil", "para", "namin", "kami", "sila", "nila", "ito", "iyan",
+    "may", "ano", "paano", "kailan", "lang", "din", "rin", "ngayon", "kahapon",
+}
+VISAYAN_WORDS = {
+    "ang", "sa", "og", "ug", "nga", "ko", "nako", "akong", "ka", "kay", "dili", "wala",
+    "naa", "unsa", "unsaon", "pila", "kanus-a", "karon", "gahapon", "ni", "si", "mi",
+    "kaayo", "pud", "sab", "lang", "ra", "man", "niya", "ila", "ilang", "ta",
+}
+
+MIN_SIGNAL_WORDS = 2
+
+
+def language_signal(text: str) -> Optional[str]:
+    """Cheap guess at which language family a message leans to, from script and function words.
+
+    Returns None when the message is too short to say (e.g. "3", "oo", "kahapon"),
+    which is most form-filling replies.
+    """
+    if any(char.isalpha() and ord(char) > 0x24F for char in text):
+        return "other_script"
+
+    words = normalize(text).split(" ")
+    english = sum(word in ENGLISH_WORDS for word in words)
+    tagalog = sum(word in TAGALOG_WORDS for word in words)
+    visayan = sum(word in VISAYAN_WORDS for word in words)
+    local, local_hits = ("visayan", visayan) if visayan > tagalog else ("tagalog", tagalog)
+    if english + local_hits < MIN_SIGNAL_WORDS:
+        return None
+
+    english_share = english / (english + local_hits)
+    if english_share >= 0.8:
+        return "english"
+    if english_share <= 0.2:
+        return local
+    return f"{local}_mixed"
+
+
+class LanguageMemo:
+    """Language detected per conversation, reused until the local signal says the user switched.
+
+    Entries expire after `ttl_seconds` because a user keeps one conversation
+    row across sessions; the oldest entries are evicted past `max_entries`.
+    """
+
+    def __init__(self, ttl_seconds: float = 1800, max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, Tuple[str, Optional[str], float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.drifts = 0
+
+    def get(self, conversation_id: int, prompt: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(conversation_id)
+            if entry is None or entry[2] < time.monotonic():
+                self.misses += 1
+                return None
+            language, signal, _ = entry
+            current = language_signal(prompt)
+            # An entry remembered from a short reply has no signal yet; confirm it on the first real sentence
+            if current is not None and current != signal:
+                self.drifts += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(conversation_id)
+            return language
+
+    def remember(self, conversation_id: int, prompt: str, language: Optional[str]):
+        if not language:
+            return
+        with self._lock:
+            signal = language_signal(prompt)
+            previous = self._entries.get(conversation_id)
+            if signal is None and previous is not None and previous[0] == language:
+                signal = previous[1]
+            self._entries[conversation_id] = (language, signal, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(conversation_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses + self.drifts
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "drifts": self.drifts,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+        }
+
+
+_settings = get_language_memo_settings()
+language_memo = LanguageMemo(_settings["ttl_seconds"], _settings["max_entries"])
@@ -0,0 +1,96 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.config import get_llm_cache_settings
+
+_whitespace = re.compile(r"\s+")
+
+
+def normalize_messages(messages: List[Dict[str, Any]]) -> List[Tuple[str, str]]:
+    """Role and content only, whitespace collapsed; user text is case-folded ("Hello" == "hello ")"""
+    normalized = []
+    for message in messages:
+        content = _whitespace.sub(" ", str(message.get("content") or "")).strip()
+        if message.get("role") == "user":
+            content = content.casefold()
+        normalized.append((message.get("role"), content))
+    return normalized
+
+
+def cache_key(model: str, functions: Dict[str, Any], function_name: str, messages: List[Dict[str, Any]]) -> str:
+    payload = json.dumps(
+        [model, functions, function_name, normalize_messages(messages)],
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """Content-addressed LRU of parsed function-call results.
+
+    Only functions with a positive TTL are cached (see LLM_CACHE_TTLS), so
+    calls whose messages carry chat history, per-user context or dates are
+    never cached unless configured; callers can also pass cache=False.
+    Values are stored as JSON and parsed on every hit, so callers may mutate
+    what they get back.
+    """
+
+    def __init__(self, max_entries: int = 5000, ttls: Optional[Dict[str, float]] = None, default_ttl: float = 0):
+        self.max_entries = max_entries
+        self.ttls = ttls or {}
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    def ttl_for(self, function_name: str) -> float:
+        return self.ttls.get(function_name, self.default_ttl)
+
+    def _count(self, function_name: str, outcome: str):
+        counters = self._counters.setdefault(function_name, {"hits": 0, "misses": 0})
+        counters[outcome] += 1
+
+    def get(self, key: str, function_name: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] < time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self._count(function_name, "misses")
+                return None
+            self._entries.move_to_end(key)
+            self._count(function_name, "hits")
+        return json.loads(entry[0])
+
+    def set(self, key: str, function_name: str, value: Dict[str, Any]):
+        ttl = self.ttl_for(function_name)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (json.dumps(value, ensure_ascii=False), time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            functions = {}
+            for name, counters in self._counters.items():
+                lookups = counters["hits"] + counters["misses"]
+                functions[name] = {**counters, "hit_ratio": round(counters["hits"] / lookups, 3) if lookups else None}
+            return {"entries": len(self._entries), "max_entries": self.max_entries, "functions": functions}
+
+
+_settings = get_llm_cache_settings()
+llm_cache = LLMResponseCache(_settings["max_entries"], _settings["ttls"], _settings["default_ttl"])
+
+
+def cache_enabled(function_name: str, cache: bool = True) -> bool:
+    return cache and _settings["enabled"] and llm_cache.ttl_for(function_name) > 0
@@ -0,0 +1,87 @@
+from typing import Optional
+
+from config.config import get_language_id_settings
+from core.chat_stream import response_stream
+from core.language_id import get_language_identifier, language_id_stats
+from core.language_memo import language_memo
+from core.prompt_registry import get_prompt
+from llm.llm_gateway import llm_gateway
+
+
+def detect_language_local(prompt) -> Optional[str]:
+    """Language from the on-box identifier, or None when it is not confident enough"""
+    settings = get_language_id_settings()
+    if not settings["enabled"]:
+        return None
+    identifier = get_language_identifier(settings["model_path"])
+    if identifier is None:
+        return None
+    language, confidence = identifier.identify(prompt)
+    threshold = identifier.threshold(language, settings["threshold"])
+    confident = threshold is not None and confidence >= threshold
+    language_id_stats.record(confident)
+    return language if confident else None
+
+
+def detect_language(prompt):
+    return detect_language_local(prompt) or detect_language_llm(prompt)
+
+
+def detect_language_llm(prompt):
+    # detect language
+    language_prompt = get_prompt("language_detector")
+    system_instruction_language = language_prompt.instruction
+    functions_language = language_prompt.functions
+
+    messages = [
+        {"role": "system", "content": system_instruction_language},
+        {"role": "user", "content": prompt}
+    ]
+
+    language = call_openai(messages, functions_language, "detect_language", prompt_key=language_prompt.key)
+
+    return language.get("user_language")
+
+
+async def detect_language_async(prompt):
+    return detect_language_local(prompt) or await detect_language_llm_async(prompt)
+
+
+def detect_conversation_language(chat_id, prompt, language=None):
+    """detect_language, reusing the language already detected in this conversation"""
+    language = language or language_memo.get(chat_id, prompt) or detect_language(prompt)
+    language_memo.remember(chat_id, prompt, language)
+    return language
+
+
+async def detect_conversation_language_async(chat_id, prompt, language=None):
+    """Async detect_conversation_language; `language` is one already detected for this turn"""
+    language = language or language_memo.get(chat_id, prompt) or await detect_language_async(prompt)
+    language_memo.remember(chat_id, prompt, language)
+    return language
+
+
+async def detect_language_llm_async(prompt):
+    language_prompt = get_prompt("language_detector")
+    system_instruction_language = language_prompt.instruction
+    functions_language = language_prompt.functions
+
+    messages = [
+        {"role": "system", "content": system_instruction_language},
+        {"role": "user", "content": prompt}
+    ]
+
+    language = await call_openai_async(messages, functions_language, "detect_language", prompt_key=language_prompt.key)
+
+    return language.get("user_language")
+
+
+def call_openai(messages, functions, function_name, cache=True, prompt_key=None):
+    """Forced function call through the LLM gateway; `cache=False` opts out of the response cache (per-user context, dates)"""
+    return llm_gateway.call(messages, functions, function_name, cache, prompt_key=prompt_key)
+
+
+async def call_openai_async(messages, functions, function_name, stream_response=False, cache=True, prompt_key=None):
+    """Async call_openai. With `stream_response`, a streamed chat turn also gets the reply text as it is generated"""
+    queue = response_stream.get() if stream_response else None
+    return await llm_gateway.call_async(messages, functions, function_name, stream_to=queue, cache=cache, prompt_key=prompt_key)
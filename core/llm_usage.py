@@ -0,0 +1,197 @@
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from config.config import get_llm_usage_settings
+
+# Labels of the current chat turn (intent, company_id, ...). The dict is shared by every LLM
+# call of the turn and read when usage is aggregated, so a label set later in the turn
+# (the intent once classified, the company once looked up) still applies to earlier calls.
+usage_labels: ContextVar[Optional[Dict[str, Any]]] = ContextVar("llm_usage_labels", default=None)
+
+# Prompt key of the LLM call in flight, set by the gateway around each call
+current_prompt_key: ContextVar[Optional[str]] = ContextVar("llm_prompt_key", default=None)
+
+# Running token totals of one scope (e.g. a speculative branch of a turn), on top of the window
+usage_tally: ContextVar[Optional[Dict[str, Any]]] = ContextVar("llm_usage_tally", default=None)
+
+
+def start_usage_turn(**labels) -> Dict[str, Any]:
+    """Start labelling this chat turn's LLM calls; returns the (mutable) label dict"""
+    turn_labels = dict(labels)
+    usage_labels.set(turn_labels)
+    return turn_labels
+
+
+def start_usage_tally() -> Dict[str, Any]:
+    """Tally the tokens and cost of the LLM calls made from here on in this context"""
+    tally = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0}
+    usage_tally.set(tally)
+    return tally
+
+
+def label_usage(**labels):
+    turn_labels = usage_labels.get()
+    if turn_labels is not None:
+        turn_labels.update(labels)
+
+
+def label_usage_from(task, key: str):
+    """Label the turn with `task`'s result once it completes (failed lookups leave the label unset)"""
+    turn_labels = usage_labels.get()
+
+    def done(task):
+        if turn_labels is not None and not task.cancelled() and task.exception() is None:
+            turn_labels[key] = task.result()
+
+    task.add_done_callback(done)
+
+
+@dataclass(frozen=True)
+class UsageRecord:
+    function_name: str
+    prompt_key: str
+    model: str
+    prompt_tokens: int
+    cached_tokens: int
+    completion_tokens: int
+    wall_ms: float
+    cost_usd: Optional[float]
+    labels: Optional[Dict[str, Any]]
+    at: float
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class LLMUsage:
+    """Token, cost and latency of the most recent LLM calls, aggregated on demand.
+
+    Records are kept in a bounded window. Cost uses the per-model prices
+    (USD per 1M input / cached input / output tokens) from config. A call
+    whose prompt is larger than its function's token budget raises an alarm:
+    it is printed, counted and kept in the recent alarm list.
+    """
+
+    def __init__(self, settings: Dict[str, Any]):
+        self.settings = settings
+        self._lock = threading.Lock()
+        self._records = deque(maxlen=settings["window"])
+        self._alarms = deque(maxlen=20)
+        self.alarm_count = 0
+
+    def budget_for(self, function_name: str) -> int:
+        return self.settings["prompt_token_budgets"].get(function_name, self.settings["prompt_token_budget"])
+
+    def cost(self, model: str, prompt_tokens: int, cached_tokens: int, completion_tokens: int) -> Optional[float]:
+        prices = self.settings["prices"].get(model)
+        if prices is None:
+            return None
+        input_price, cached_price, output_price = prices
+        return round(((prompt_tokens - cached_tokens) * input_price
+                      + cached_tokens * cached_price
+                      + completion_tokens * output_price) / 1_000_000, 6)
+
+    def record(self, function_name: str, model: str, prompt_tokens: int, cached_tokens: int,
+               completion_tokens: int, wall_ms: float):
+        record = UsageRecord(
+            function_name=function_name,
+            prompt_key=current_prompt_key.get() or function_name,
+            model=model,
+            prompt_tokens=prompt_tokens,
+            cached_tokens=cached_tokens,
+            completion_tokens=completion_tokens,
+            wall_ms=wall_ms,
+            cost_usd=self.cost(model, prompt_tokens, cached_tokens, completion_tokens),
+            labels=usage_labels.get(),
+            at=time.time(),
+        )
+        tally = usage_tally.get()
+        if tally is not None:
+            tally["calls"] += 1
+            tally["prompt_tokens"] += prompt_tokens
+            tally["completion_tokens"] += completion_tokens
+            tally["cost_usd"] += record.cost_usd or 0.0
+        budget = self.budget_for(function_name)
+        with self._lock:
+            self._records.append(record)
+            if prompt_tokens > budget:
+                self.alarm_count += 1
+                self._alarms.append({
+                    "function": function_name, "prompt_key": record.prompt_key,
+                    "prompt_tokens": prompt_tokens, "budget": budget, "at": record.at,
+                })
+        if prompt_tokens > budget:
+            print(f"LLM prompt token budget exceeded: {record.prompt_key} ({function_name}) "
+                  f"sent {prompt_tokens} prompt tokens, budget {budget}")
+
+    @staticmethod
+    def _group_key(record: UsageRecord, group_by: str) -> str:
+        if group_by == "function":
+            return record.function_name
+        if group_by == "prompt":
+            return record.prompt_key
+        if group_by == "model":
+            return record.model
+        value = (record.labels or {}).get(group_by)
+        return "unlabelled" if value is None else str(value)
+
+    @staticmethod
+    def _summary(records: List[UsageRecord]) -> Dict[str, Any]:
+        wall = [record.wall_ms for record in records]
+        costs = [record.cost_usd for record in records if record.cost_usd is not None]
+        prompt_tokens = sum(record.prompt_tokens for record in records)
+        cached_tokens = sum(record.cached_tokens for record in records)
+        return {
+            "calls": len(records),
+            "p50_ms": round(percentile(wall, 0.50), 1),
+            "p95_ms": round(percentile(wall, 0.95), 1),
+            "p99_ms": round(percentile(wall, 0.99), 1),
+            "prompt_tokens": prompt_tokens,
+            "cached_tokens": cached_tokens,
+            "completion_tokens": sum(record.completion_tokens for record in records),
+            "mean_prompt_tokens": round(prompt_tokens / len(records), 1),
+            "max_prompt_tokens": max(record.prompt_tokens for record in records),
+            "cached_ratio": round(cached_tokens / prompt_tokens, 3) if prompt_tokens else None,
+            "cost_usd": round(sum(costs), 6) if costs else None,
+        }
+
+    def snapshot(self, group_by: List[str], company_id: Optional[int] = None) -> Dict[str, Any]:
+        with self._lock:
+            records = list(self._records)
+            alarms = list(self._alarms)
+            alarm_count = self.alarm_count
+        if company_id is not None:
+            records = [record for record in records if (record.labels or {}).get("company_id") == company_id]
+
+        groups: Dict[str, Any] = {}
+        for dimension in group_by:
+            grouped: Dict[str, List[UsageRecord]] = {}
+            for record in records:
+                grouped.setdefault(self._group_key(record, dimension), []).append(record)
+            groups[dimension] = {key: self._summary(items) for key, items in sorted(grouped.items())}
+
+        return {
+            "window": {
+                "records": len(records),
+                "since": records[0].at if records else None,
+            },
+            "total": self._summary(records) if records else None,
+            "groups": groups,
+            "budget_alarms": {
+                "count": alarm_count,
+                "default_budget": self.settings["prompt_token_budget"],
+                "budgets": self.settings["prompt_token_budgets"],
+                "recent": alarms,
+            },
+        }
+
+
+llm_usage = LLMUsage(get_llm_usage_settings())
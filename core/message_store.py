@@ -0,0 +1,24 @@
+from config.config import get_async_data_client, get_data_client
+from core.chat_core import AsyncChat, Chat
+from core.classifier.intent_model import intent_metadata
+from core.faq_core import AsyncFaq, Faq
+
+
+def store_message_faq(chat_id, prompt, response, category, user_company_id=None, metadata=None, client=None):
+    client = client or get_data_client()
+    chat = Chat(client)
+    faq = Faq(client)
+    # How the turn's intent was decided goes with the user message, for retraining the intent model
+    chat.add_message(chat_id, "user", prompt, {**(metadata or {}), **intent_metadata()})
+    chat.add_message(chat_id, "model", response, metadata)
+    faq.insert_faq(prompt, response, category, user_company_id)
+
+
+async def store_message_faq_async(chat_id, prompt, response, category, user_company_id=None, metadata=None, client=None, store_faq=True):
+    client = client or get_async_data_client()
+    chat = AsyncChat(client)
+    faq = AsyncFaq(client)
+    await chat.add_message(chat_id, "user", prompt, {**(metadata or {}), **intent_metadata()})
+    await chat.add_message(chat_id, "model", response, metadata)
+    if store_faq:
+        await faq.insert_faq(prompt, response, category, user_company_id)
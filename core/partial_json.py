@@ -0,0 +1,103 @@
+import json
+import re
+from typing import Optional
+
+# A trailing escape that may be cut off mid-sequence: "\", "\u", "\u00", or a
+# high surrogate "\ud83d" whose low half has not arrived yet
+_trailing_escape = re.compile(r"(\\+)(u[0-9a-fA-F]{0,3}|u[dD][89abAB][0-9a-fA-F]{2})?$")
+
+
+def _complete_prefix(raw: str) -> str:
+    """Longest prefix of an escaped JSON string body that decodes without splitting an escape"""
+    while True:
+        match = _trailing_escape.search(raw)
+        # Backslashes that pair up as "\\" are complete; whatever follows is plain text
+        if match is None or len(match.group(1)) % 2 == 0:
+            return raw
+        # Cutting a partial low surrogate can expose its high half, so check again
+        raw = raw[:match.end(1) - 1]
+
+
+class StringFieldStream:
+    """Pulls one top-level string field out of a JSON object that arrives in pieces.
+
+    Function-call arguments stream in as arbitrary fragments of a JSON object.
+    `feed()` takes the next fragment and returns whatever new text of the
+    field's value can already be decoded, so the value can be forwarded to
+    the user while the rest of the object is still being generated:
+
+        stream = StringFieldStream("response")
+        stream.feed('{"response": "Feed tw')  -> "Feed tw"
+        stream.feed('ice a day", "log_type"') -> "ice a day"
+    """
+
+    def __init__(self, field: str):
+        self.field = field
+        self.done = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._token = []
+        self._last_key: Optional[str] = None
+        self._expect_value = False
+        self._capturing = False
+        self._raw = []
+        self._emitted = 0
+
+    def feed(self, fragment: str) -> str:
+        if self.done or not fragment:
+            return ""
+        out = []
+        for char in fragment:
+            if self._capturing:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._capturing = False
+                    self.done = True
+                    out.append(self._decode("".join(self._raw)))
+                    break
+                self._raw.append(char)
+                continue
+            self._scan(char)
+        if self._capturing:
+            out.append(self._decode(_complete_prefix("".join(self._raw))))
+        return "".join(out)
+
+    def _scan(self, char: str):
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif char == "\\":
+                self._escape = True
+            elif char == '"':
+                self._in_string = False
+                if self._depth == 1 and not self._expect_value:
+                    self._last_key = "".join(self._token)
+                return
+            self._token.append(char)
+            return
+
+        if char == '"':
+            if self._depth == 1 and self._expect_value and self._last_key == self.field:
+                self._capturing = True
+                return
+            self._in_string = True
+            self._token = []
+        elif char in "{[":
+            self._depth += 1
+        elif char in "}]":
+            self._depth -= 1
+        elif char == ":" and self._depth == 1:
+            self._expect_value = True
+        elif char == "," and self._depth == 1:
+            self._expect_value = False
+            self._last_key = None
+
+    def _decode(self, raw: str) -> str:
+        text = json.loads(f'"{raw}"')
+        new = text[self._emitted:]
+        self._emitted = len(text)
+        return new
@@ -0,0 +1,27 @@
+from typing import Dict, List, Optional
+
+
+def build_messages(
+    instruction: str,
+    history: List[Dict[str, str]],
+    user_message: str,
+    directive: Optional[str] = None,
+) -> List[Dict[str, str]]:
+    """Chat messages ordered from most to least stable, so provider prompt caching can apply.
+
+    The static system instruction goes first (the function schema is sent
+    ahead of all messages by the API), then the conversation history, then
+    the per-turn `directive` (e.g. the reply language) and the user message.
+    Anything that varies per call must stay after the instruction or the
+    cached prefix is lost.
+    """
+    messages = [{"role": "system", "content": instruction}]
+    messages.extend(history)
+    if directive:
+        messages.append({"role": "system", "content": directive})
+    messages.append({"role": "user", "content": user_message})
+    return messages
+
+
+def answer_in(language: str) -> str:
+    return f"Always answer in {language}."
@@ -0,0 +1,136 @@
+import glob
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from config.config import get_prompt_reload
+
+PROMPTS_DIR = "prompts"
+
+
+@dataclass(frozen=True)
+class PromptEntry:
+    """A prompt's system instruction and function schema, loaded and validated once"""
+    key: str
+    instruction: Optional[str]
+    functions: Optional[Dict[str, Any]]
+    content_hash: str
+    mtimes: Tuple[float, float]
+
+    @property
+    def function_name(self) -> Optional[str]:
+        return self.functions["name"] if self.functions else None
+
+
+def key_for(name: str) -> str:
+    """Registry key for a key or a legacy path: "prompts/ask_farmer_log.txt" -> "ask_farmer_log" """
+    key = os.path.basename(name)
+    for suffix in (".txt", ".json"):
+        if key.endswith(suffix):
+            key = key[:-len(suffix)]
+    return key
+
+
+def validate_functions(functions: Any, path: str):
+    """Reject schemas the OpenAI function-calling API would refuse or that handlers cannot rely on"""
+    def fail(reason):
+        raise ValueError(f"Invalid function schema {path}: {reason}")
+
+    if not isinstance(functions, dict):
+        fail("expected an object")
+    if not isinstance(functions.get("name"), str) or not functions["name"]:
+        fail("missing 'name'")
+    parameters = functions.get("parameters")
+    if not isinstance(parameters, dict) or parameters.get("type") != "object":
+        fail("'parameters' must be an object schema")
+    properties = parameters.get("properties")
+    if not isinstance(properties, dict):
+        fail("'parameters.properties' must be an object")
+    missing = [field for field in parameters.get("required", []) if field not in properties]
+    if missing:
+        fail(f"required fields not in properties: {missing}")
+
+
+def _mtime(path: str) -> float:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0
+
+
+class PromptRegistry:
+    """Every prompts/<key>.txt / <key>.json pair, read, parsed and validated once per process.
+
+    With `reload=True` (development) each lookup stats the two files and
+    reloads the entry when either mtime changed.
+    """
+
+    def __init__(self, prompts_dir: str = PROMPTS_DIR, reload: bool = False):
+        self.prompts_dir = prompts_dir
+        self.reload = reload
+        self._lock = threading.Lock()
+        self._entries: Dict[str, PromptEntry] = {}
+
+    def _paths(self, key: str) -> Tuple[str, str]:
+        base = os.path.join(self.prompts_dir, key)
+        return f"{base}.txt", f"{base}.json"
+
+    def _load(self, key: str) -> PromptEntry:
+        text_path, functions_path = self._paths(key)
+        digest = hashlib.sha256()
+        instruction = functions = None
+        if os.path.exists(text_path):
+            with open(text_path, "rb") as file:
+                raw = file.read()
+            digest.update(raw)
+            instruction = raw.decode("utf-8")
+        if os.path.exists(functions_path):
+            with open(functions_path, "rb") as file:
+                raw = file.read()
+            digest.update(raw)
+            functions = json.loads(raw)
+            validate_functions(functions, functions_path)
+        if instruction is None and functions is None:
+            raise KeyError(f"No prompt or function schema named '{key}' in {self.prompts_dir}")
+        return PromptEntry(
+            key=key,
+            instruction=instruction,
+            functions=functions,
+            content_hash=digest.hexdigest()[:16],
+            mtimes=(_mtime(text_path), _mtime(functions_path)),
+        )
+
+    def _is_stale(self, entry: PromptEntry) -> bool:
+        text_path, functions_path = self._paths(entry.key)
+        return entry.mtimes != (_mtime(text_path), _mtime(functions_path))
+
+    def get(self, name: str) -> PromptEntry:
+        key = key_for(name)
+        entry = self._entries.get(key)
+        if entry is None or (self.reload and self._is_stale(entry)):
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is None or (self.reload and self._is_stale(entry)):
+                    entry = self._load(key)
+                    self._entries[key] = entry
+        return entry
+
+    def load_all(self) -> int:
+        """Load every prompt/schema pair; returns the number of entries"""
+        paths = glob.glob(os.path.join(self.prompts_dir, "*.txt")) + glob.glob(os.path.join(self.prompts_dir, "*.json"))
+        for key in sorted({key_for(path) for path in paths}):
+            self.get(key)
+        return len(self._entries)
+
+    def hashes(self) -> Dict[str, str]:
+        return {key: entry.content_hash for key, entry in sorted(self._entries.items())}
+
+
+prompt_registry = PromptRegistry(reload=get_prompt_reload())
+
+
+def get_prompt(name: str) -> PromptEntry:
+    return prompt_registry.get(name)
@@ -0,0 +1,95 @@
+import threading
+import time
+from typing import Dict, Optional
+
+from config.config import get_data_client
+
+# Reference tables change rarely (admin edits), so a short TTL is enough
+REFERENCE_TTL_SECONDS = 600
+# Wait before retrying a reload that failed
+RELOAD_RETRY_SECONDS = 30
+
+
+class ReferenceData:
+    """In-process cache of small reference tables (feed products, growth targets).
+
+    Loaded by the warm-up. Once the TTL has passed, the first lookup starts a
+    single background reload; until it lands, lookups return None and callers
+    read the table directly, so a request never waits on the reload.
+    """
+
+    def __init__(self, ttl_seconds: int = REFERENCE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._feed_products: Dict[int, Dict] = {}
+        self._target_weights: Dict[int, float] = {}
+        self._loaded_at: Optional[float] = None
+        self._reloading = False
+        self._retry_at = 0.0
+
+    def is_fresh(self) -> bool:
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl_seconds
+
+    def _refresh_if_stale(self):
+        if self.is_fresh():
+            return
+        with self._lock:
+            if self._reloading or time.monotonic() < self._retry_at:
+                return
+            self._reloading = True
+        threading.Thread(target=self._reload, name="reference-data-reload", daemon=True).start()
+
+    def _reload(self):
+        try:
+            self.load()
+        except Exception as e:
+            print(f"Reference data reload failed: {e}")
+            with self._lock:
+                self._retry_at = time.monotonic() + RELOAD_RETRY_SECONDS
+        finally:
+            with self._lock:
+                self._reloading = False
+
+    def load(self, client=None) -> Dict[str, int]:
+        """Fetch the reference tables; returns row counts per table"""
+        client = client or get_data_client()
+
+        products = (
+            client.table("feed_products")
+            .select("id, name, feed_stage, age_range_start, age_range_end, goal")
+            .execute()
+        ).data or []
+
+        targets = (
+            client.table("feed_growth_targets")
+            .select("feed_product_id, target_weight_kg")
+            .execute()
+        ).data or []
+
+        target_weights = {}
+        for row in targets:
+            # Same "first row wins" behaviour as the .limit(1) lookup this replaces
+            if row.get("target_weight_kg") is not None:
+                target_weights.setdefault(row["feed_product_id"], float(row["target_weight_kg"]))
+
+        with self._lock:
+            self._feed_products = {row["id"]: row for row in products}
+            self._target_weights = target_weights
+            self._loaded_at = time.monotonic()
+
+        return {"feed_products": len(products), "feed_growth_targets": len(targets)}
+
+    def get_feed_product(self, feed_product_id: int) -> Optional[Dict]:
+        self._refresh_if_stale()
+        if not self.is_fresh():
+            return None
+        return self._feed_products.get(feed_product_id)
+
+    def get_target_weight(self, feed_product_id: int) -> Optional[float]:
+        self._refresh_if_stale()
+        if not self.is_fresh():
+            return None
+        return self._target_weights.get(feed_product_id, 0.0)
+
+
+reference_data = ReferenceData()
@@ -0,0 +1,152 @@
+import asyncio
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+if TYPE_CHECKING:
+    import httpx
+
+
+class RequestScope:
+    """Identity map for one HTTP request.
+
+    Entities a chat turn reads from several places (a user's company id, the
+    active feed program, feed products, user profiles) are fetched at most
+    once per request and the same object is handed to every core class that
+    asks for it. Concurrent async loads of the same entity share one fetch.
+    `queries` counts the data-client requests sent while the scope was active.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, Hashable], Any] = {}
+        self._pending: Dict[Tuple[str, Hashable], asyncio.Future] = {}
+        self.queries = 0
+        self.hits = 0
+
+    def count_query(self):
+        with self._lock:
+            self.queries += 1
+
+    def _cached(self, slot) -> Tuple[bool, Any]:
+        with self._lock:
+            if slot in self._entries:
+                self.hits += 1
+                return True, self._entries[slot]
+        return False, None
+
+    def load(self, entity: str, key: Hashable, fetch: Callable[[], Any]) -> Any:
+        slot = (entity, key)
+        found, value = self._cached(slot)
+        if found:
+            return value
+        value = fetch()
+        with self._lock:
+            self._entries[slot] = value
+        return value
+
+    async def load_async(self, entity: str, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        slot = (entity, key)
+        found, value = self._cached(slot)
+        if found:
+            return value
+        with self._lock:
+            pending = self._pending.get(slot)
+            if pending is None:
+                pending = asyncio.ensure_future(fetch())
+                self._pending[slot] = pending
+            else:
+                self.hits += 1
+        try:
+            # Shielded so a cancelled waiter does not cancel the fetch other waiters share
+            value = await asyncio.shield(pending)
+        finally:
+            if pending.done():
+                with self._lock:
+                    if self._pending.get(slot) is pending:
+                        del self._pending[slot]
+                        if not pending.cancelled() and pending.exception() is None:
+                            self._entries[slot] = pending.result()
+        return value
+
+    def forget(self, entity: str, key: Hashable):
+        with self._lock:
+            self._entries.pop((entity, key), None)
+
+    def stats(self) -> Dict[str, int]:
+        return {"queries": self.queries, "hits": self.hits, "entities": len(self._entries)}
+
+
+_current_scope: ContextVar[Optional[RequestScope]] = ContextVar("request_scope", default=None)
+
+
+def current_scope() -> Optional[RequestScope]:
+    return _current_scope.get()
+
+
+@contextmanager
+def request_scope():
+    scope = RequestScope()
+    token = _current_scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _current_scope.reset(token)
+
+
+def load(entity: str, key: Hashable, fetch: Callable[[], Any]) -> Any:
+    """`fetch()` once per request for this entity; outside a request it is called every time"""
+    scope = _current_scope.get()
+    return fetch() if scope is None else scope.load(entity, key, fetch)
+
+
+async def load_async(entity: str, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+    scope = _current_scope.get()
+    return await fetch() if scope is None else await scope.load_async(entity, key, fetch)
+
+
+def forget(entity: str, key: Hashable):
+    """Drop an entity after a write so the rest of the request reads it again"""
+    scope = _current_scope.get()
+    if scope is not None:
+        scope.forget(entity, key)
+
+
+# httpx event hooks installed on the data clients (see config.create_data_client)
+def count_data_query(request: "httpx.Request"):
+    scope = _current_scope.get()
+    if scope is not None:
+        scope.count_query()
+
+
+async def count_data_query_async(request: "httpx.Request"):
+    count_data_query(request)
+
+
+class RequestScopeMiddleware:
+    """ASGI middleware: one RequestScope per HTTP request, reported in response headers.
+
+    `X-DB-Queries` is the number of data-client requests made before the
+    response started (for streamed responses, before the first byte) and
+    `X-DB-Dedup-Hits` the number of reads served from the identity map.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with request_scope() as request_state:
+            async def send_with_counts(message):
+                if message["type"] == "http.response.start":
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-db-queries", str(request_state.queries).encode()))
+                    headers.append((b"x-db-dedup-hits", str(request_state.hits).encode()))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_with_counts)
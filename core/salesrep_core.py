@@ -1,12 +1,12 @@
 from datetime import datetime, date
 from typing import List, Optional, Dict
-from config.config import get_supabase_client
+from config.config import get_data_client
 from collections import defaultdict
 from calendar import month_abbr
 
 class SalesRep:
-    def __init__(self):
-        self.client = get_supabase_client()
+    def __init__(self, client=None):
+        self.client = client or get_data_client()
    
     def create_field_product_incident(self, reported_by: int, form_data: Dict, tag: str):
         self.client.table("field_product_incidents").insert({            
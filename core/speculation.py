@@ -0,0 +1,116 @@
+import asyncio
+import threading
+import time
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from core.chat_stream import response_stream
+from core.llm_usage import start_usage_tally
+
+
+class SpeculationStats:
+    """Per speculative handler: how often its head start was used, and what the discarded ones cost"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.outcomes: Dict[str, Counter] = {}
+        self.wasted: Dict[str, Counter] = {}
+        self.head_start_ms: Dict[str, float] = {}
+
+    def record(self, name: str, outcome: str, head_start_ms: Optional[float] = None,
+               wasted: Optional[Dict[str, Any]] = None):
+        with self._lock:
+            self.outcomes.setdefault(name, Counter())[outcome] += 1
+            if head_start_ms is not None:
+                self.head_start_ms[name] = self.head_start_ms.get(name, 0.0) + head_start_ms
+            if wasted:
+                self.wasted.setdefault(name, Counter()).update(wasted)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            result = {}
+            for name, outcomes in self.outcomes.items():
+                decided = outcomes["hit"] + outcomes["miss"]
+                wasted = self.wasted.get(name, Counter())
+                result[name] = {
+                    **outcomes,
+                    "hit_rate": round(outcomes["hit"] / decided, 3) if decided else None,
+                    "mean_head_start_ms": round(self.head_start_ms.get(name, 0.0) / outcomes["hit"], 1) if outcomes["hit"] else None,
+                    "wasted": {**wasted, "cost_usd": round(wasted.get("cost_usd", 0.0), 6)},
+                }
+            return result
+
+
+speculation_stats = SpeculationStats()
+
+
+class Speculation:
+    """Work started before the turn knows it needs it (a handler, while the intent is classified).
+
+    `run` starts at once in its own task. Text it streams to the client is
+    buffered until it is claimed, and its LLM tokens are tallied so a
+    discarded speculation is reported as waste. It must not write anything:
+    only the claiming handler does. The speculation is discarded if the turn
+    ends without claiming it.
+    """
+
+    def __init__(self, name: str, run: Callable[[], Awaitable[Any]]):
+        self.name = name
+        self.started = time.perf_counter()
+        self.outcome: Optional[str] = None
+        self.tally: Dict[str, Any] = {}
+        self._buffer = asyncio.Queue() if response_stream.get() is not None else None
+        self.task = asyncio.ensure_future(self._run(run))
+        speculation_stats.record(name, "started")
+        turn = asyncio.current_task()
+        if turn is not None:
+            turn.add_done_callback(lambda _: self.discard("abandoned"))
+
+    async def _run(self, run):
+        response_stream.set(self._buffer)
+        self.tally = start_usage_tally()
+        return await run()
+
+    async def claim(self) -> Optional[Any]:
+        """The speculative result, with its buffered stream forwarded; None if it failed"""
+        head_start_ms = (time.perf_counter() - self.started) * 1000
+        queue = response_stream.get()
+        try:
+            if queue is not None and self._buffer is not None:
+                while not self.task.done():
+                    next_text = asyncio.ensure_future(self._buffer.get())
+                    await asyncio.wait({next_text, self.task}, return_when=asyncio.FIRST_COMPLETED)
+                    if next_text.done():
+                        queue.put_nowait(next_text.result())
+                    else:
+                        next_text.cancel()
+                while not self._buffer.empty():
+                    queue.put_nowait(self._buffer.get_nowait())
+            result = await self.task
+        except asyncio.CancelledError:
+            self.discard("abandoned")
+            raise
+        except Exception as e:
+            print(f"Speculative {self.name} failed, running it again: {e}")
+            self.outcome = "failed"
+            speculation_stats.record(self.name, "failed")
+            return None
+        self.outcome = "hit"
+        speculation_stats.record(self.name, "hit", head_start_ms=head_start_ms)
+        return result
+
+    def discard(self, outcome: str = "miss"):
+        """Cancel the work if it is still running and count what it spent"""
+        if self.outcome is not None:
+            return
+        self.outcome = outcome
+        in_flight = not self.task.done()
+        if in_flight:
+            self.task.cancel()
+        elif not self.task.cancelled():
+            # Retrieved so that a failed, unclaimed speculation is not reported as unhandled
+            self.task.exception()
+        wasted = {key: value for key, value in self.tally.items() if value}
+        if in_flight:
+            wasted["cancelled_in_flight"] = 1
+        speculation_stats.record(self.name, outcome, wasted=wasted)
@@ -0,0 +1,104 @@
+import asyncio
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+
+class StepMetrics:
+    """Process-wide per-step timing totals (count / mean / max), keyed by pipeline and step"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._steps: Dict[str, Dict[str, float]] = {}
+
+    def record(self, pipeline: str, timings: Dict[str, Dict[str, float]], total_ms: float):
+        with self._lock:
+            for name, timing in list(timings.items()) + [("__total__", {"duration_ms": total_ms})]:
+                key = f"{pipeline}.{name}"
+                entry = self._steps.setdefault(key, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+                entry["count"] += 1
+                entry["total_ms"] += timing["duration_ms"]
+                entry["max_ms"] = max(entry["max_ms"], timing["duration_ms"])
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                key: {
+                    "count": entry["count"],
+                    "mean_ms": round(entry["total_ms"] / entry["count"], 1),
+                    "max_ms": round(entry["max_ms"], 1),
+                }
+                for key, entry in self._steps.items()
+            }
+
+
+step_metrics = StepMetrics()
+
+
+class StepExecutor:
+    """Runs named async steps concurrently, each starting as soon as its dependencies finish.
+
+    Each step is an async callable that receives the results of the steps it
+    depends on as positional arguments, in the order they were declared:
+
+        executor = StepExecutor("handle_log")
+        executor.add("history", lambda: chat.get_recent_messages(chat_id))
+        executor.add("context", lambda history: classify(history), depends_on=["history"])
+        results = await executor.run()
+
+    If any step raises, the remaining steps are cancelled and the exception
+    propagates; the name of the step that raised is kept in `failed_step`.
+    Per-step start offsets and durations are kept in `timings`.
+    """
+
+    def __init__(self, pipeline: str):
+        self.pipeline = pipeline
+        self._steps: Dict[str, Callable[..., Awaitable[Any]]] = {}
+        self._depends_on: Dict[str, List[str]] = {}
+        self.timings: Dict[str, Dict[str, float]] = {}
+        self.total_ms: Optional[float] = None
+        self.failed_step: Optional[str] = None
+
+    def add(self, name: str, step: Callable[..., Awaitable[Any]], depends_on: Iterable[str] = ()):
+        for dependency in depends_on:
+            if dependency not in self._steps:
+                raise ValueError(f"Step '{name}' depends on unknown step '{dependency}'")
+        self._steps[name] = step
+        self._depends_on[name] = list(depends_on)
+        return self
+
+    async def run(self) -> Dict[str, Any]:
+        start = time.perf_counter()
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run_step(name: str):
+            dependency_results = [await tasks[dep] for dep in self._depends_on[name]]
+            step_start = time.perf_counter()
+            try:
+                return await self._steps[name](*dependency_results)
+            except Exception:
+                if self.failed_step is None:
+                    self.failed_step = name
+                raise
+            finally:
+                self.timings[name] = {
+                    "start_ms": round((step_start - start) * 1000, 1),
+                    "duration_ms": round((time.perf_counter() - step_start) * 1000, 1),
+                }
+
+        # Steps are added in dependency order, so every dependency task exists first
+        for name in self._steps:
+            tasks[name] = asyncio.ensure_future(run_step(name))
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+        finally:
+            self.total_ms = round((time.perf_counter() - start) * 1000, 1)
+            step_metrics.record(self.pipeline, self.timings, self.total_ms)
+
+        return {name: task.result() for name, task in tasks.items()}
@@ -1,11 +1,11 @@
 from dateutil.parser import parse
-from config.config import get_supabase_client
+from config.config import get_data_client
 from exceptions.global_exception import GlobalException
 
 
 class ViewModelsCore:
-    def __init__(self):
-        self.client = get_supabase_client()
+    def __init__(self, client=None):
+        self.client = client or get_data_client()
 
     def read_farmer_dashboard_view_model(self, farmer_user_profile_id: int):
         try:
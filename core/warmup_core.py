@@ -0,0 +1,151 @@
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import anyio.from_thread
+
+from config.config import get_async_data_client, get_async_gpt_client, get_data_client, get_gpt_client, get_gpt_model, get_language_id_settings, get_warmup_settings
+from core.classifier.intent_model import get_intent_model
+from core.classifier.intent_rules import get_intent_rules
+from core.faq_index import faq_cache_enabled, refresh_faq_index
+from core.language_id import get_language_identifier
+from core.prompt_registry import prompt_registry
+from core.reference_data import reference_data
+
+
+def _warm_prompts():
+    return {"entries": prompt_registry.load_all()}
+
+
+def _on_event_loop(async_fn) -> bool:
+    """Run an async warm-up call on the app's event loop (warm-up itself runs in a worker thread)"""
+    try:
+        anyio.from_thread.run(async_fn)
+        return True
+    except RuntimeError:
+        # Not started from an anyio worker thread (e.g. a script); nothing to warm
+        return False
+
+
+def _warm_data():
+    # Cheap query that opens (and keeps alive) a pooled connection to PostgREST
+    get_data_client().table("feed_products").select("id").limit(1).execute()
+
+    async def warm_async():
+        await get_async_data_client().table("feed_products").select("id").limit(1).execute()
+
+    return {"connected": True, "async_connected": _on_event_loop(warm_async)}
+
+
+def _warm_llm():
+    # Builds the OpenAI clients and completes the TLS handshake without spending tokens
+    get_gpt_client().models.retrieve(get_gpt_model())
+
+    async def warm_async():
+        await get_async_gpt_client().models.retrieve(get_gpt_model())
+
+    return {"connected": True, "async_connected": _on_event_loop(warm_async)}
+
+
+def _warm_reference():
+    return reference_data.load()
+
+
+def _warm_language():
+    identifier = get_language_identifier(get_language_id_settings()["model_path"])
+    if identifier is None:
+        return {"loaded": False}
+    return {"loaded": True, "thresholds": identifier.thresholds, "calibration": identifier.calibration}
+
+
+def _warm_intent_rules():
+    rules = get_intent_rules()
+    if rules is None:
+        return {"loaded": False}
+    return {"loaded": True, "active_rules": sum(rule.active for rule in rules.rules), **rules.sample}
+
+
+def _warm_intent_model():
+    models = {role: get_intent_model(role) for role in ("farmer", "salesrep")}
+    return {
+        role: {"loaded": model is not None, "features": len(model.weights) if model else 0,
+               "threshold": model.threshold if model else None, "calibration": model.calibration if model else None}
+        for role, model in models.items()
+    }
+
+
+def _warm_faq():
+    if not faq_cache_enabled():
+        return {"enabled": False}
+    return refresh_faq_index()
+
+
+WARMUP_STEPS: Dict[str, Callable[[], Dict]] = {
+    "prompts": _warm_prompts,
+    "data": _warm_data,
+    "llm": _warm_llm,
+    "reference": _warm_reference,
+    "language": _warm_language,
+    "intent_rules": _warm_intent_rules,
+    "intent_model": _warm_intent_model,
+    "faq": _warm_faq,
+}
+
+
+class Warmup:
+    """Runs the configured warm-up steps once per worker and tracks readiness"""
+
+    def __init__(self, steps: Optional[List[str]] = None, enabled: bool = True):
+        self.steps = steps if steps is not None else list(WARMUP_STEPS)
+        self.enabled = enabled
+        self.ready = False
+        self.running = False
+        self.duration_ms: Optional[float] = None
+        self.results: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def run(self):
+        with self._lock:
+            if self.ready or self.running:
+                return
+            self.running = True
+
+        start = time.perf_counter()
+        if self.enabled:
+            for name in self.steps:
+                step = WARMUP_STEPS.get(name)
+                if step is None:
+                    self.results[name] = {"ok": False, "error": "Unknown warm-up step"}
+                    continue
+
+                step_start = time.perf_counter()
+                try:
+                    detail = step()
+                    self.results[name] = {"ok": True, **(detail or {})}
+                except Exception as e:
+                    # A failed step only costs the first request its cold path
+                    print(f"Warm-up step '{name}' failed: {e}")
+                    self.results[name] = {"ok": False, "error": str(e)}
+                self.results[name]["ms"] = round((time.perf_counter() - step_start) * 1000, 1)
+
+        self.duration_ms = round((time.perf_counter() - start) * 1000, 1)
+        self.running = False
+        self.ready = True
+        print(f"Warm-up finished in {self.duration_ms} ms: {self.results}")
+
+    def status(self) -> Dict:
+        return {
+            "ready": self.ready,
+            "running": self.running,
+            "enabled": self.enabled,
+            "duration_ms": self.duration_ms,
+            "steps": self.results,
+        }
+
+
+_settings = get_warmup_settings()
+warmup = Warmup(_settings["steps"], _settings["enabled"])
+
+
+def get_warmup() -> Warmup:
+    return warmup
@@ -1,6 +1,7 @@
 from core.chat_core import Chat
 from core.farmer_core import Farmer
-from core.helper_core import load_prompt, call_openai, extract_json, store_message_faq, get_max_messages, handle_log, handle_intent, load_functions
+from core.helper_core import call_openai, extract_json, store_message_faq, get_max_messages, handle_log, handle_intent
+from core.prompt_registry import get_prompt
 
 max = get_max_messages()
 
@@ -9,8 +10,9 @@ def handle_general_questions(chat_id, user_id, prompt):
   chat = Chat()
   farmer = Farmer()
 
-  system_instruction = load_prompt("prompts/ask_farmer_general_questions.txt")
-  functions = load_functions("prompts/ask_farmer_general_questions.json")
+  prompt_entry = get_prompt("ask_farmer_general_questions")
+  system_instruction = prompt_entry.instruction
+  functions = prompt_entry.functions
   days_on_feed, current_feed = farmer.get_feed_use(user_id)
 
   
@@ -23,7 +25,7 @@ def handle_general_questions(chat_id, user_id, prompt):
   messages = [{"role": "system", "content": system_instruction}] + history
 
 #   response_text = call_openai(messages)
-  parsed = call_openai(messages, functions, "feed_advisory")
+  parsed = call_openai(messages, functions, "feed_advisory", cache=False, prompt_key=prompt_entry.key)
 
   store_message_faq(chat_id, prompt, parsed["response"], parsed["log_type"])
   return parsed
@@ -33,7 +35,7 @@ def handle_health_log(chat_id, user_id, prompt):
     chat_id, 
     user_id, 
     prompt, 
-    "prompts/ask_farmer_health_log", 
+    "ask_farmer_health_log", 
     "incident_details",
     "log_health_incident",
     lambda farmer, user_id, form_data, parsed: farmer.create_farm_health_incident(
@@ -45,7 +47,7 @@ def handle_general_log(chat_id, user_id, prompt):
     chat_id, 
     user_id, 
     prompt, 
-    "prompts/ask_farmer_log",
+    "ask_farmer_log",
     "report_details",
     "log_performance_report",
     lambda farmer, user_id, form_data, parsed: farmer.create_farm_performance_log(
@@ -58,7 +60,7 @@ def handle_local_practice_log(chat_id, user_id, prompt):
     chat_id, 
     user_id, 
     prompt, 
-    "prompts/ask_farmer_diy_log", 
+    "ask_farmer_diy_log", 
     "",
     "log_diy_practice",
     lambda farmer, user_id, form_data, parsed: farmer.create_health_incident(
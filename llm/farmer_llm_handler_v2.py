@@ -1,92 +1,157 @@
-from core.chat_core import Chat
+from config.config import get_async_data_client, get_combined_intent_language
+from core.chat_core import AsyncChat
+from core.chat_stream import response_stream
 from core.classifier.prompt_classifier import PromptClassifier
-from core.company_core import Company
+from core.company_core import AsyncCompany
 from core.contexts.context_manager import ContextManager
 from core.contexts.context_provider import ContextType
-from core.farmer_core_v2 import FarmerV2, create_health_incident_with_program, create_performance_log_with_program
-from core.helper_core_v2 import call_openai, get_feed_program_context, get_max_messages, handle_intent, handle_log, load_functions, load_prompt, store_message_faq, detect_language
+from core.faq_index import faq_cache_enabled, faq_index, schedule_faq_refresh
+from core.farmer_core_v2 import create_health_incident_with_program, create_performance_log_with_program
+from core.helper_core_v2 import get_max_messages, handle_intent_async, handle_intent_language_async, handle_log_async
+from core.llm_common import call_openai_async, detect_conversation_language_async
+from core.message_store import store_message_faq_async
+from core.prompt_assembly import answer_in, build_messages
+from core.prompt_registry import get_prompt
+from core.speculation import Speculation
+from core.step_executor import StepExecutor
 
 
 max = get_max_messages()
 
-# intent 1 ito
-def handle_general_questions(chat_id, user_id, prompt):
-    chat = Chat()
-    company = Company()
+async def prepare_general_question(chat_id, user_id, prompt, language=None, with_language=True):
+    """Reads, context and language of a general question; no LLM answer and no writes.
 
-    user_company_id = company.get_user_company(user_id)
+    With `with_language=False` the language is left as None for the caller to fill in.
+    """
+    client = get_async_data_client()
+    chat = AsyncChat(client)
+    company = AsyncCompany(client)
 
-    context_manager = ContextManager()
+    context_manager = ContextManager(async_client=client)
     classifier = PromptClassifier(context_manager)
 
-    history = chat.get_recent_messages(chat_id, max_messages=max)
+    # Independent reads and language detection run concurrently; the main call waits for all of them
+    steps = StepExecutor("handle_general_questions")
+    steps.add("company", lambda: company.get_user_company(user_id))
+    steps.add("history", lambda: chat.get_recent_messages(chat_id, max_messages=max))
+    steps.add("context", lambda history: classifier.classify_and_get_context_async(
+        user_id, prompt, list(history)), depends_on=["history"])
+    if with_language:
+        steps.add("language", lambda: detect_conversation_language_async(chat_id, prompt, language))
+    results = await steps.run()
+    return {"client": client, "language": None, **results}
 
-    classification_result = classifier.classify_and_get_context(
-        user_id, prompt, history
-    )
 
-    system_instruction = load_prompt(
-        f"prompts/{classification_result['system_prompt_key']}")
-    functions = load_functions(
-        f"prompts/{classification_result['system_prompt_key'].replace('.txt', '.json')}")
+def _faq_usable(prepared):
+    """Cached answers stand only for self-contained questions: no user context and no earlier turns a follow-up could refer to"""
+    return faq_cache_enabled() and not prepared["context"]["needs_context"] and not prepared["history"]
+
+
+def _faq_match(prompt, prepared):
+    """A near-duplicate of an already answered question reuses its answer"""
+    if not _faq_usable(prepared):
+        return None
+    schedule_faq_refresh()
+    return faq_index.query(prompt, prepared["company"])
+
+
+async def _answer_general_question(prompt, prepared):
+    classification_result = prepared["context"]
+    prompt_entry = get_prompt(classification_result['system_prompt_key'])
+    system_instruction = prompt_entry.instruction
+    functions = prompt_entry.functions
 
     user_message = prompt
     if classification_result["needs_context"]:
         user_message = f"{prompt}\n\n{classification_result['context_string']}"
 
-    history.append({
-        "role": "user",
-        "content": user_message
-    })
-    
-    detected_language = detect_language(prompt)
-    history.append({
-        "role": "system", 
-        "content": f"Always answer in {detected_language}.\n" + system_instruction
-    })
-
-    messages = history
-    parsed = call_openai(messages, functions, "feed_advisory")
-
-    store_message_faq(
-        chat_id, prompt, parsed["response"], parsed["log_type"], user_company_id)
+    messages = build_messages(system_instruction, prepared["history"], user_message, answer_in(prepared["language"]))
+    return await call_openai_async(
+        messages, functions, "feed_advisory", stream_response=True, cache=False, prompt_key=prompt_entry.key)
+
+
+def speculate_general_question(chat_id, user_id, prompt, mode):
+    """Start the general-question handler while the intent is classified (intent 1 is the most common).
+
+    "context" prepares the reads, context and language; "full" also starts the
+    answer call, whose streamed text is held back until the handler claims it.
+    In "context" mode a combined classifier returns the language, so it is not
+    detected here.
+    """
+    with_language = mode == "full" or not get_combined_intent_language()
+
+    async def run():
+        prepared = await prepare_general_question(chat_id, user_id, prompt, with_language=with_language)
+        if mode == "full" and _faq_match(prompt, prepared) is None:
+            prepared["parsed"] = await _answer_general_question(prompt, prepared)
+        return prepared
+
+    return Speculation("farmer_general_question", run)
+
+
+async def handle_general_questions_async(chat_id, user_id, prompt, language=None, speculation=None):
+    prepared = await speculation.claim() if speculation is not None else None
+    if prepared is None:
+        prepared = await prepare_general_question(chat_id, user_id, prompt, language)
+    if prepared["language"] is None:
+        prepared["language"] = await detect_conversation_language_async(chat_id, prompt, language)
+    client = prepared["client"]
+    user_company_id = prepared["company"]
+
+    parsed = prepared.get("parsed")
+    match = _faq_match(prompt, prepared) if parsed is None else None
+    if match:
+        parsed = {"response": match["answer"], "log_type": match["category"]}
+        queue = response_stream.get()
+        if queue is not None:
+            queue.put_nowait(parsed["response"])
+        await store_message_faq_async(
+            chat_id, prompt, parsed["response"], parsed["log_type"], user_company_id,
+            metadata={"faq_cache": {"similarity": match["similarity"]}}, client=client, store_faq=False)
+        return parsed
+
+    if parsed is None:
+        parsed = await _answer_general_question(prompt, prepared)
+
+    # A canned gateway reply is not an answer worth keeping
+    canned = parsed.get("fallback", False)
+    await store_message_faq_async(
+        chat_id, prompt, parsed["response"], parsed["log_type"], user_company_id, client=client, store_faq=not canned)
+    if _faq_usable(prepared) and not canned:
+        faq_index.add(prompt, parsed["response"], parsed["log_type"], user_company_id)
     return parsed
 
-# intent 2 ito
-def handle_health_log(chat_id, user_id, prompt):
-    return handle_log(
-        chat_id, 
-        user_id, 
-        prompt, 
-        "prompts/ask_farmer_health_log", 
+
+async def handle_health_log_async(chat_id, user_id, prompt, language=None):
+    return await handle_log_async(
+        chat_id,
+        user_id,
+        prompt,
+        "ask_farmer_health_log",
         "incident_details",
         "log_health_incident",
         create_health_incident_with_program,
-        context_types=[ContextType.FEED_PROGRAM])
+        context_types=[ContextType.FEED_PROGRAM],
+        language=language)
+
 
-# intent 3 ito
-def handle_performance_log(chat_id, user_id, prompt):
-    return handle_log(
+async def handle_performance_log_async(chat_id, user_id, prompt, language=None):
+    return await handle_log_async(
         chat_id,
         user_id,
         prompt,
-        "prompts/ask_farmer_log",
+        "ask_farmer_log",
         "report_details",
         "log_performance_report",
         create_performance_log_with_program,
-        context_types=[ContextType.FEED_PROGRAM])
+        context_types=[ContextType.FEED_PROGRAM],
+        language=language)
+
+
+async def get_intent_async(prompt, prompt_file, function_name):
+    return await handle_intent_async(prompt, prompt_file, function_name)
 
-# intent 4 ito
-def handle_local_practice_log(chat_id, user_id, prompt):
-    return handle_log(
-        chat_id,
-        user_id,
-        prompt,
-        "prompts/ask_farmer_diy_log",
-        "diy",
-        "log_diy_practice",
-        create_health_incident_with_program)
 
+async def get_intent_language_async(prompt, prompt_file):
+    return await handle_intent_language_async(prompt, prompt_file)
 
-def get_intent(prompt, prompt_file, function_name):
-    return handle_intent(prompt, prompt_file, function_name)
@@ -0,0 +1,515 @@
+import asyncio
+import copy
+import json
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from config.config import get_llm_gateway_settings
+from core.llm_cache import cache_enabled, cache_key, llm_cache
+from core.llm_usage import current_prompt_key
+from exceptions.global_exception import GlobalException
+from llm.llm_providers import PROVIDERS, LLMProvider, OpenAIProvider, retryable_errors
+
+
+@dataclass(frozen=True)
+class FunctionPolicy:
+    deadline_seconds: float = 30.0
+    max_retries: int = 2
+    retry_base_seconds: float = 0.5
+    retry_max_seconds: float = 4.0
+    hedge: bool = False
+    hedge_min_samples: int = 20
+    breaker_failures: int = 5
+    breaker_reset_seconds: float = 30.0
+    primary_budget_seconds: float = 10.0
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class LatencyWindow:
+    """Latencies (ms) of the most recent successful primary-provider calls"""
+
+    def __init__(self, size: int = 200):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, ms: float):
+        with self._lock:
+            self._samples.append(ms)
+
+    def __len__(self):
+        return len(self._samples)
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+class CircuitBreaker:
+    """Opens after `failures` consecutive failed calls; one trial call is let through after `reset_seconds`"""
+
+    def __init__(self, failures: int, reset_seconds: float):
+        self.failures = failures
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.consecutive_failures = 0
+            self._trial_in_flight = False
+
+    def release(self):
+        """End a call that says nothing about the provider's health; the state is left as it is"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self._trial_in_flight = False
+            if self.state == "half_open" or self.consecutive_failures >= self.failures:
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+class FunctionState:
+    """Breaker, latency window and counters of one function name"""
+
+    def __init__(self, policy: FunctionPolicy):
+        self.policy = policy
+        self.breaker = CircuitBreaker(policy.breaker_failures, policy.breaker_reset_seconds)
+        self.latency = LatencyWindow()
+        self._lock = threading.Lock()
+        self.counters = {
+            "calls": 0, "retries": 0, "hedges": 0, "hedge_wins": 0,
+            "timeouts": 0, "failures": 0, "fallbacks": 0, "rejected": 0,
+            "failovers": 0, "failover_wins": 0,
+        }
+
+    def count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before sending a duplicate request, or None when not hedging"""
+        if not self.policy.hedge or len(self.latency) < self.policy.hedge_min_samples:
+            return None
+        return self.latency.percentile(0.95) / 1000
+
+    def stats(self) -> Dict[str, Any]:
+        p50, p95 = self.latency.percentile(0.5), self.latency.percentile(0.95)
+        return {
+            **self.counters,
+            "breaker": self.breaker.state,
+            "p50_ms": round(p50, 1) if p50 is not None else None,
+            "p95_ms": round(p95, 1) if p95 is not None else None,
+            "deadline_seconds": self.policy.deadline_seconds,
+            "hedge": self.policy.hedge,
+        }
+
+
+class LLMGateway:
+    """Every forced function call to an LLM goes through here.
+
+    Per function name (see LLM_* in config): a deadline for the whole call
+    including retries, jittered exponential backoff on rate limits, timeouts
+    and 5xx, a duplicate "hedged" request once an async call runs past the
+    function's recent p95 latency, and a circuit breaker. With a fallback
+    provider configured, a call that errors or runs past the function's
+    primary budget is sent to the fallback provider as well and the first
+    answer wins. When the breaker is open or a call fails for good, the
+    function's canned response from data/llm_fallbacks.json is returned
+    (marked `"fallback": true`); without one a 503 GlobalException is raised.
+    The exact-match response cache is consulted before any of this.
+    """
+
+    def __init__(self, settings: Dict[str, Any]):
+        self.settings = settings
+        self._lock = threading.Lock()
+        self._functions: Dict[str, FunctionState] = {}
+        self._fallbacks: Optional[Dict[str, Dict]] = None
+        self.primary: LLMProvider = OpenAIProvider()
+        self.secondary: Optional[LLMProvider] = None
+        fallback_provider = settings["fallback_provider"]
+        if fallback_provider in PROVIDERS and fallback_provider != self.primary.name:
+            self.secondary = PROVIDERS[fallback_provider]()
+        elif fallback_provider:
+            print(f"Unknown LLM fallback provider '{fallback_provider}'; running without one")
+
+    def policy_for(self, function_name: str) -> FunctionPolicy:
+        settings = self.settings
+        return FunctionPolicy(
+            deadline_seconds=settings["deadlines"].get(function_name, settings["deadline_seconds"]),
+            max_retries=settings["retries"].get(function_name, settings["max_retries"]),
+            retry_base_seconds=settings["retry_base_seconds"],
+            retry_max_seconds=settings["retry_max_seconds"],
+            hedge=function_name in settings["hedge_functions"],
+            hedge_min_samples=settings["hedge_min_samples"],
+            breaker_failures=settings["breaker_failures"],
+            breaker_reset_seconds=settings["breaker_reset_seconds"],
+            primary_budget_seconds=settings["primary_budgets"].get(function_name, settings["primary_budget_seconds"]),
+        )
+
+    def state(self, function_name: str) -> FunctionState:
+        state = self._functions.get(function_name)
+        if state is None:
+            with self._lock:
+                state = self._functions.setdefault(function_name, FunctionState(self.policy_for(function_name)))
+        return state
+
+    def fallbacks(self) -> Dict[str, Dict]:
+        if self._fallbacks is None:
+            try:
+                with open(self.settings["fallbacks_path"], "r", encoding="utf-8") as file:
+                    self._fallbacks = json.load(file)
+            except (OSError, ValueError) as e:
+                print(f"Could not load LLM fallbacks: {e}")
+                self._fallbacks = {}
+        return self._fallbacks
+
+    def _fallback(self, function_name: str, state: FunctionState, reason: str, queue: Optional[asyncio.Queue] = None):
+        canned = self.fallbacks().get(function_name)
+        print(f"LLM call {function_name} failed fast ({reason}); canned response: {canned is not None}")
+        if canned is None:
+            raise GlobalException("The assistant is temporarily unavailable. Please try again in a moment.", 503)
+        state.count("fallbacks")
+        parsed = copy.deepcopy(canned)
+        if queue is not None and parsed.get("response"):
+            queue.put_nowait(parsed["response"])
+        return parsed
+
+    def _failed(self, function_name: str, state: FunctionState, error: Exception, queue: Optional[asyncio.Queue] = None):
+        import openai
+
+        state.count("timeouts" if isinstance(error, (DeadlineExceeded, openai.APITimeoutError)) else "failures")
+        state.breaker.record_failure()
+        return self._fallback(function_name, state, type(error).__name__, queue)
+
+    @staticmethod
+    def _backoff(policy: FunctionPolicy, attempt: int, error: Exception) -> float:
+        """Full-jitter exponential backoff; a rate limit's Retry-After is respected"""
+        delay = random.uniform(0, min(policy.retry_max_seconds, policy.retry_base_seconds * 2 ** attempt))
+        response = getattr(error, "response", None)
+        if response is not None:
+            try:
+                delay = max(delay, float(response.headers.get("retry-after", 0)))
+            except ValueError:
+                pass
+        return delay
+
+    def _record(self, state: FunctionState, provider: LLMProvider, function_name: str, start: float):
+        ms = (time.perf_counter() - start) * 1000
+        provider.histogram(function_name).record(ms)
+        # Hedging keys off the primary's latency only
+        if provider is self.primary:
+            state.latency.add(ms)
+
+    # Sync (v1 handlers and the sync v2 paths): deadline, retries, failover and breaker; no hedging
+
+    def call(self, messages: List[Dict], functions: Dict, function_name: str, cache: bool = True,
+             prompt_key: Optional[str] = None) -> Dict[str, Any]:
+        """Forced function call; `cache=False` opts out of the response cache (per-user context, dates).
+
+        `prompt_key` (the prompts/ file the call was built from) labels its usage record.
+        """
+        token = current_prompt_key.set(prompt_key)
+        try:
+            return self._call(messages, functions, function_name, cache)
+        finally:
+            current_prompt_key.reset(token)
+
+    def _call(self, messages, functions, function_name, cache) -> Dict[str, Any]:
+        use_cache = cache_enabled(function_name, cache)
+        if use_cache:
+            key = cache_key(self.primary.model, functions, function_name, messages)
+            cached = llm_cache.get(key, function_name)
+            if cached is not None:
+                return cached
+
+        state = self.state(function_name)
+        policy = state.policy
+        if not state.breaker.allow():
+            state.count("rejected")
+            return self._fallback(function_name, state, "circuit open")
+        state.count("calls")
+
+        deadline = time.monotonic() + policy.deadline_seconds
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    raise DeadlineExceeded()
+                provider, parsed = self._call_with_failover(state, messages, functions, function_name, remaining)
+                break
+            except retryable_errors() + (DeadlineExceeded,) as e:
+                delay = self._backoff(policy, attempt, e)
+                if isinstance(e, DeadlineExceeded) or attempt >= policy.max_retries or time.monotonic() + delay >= deadline:
+                    return self._failed(function_name, state, e)
+                attempt += 1
+                state.count("retries")
+                time.sleep(delay)
+            except Exception:
+                # Not a provider health problem (bad schema, bad JSON); the breaker stays as it is
+                state.breaker.release()
+                raise
+
+        state.breaker.record_success()
+        # The key names the primary model, so a failover answer is not cached under it
+        if use_cache and provider is self.primary:
+            llm_cache.set(key, function_name, parsed)
+        return parsed
+
+    def _timed_call(self, state, provider, messages, functions, function_name, timeout):
+        start = time.perf_counter()
+        try:
+            parsed = provider.call(messages, functions, function_name, timeout)
+        except Exception:
+            provider.histogram(function_name).record_error()
+            raise
+        self._record(state, provider, function_name, start)
+        return parsed
+
+    def _call_with_failover(self, state, messages, functions, function_name, timeout):
+        """(provider that answered, result): primary within its budget; on an error or timeout, the fallback
+        provider with the time left"""
+        if self.secondary is None:
+            return self.primary, self._timed_call(state, self.primary, messages, functions, function_name, timeout)
+
+        started = time.monotonic()
+        try:
+            return self.primary, self._timed_call(state, self.primary, messages, functions, function_name,
+                                                  min(state.policy.primary_budget_seconds, timeout))
+        except retryable_errors() as primary_error:
+            remaining = timeout - (time.monotonic() - started)
+            if remaining <= 0:
+                raise
+            state.count("failovers")
+            try:
+                parsed = self._timed_call(state, self.secondary, messages, functions, function_name, remaining)
+            except retryable_errors():
+                raise primary_error
+            state.count("failover_wins")
+            return self.secondary, parsed
+
+    # Async (v2 chat pipeline)
+
+    async def call_async(self, messages: List[Dict], functions: Dict, function_name: str,
+                         stream_to: Optional[asyncio.Queue] = None, cache: bool = True,
+                         prompt_key: Optional[str] = None) -> Dict[str, Any]:
+        """Async `call`. With `stream_to`, the `response` field is pushed to the queue as it is generated"""
+        token = current_prompt_key.set(prompt_key)
+        try:
+            return await self._call_async(messages, functions, function_name, stream_to, cache)
+        finally:
+            current_prompt_key.reset(token)
+
+    async def _call_async(self, messages, functions, function_name, stream_to, cache) -> Dict[str, Any]:
+        use_cache = stream_to is None and cache_enabled(function_name, cache)
+        if use_cache:
+            key = cache_key(self.primary.model, functions, function_name, messages)
+            cached = llm_cache.get(key, function_name)
+            if cached is not None:
+                return cached
+
+        state = self.state(function_name)
+        if not state.breaker.allow():
+            state.count("rejected")
+            return self._fallback(function_name, state, "circuit open", stream_to)
+        state.count("calls")
+
+        if stream_to is None:
+            send = lambda timeout: self._send_with_failover(state, messages, functions, function_name, timeout)
+        else:
+            send = lambda timeout: self._stream_with_failover(state, messages, functions, function_name, timeout, stream_to)
+
+        try:
+            provider, parsed = await self._with_retries(state, send)
+        except retryable_errors() + (DeadlineExceeded,) as e:
+            # Text already streamed stays; the canned reply follows it
+            return self._failed(function_name, state, e, stream_to)
+        except Exception:
+            # Not a provider health problem (bad schema, bad JSON); the breaker stays as it is
+            state.breaker.release()
+            raise
+
+        state.breaker.record_success()
+        # The key names the primary model, so a failover answer is not cached under it
+        if use_cache and provider is self.primary:
+            llm_cache.set(key, function_name, parsed)
+        return parsed
+
+    async def _with_retries(self, state: FunctionState, send: Callable[[float], Awaitable[Tuple]]) -> Tuple[LLMProvider, Dict[str, Any]]:
+        policy = state.policy
+        deadline = time.monotonic() + policy.deadline_seconds
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise DeadlineExceeded()
+            try:
+                return await asyncio.wait_for(send(remaining), remaining)
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded()
+            except retryable_errors() as e:
+                if getattr(e, "streamed", False) or attempt >= policy.max_retries:
+                    raise
+                delay = self._backoff(policy, attempt, e)
+                if time.monotonic() + delay >= deadline:
+                    raise
+                attempt += 1
+                state.count("retries")
+                await asyncio.sleep(delay)
+
+    async def _timed_call_async(self, state, provider, messages, functions, function_name, timeout):
+        start = time.perf_counter()
+        try:
+            parsed = await provider.call_async(messages, functions, function_name, timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            provider.histogram(function_name).record_error()
+            raise
+        self._record(state, provider, function_name, start)
+        return parsed
+
+    async def _send_hedged(self, state, messages, functions, function_name, timeout) -> Dict[str, Any]:
+        """One primary request, plus a duplicate if the first is still running after the function's p95 latency"""
+        send = lambda: self._timed_call_async(state, self.primary, messages, functions, function_name, timeout)
+        delay = state.hedge_delay()
+        first = asyncio.ensure_future(send())
+        if delay is None or delay >= timeout:
+            return await first
+
+        tasks = {first}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                state.count("hedges")
+                tasks.add(asyncio.ensure_future(send()))
+            _, parsed = await self._first_success(tasks, first, state, "hedge_wins")
+            return parsed
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    @staticmethod
+    async def _first_success(tasks, preferred, state: FunctionState, win_counter: str) -> Tuple[asyncio.Future, Dict[str, Any]]:
+        """(task, result) of whichever task succeeds first; if all fail, the error of `preferred`"""
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if not task.cancelled() and task.exception() is None:
+                    if task is not preferred:
+                        state.count(win_counter)
+                    return task, task.result()
+        failed = [task for task in [preferred, *tasks] if not task.cancelled()]
+        if not failed:
+            raise asyncio.CancelledError()
+        raise failed[0].exception()
+
+    async def _send_with_failover(self, state, messages, functions, function_name, timeout) -> Tuple[LLMProvider, Dict[str, Any]]:
+        """(provider that answered, result): primary (hedged); past its budget or on an error, the fallback provider races it"""
+        started = time.monotonic()
+        primary = asyncio.ensure_future(self._send_hedged(state, messages, functions, function_name, timeout))
+        if self.secondary is None:
+            return self.primary, await primary
+
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=min(state.policy.primary_budget_seconds, timeout))
+            if done and (primary.exception() is None or not isinstance(primary.exception(), retryable_errors())):
+                return self.primary, primary.result()
+            state.count("failovers")
+            tasks.add(asyncio.ensure_future(self._timed_call_async(
+                state, self.secondary, messages, functions, function_name, timeout - (time.monotonic() - started))))
+            winner, parsed = await self._first_success(tasks, primary, state, "failover_wins")
+            return (self.primary if winner is primary else self.secondary), parsed
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def _timed_stream(self, state, provider, messages, functions, function_name, timeout, queue, streamed: asyncio.Event):
+        start = time.perf_counter()
+        try:
+            parsed = await provider.stream_async(messages, functions, function_name, timeout, queue, streamed.set)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            provider.histogram(function_name).record_error()
+            # The user already saw part of this reply, so it is not retried
+            e.streamed = streamed.is_set()
+            raise
+        self._record(state, provider, function_name, start)
+        return parsed
+
+    async def _stream_with_failover(self, state, messages, functions, function_name, timeout, queue) -> Tuple[LLMProvider, Dict[str, Any]]:
+        """(provider that answered, result): stream from the primary; if it has sent no text within its budget or
+        fails first, stream from the fallback"""
+        started = time.monotonic()
+        streamed = asyncio.Event()
+        primary = asyncio.ensure_future(self._timed_stream(
+            state, self.primary, messages, functions, function_name, timeout, queue, streamed))
+        if self.secondary is None:
+            return self.primary, await primary
+
+        first_text = asyncio.ensure_future(streamed.wait())
+        try:
+            await asyncio.wait({primary, first_text}, timeout=min(state.policy.primary_budget_seconds, timeout),
+                               return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            first_text.cancel()
+        # Once text reached the user the reply cannot switch providers
+        if streamed.is_set() or (primary.done() and not isinstance(primary.exception(), retryable_errors())):
+            return self.primary, await primary
+
+        primary_error = primary.exception() if primary.done() else None
+        primary.cancel()
+        state.count("failovers")
+        try:
+            parsed = await self._timed_stream(state, self.secondary, messages, functions, function_name,
+                                              timeout - (time.monotonic() - started), queue, asyncio.Event())
+        except retryable_errors():
+            if primary_error is not None:
+                raise primary_error
+            raise
+        state.count("failover_wins")
+        return self.secondary, parsed
+
+    def stats(self) -> Dict[str, Any]:
+        providers = [self.primary] + ([self.secondary] if self.secondary else [])
+        return {
+            "functions": {name: state.stats() for name, state in sorted(self._functions.items())},
+            "providers": {provider.name: provider.stats() for provider in providers},
+        }
+
+
+llm_gateway = LLMGateway(get_llm_gateway_settings())
@@ -0,0 +1,372 @@
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.config import get_async_gpt_client, get_gemini_client, get_gpt_client, get_gpt_model, get_llm_model
+from core.llm_usage import llm_usage
+from core.partial_json import StringFieldStream
+
+
+class ProviderUnavailable(Exception):
+    """A provider failed in a way another attempt (or another provider) may not"""
+
+
+# openai, httpx and aiohttp are only imported on the first LLM call, to keep cold start cheap
+
+@lru_cache(maxsize=None)
+def retryable_errors() -> Tuple[type, ...]:
+    """Transient errors worth another attempt; anything else (bad request, auth) is raised as is"""
+    import openai
+
+    return (
+        openai.APIConnectionError,  # includes APITimeoutError
+        openai.RateLimitError,
+        openai.InternalServerError,
+        ProviderUnavailable,
+    )
+
+
+@lru_cache(maxsize=None)
+def gemini_transport_errors() -> Tuple[type, ...]:
+    import httpx
+
+    try:
+        # google-genai sends its async requests through aiohttp when it is installed
+        import aiohttp
+        return (httpx.TransportError, aiohttp.ClientError, asyncio.TimeoutError)
+    except ImportError:
+        return (httpx.TransportError, asyncio.TimeoutError)
+
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS_MS = (250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.errors = 0
+        self.total_ms = 0.0
+
+    def record(self, ms: float):
+        index = next((i for i, bound in enumerate(LATENCY_BUCKETS_MS) if ms <= bound), len(LATENCY_BUCKETS_MS))
+        with self._lock:
+            self.counts[index] += 1
+            self.total_ms += ms
+
+    def record_error(self):
+        with self._lock:
+            self.errors += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            count = sum(self.counts)
+            buckets = {f"le_{bound}": n for bound, n in zip(LATENCY_BUCKETS_MS, self.counts)}
+            buckets["inf"] = self.counts[-1]
+            return {
+                "count": count,
+                "errors": self.errors,
+                "mean_ms": round(self.total_ms / count, 1) if count else None,
+                "buckets": buckets,
+            }
+
+
+class TokenUsage:
+    """Prompt, cached-prompt and completion token totals reported by the API for one function"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.completion_tokens = 0
+
+    def record(self, prompt_tokens: int, cached_tokens: int, completion_tokens: int):
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.cached_tokens += cached_tokens
+            self.completion_tokens += completion_tokens
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "prompt_tokens": self.prompt_tokens,
+                "cached_tokens": self.cached_tokens,
+                "completion_tokens": self.completion_tokens,
+                "cached_ratio": round(self.cached_tokens / self.prompt_tokens, 3) if self.prompt_tokens else None,
+            }
+
+
+class LLMProvider(ABC):
+    """One LLM backend behind the forced-function-call interface the handlers use.
+
+    `functions` is one of our prompts/*.json schemas (OpenAI function format)
+    and the result is the parsed function arguments. Every call's latency and
+    token usage are recorded per function.
+    """
+
+    name = "provider"
+    model = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._usage: Dict[str, TokenUsage] = {}
+
+    def histogram(self, function_name: str) -> LatencyHistogram:
+        histogram = self._histograms.get(function_name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(function_name, LatencyHistogram())
+        return histogram
+
+    def record_usage(self, function_name: str, prompt_tokens: int, cached_tokens: int, completion_tokens: int,
+                     started: float):
+        """Token counts from the API's usage field; `started` is the call's perf_counter start"""
+        prompt_tokens, cached_tokens, completion_tokens = prompt_tokens or 0, cached_tokens or 0, completion_tokens or 0
+        usage = self._usage.get(function_name)
+        if usage is None:
+            with self._lock:
+                usage = self._usage.setdefault(function_name, TokenUsage())
+        usage.record(prompt_tokens, cached_tokens, completion_tokens)
+        llm_usage.record(function_name, self.model, prompt_tokens, cached_tokens, completion_tokens,
+                         (time.perf_counter() - started) * 1000)
+
+    @abstractmethod
+    def call(self, messages: List[Dict], functions: Dict, function_name: str, timeout: float) -> Dict[str, Any]:
+        """Parsed arguments of a forced call of `function_name`, within `timeout` seconds"""
+        pass
+
+    @abstractmethod
+    async def call_async(self, messages: List[Dict], functions: Dict, function_name: str, timeout: float) -> Dict[str, Any]:
+        """Async `call`"""
+        pass
+
+    async def stream_async(self, messages: List[Dict], functions: Dict, function_name: str, timeout: float,
+                           queue: asyncio.Queue, on_text=None) -> Dict[str, Any]:
+        """Push the `response` field to `queue`; providers without argument streaming send it in one piece"""
+        parsed = await self.call_async(messages, functions, function_name, timeout)
+        if parsed.get("response"):
+            if on_text:
+                on_text()
+            queue.put_nowait(parsed["response"])
+        return parsed
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "functions": {name: histogram.snapshot() for name, histogram in sorted(self._histograms.items())},
+            "usage": {name: usage.snapshot() for name, usage in sorted(self._usage.items())},
+        }
+
+
+class OpenAIProvider(LLMProvider):
+    name = "openai"
+
+    @property
+    def model(self):
+        return get_gpt_model()
+
+    def _kwargs(self, messages, functions, function_name) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "messages": messages,
+            "functions": [functions],
+            "function_call": {"name": function_name},
+            # Calls of one function share their instruction and schema prefix; keep them on the same cache
+            "prompt_cache_key": function_name,
+        }
+
+    def _record_usage(self, function_name, usage, started):
+        if usage is None:
+            return
+        details = usage.prompt_tokens_details
+        self.record_usage(function_name, usage.prompt_tokens, details.cached_tokens if details else 0,
+                          usage.completion_tokens, started)
+
+    def call(self, messages, functions, function_name, timeout):
+        started = time.perf_counter()
+        # The gateway owns retries, so the SDK's own are turned off
+        client = get_gpt_client().with_options(timeout=timeout, max_retries=0)
+        response = client.chat.completions.create(**self._kwargs(messages, functions, function_name))
+        self._record_usage(function_name, response.usage, started)
+        return json.loads(response.choices[0].message.function_call.arguments)
+
+    async def call_async(self, messages, functions, function_name, timeout):
+        started = time.perf_counter()
+        client = get_async_gpt_client().with_options(timeout=timeout, max_retries=0)
+        response = await client.chat.completions.create(**self._kwargs(messages, functions, function_name))
+        self._record_usage(function_name, response.usage, started)
+        return json.loads(response.choices[0].message.function_call.arguments)
+
+    async def stream_async(self, messages, functions, function_name, timeout, queue, on_text=None):
+        started = time.perf_counter()
+        client = get_async_gpt_client().with_options(timeout=timeout, max_retries=0)
+        stream = await client.chat.completions.create(
+            **self._kwargs(messages, functions, function_name), stream=True, stream_options={"include_usage": True})
+
+        # Arguments arrive as JSON fragments; forward the `response` text before the object is complete
+        response_field = StringFieldStream("response")
+        arguments = []
+        async for chunk in stream:
+            # Usage comes on a final chunk without choices
+            if getattr(chunk, "usage", None) is not None:
+                self._record_usage(function_name, chunk.usage, started)
+            if not chunk.choices:
+                continue
+            function_call = chunk.choices[0].delta.function_call
+            if function_call is None or not function_call.arguments:
+                continue
+            arguments.append(function_call.arguments)
+            text = response_field.feed(function_call.arguments)
+            if text:
+                if on_text:
+                    on_text()
+                queue.put_nowait(text)
+
+        return json.loads("".join(arguments))
+
+
+def to_gemini_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON schema (as used in prompts/*.json) -> Gemini Schema fields.
+
+    Gemini takes a single upper-case type plus `nullable` instead of a type
+    list such as ["string", "null"], only string enums, and only the
+    keywords below. Allowed values of a non-string enum move to the
+    description.
+    """
+    converted: Dict[str, Any] = {}
+    schema_type = schema.get("type")
+    if isinstance(schema_type, list):
+        non_null = [t for t in schema_type if t != "null"]
+        if len(non_null) != len(schema_type):
+            converted["nullable"] = True
+        schema_type = non_null[0] if non_null else "string"
+    if schema_type:
+        converted["type"] = schema_type.upper()
+    for key in ("description", "required"):
+        if key in schema:
+            converted[key] = schema[key]
+    if "enum" in schema:
+        if converted.get("type") == "STRING":
+            converted["enum"] = [value for value in schema["enum"] if value is not None]
+        else:
+            allowed = ", ".join(json.dumps(value) for value in schema["enum"])
+            converted["description"] = f"{converted.get('description', '')} One of: {allowed}.".strip()
+    if "properties" in schema:
+        converted["properties"] = {name: to_gemini_schema(value) for name, value in schema["properties"].items()}
+    if "items" in schema:
+        converted["items"] = to_gemini_schema(schema["items"])
+    return converted
+
+
+def to_gemini_contents(messages: List[Dict]) -> Tuple[Optional[str], List[Dict[str, Any]]]:
+    """OpenAI chat messages -> (system instruction, Gemini contents); consecutive turns of one role are merged"""
+    system_parts = []
+    contents: List[Dict[str, Any]] = []
+    for message in messages:
+        text = str(message.get("content") or "")
+        if message.get("role") == "system":
+            system_parts.append(text)
+            continue
+        role = "model" if message.get("role") in ("assistant", "model") else "user"
+        if contents and contents[-1]["role"] == role:
+            contents[-1]["parts"].append({"text": text})
+        else:
+            contents.append({"role": role, "parts": [{"text": text}]})
+    return "\n\n".join(system_parts) or None, contents
+
+
+class GeminiProvider(LLMProvider):
+    name = "gemini"
+
+    def __init__(self):
+        super().__init__()
+        self._declarations: Dict[str, Any] = {}
+
+    @property
+    def model(self):
+        return get_llm_model()
+
+    def _declaration(self, functions: Dict[str, Any]):
+        from google.genai import types
+
+        digest = hashlib.sha256(json.dumps(functions, sort_keys=True).encode("utf-8")).hexdigest()
+        declaration = self._declarations.get(digest)
+        if declaration is None:
+            declaration = types.FunctionDeclaration(
+                name=functions["name"],
+                description=functions.get("description"),
+                parameters=types.Schema.model_validate(to_gemini_schema(functions["parameters"])),
+            )
+            self._declarations[digest] = declaration
+        return declaration
+
+    def _request(self, messages, functions, function_name, timeout):
+        from google.genai import types
+
+        system_instruction, contents = to_gemini_contents(messages)
+        config = types.GenerateContentConfig(
+            system_instruction=system_instruction,
+            tools=[types.Tool(function_declarations=[self._declaration(functions)])],
+            tool_config=types.ToolConfig(function_calling_config=types.FunctionCallingConfig(
+                mode="ANY", allowed_function_names=[function_name])),
+            http_options=types.HttpOptions(timeout=int(timeout * 1000)),
+        )
+        return {"model": self.model, "contents": contents, "config": config}
+
+    def _arguments(self, function_name, response, started) -> Dict[str, Any]:
+        usage = response.usage_metadata
+        if usage is not None:
+            self.record_usage(function_name, usage.prompt_token_count, usage.cached_content_token_count,
+                              usage.candidates_token_count, started)
+        calls = response.function_calls or []
+        if not calls:
+            raise ProviderUnavailable("Gemini returned no function call")
+        # Round-trip to plain JSON types, as the OpenAI path returns
+        return json.loads(json.dumps(calls[0].args or {}))
+
+    @staticmethod
+    def _unavailable(error: Exception) -> Optional[ProviderUnavailable]:
+        """Rate limits, 5xx and transport errors (timeouts included) count as unavailability"""
+        from google.genai import errors
+
+        if isinstance(error, gemini_transport_errors()):
+            return ProviderUnavailable(f"Gemini transport error: {error!r}")
+        if isinstance(error, errors.APIError) and (error.code == 429 or error.code >= 500):
+            return ProviderUnavailable(f"Gemini error {error.code}: {error.message}")
+        return None
+
+    def call(self, messages, functions, function_name, timeout):
+        started = time.perf_counter()
+        try:
+            response = get_gemini_client().models.generate_content(**self._request(messages, functions, function_name, timeout))
+        except Exception as e:
+            unavailable = self._unavailable(e)
+            if unavailable is None:
+                raise
+            raise unavailable from e
+        return self._arguments(function_name, response, started)
+
+    async def call_async(self, messages, functions, function_name, timeout):
+        started = time.perf_counter()
+        try:
+            response = await get_gemini_client().aio.models.generate_content(
+                **self._request(messages, functions, function_name, timeout))
+        except Exception as e:
+            unavailable = self._unavailable(e)
+            if unavailable is None:
+                raise
+            raise unavailable from e
+        return self._arguments(function_name, response, started)
+
+
+PROVIDERS = {"openai": OpenAIProvider, "gemini": GeminiProvider}
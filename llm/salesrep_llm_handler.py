@@ -1,103 +1,85 @@
+import asyncio
 
-
-from core.helper_core import load_prompt, call_openai, extract_json, store_message_faq, get_max_messages, handle_log_sales, handle_intent, load_functions
-from core.helper_core_v2 import detect_language
-from core.chat_core import Chat
+from config.config import get_combined_intent_language
+from core.helper_core import get_max_messages, handle_log_sales_async
+from core.prompt_assembly import build_messages
+from core.prompt_registry import get_prompt
+from core.speculation import Speculation
+from core.helper_core_v2 import handle_intent_async, handle_intent_language_async
+from core.llm_common import call_openai_async, detect_conversation_language_async
+from core.chat_core import AsyncChat
 
 max = get_max_messages()
 
-def handle_general_questions(chat_id, prompt):
-  
-  chat = Chat()
+async def prepare_general_question(chat_id, prompt, language=None, with_language=True):
+  """History and language of a general question; no LLM answer. With `with_language=False` the language is left as None"""
+  chat = AsyncChat()
+  if not with_language:
+    return {"history": await chat.get_recent_messages(chat_id, max_messages=max), "language": None}
+  history, detected_language = await asyncio.gather(
+    chat.get_recent_messages(chat_id, max_messages=max),
+    detect_conversation_language_async(chat_id, prompt, language))
+  return {"history": history, "language": detected_language}
 
-  system_instruction = load_prompt("prompts/ask_sales_rep_general_questions.txt")
-  functions = load_functions("prompts/ask_sales_rep_general_questions.json")
-  
-  history = chat.get_recent_messages(chat_id, max_messages=max)
-  history.append({
-    "role": "user",
-    "content": prompt
-  })
-  
-  detected_language = detect_language(prompt)
 
-  history.append({
-      "role": "system", 
-      "content": f" Strictly follow this language: {detected_language} when responding." + system_instruction 
-  })
+async def _answer_general_question(prompt, prepared):
+  prompt_entry = get_prompt("ask_sales_rep_general_questions")
+  messages = build_messages(
+    prompt_entry.instruction, prepared["history"], prompt,
+    f"Strictly follow this language: {prepared['language']} when responding.")
+  return await call_openai_async(
+    messages, prompt_entry.functions, "feed_advisory", stream_response=True, cache=False, prompt_key=prompt_entry.key)
+
+
+def speculate_general_question(chat_id, prompt, mode):
+  """Start the general-question handler while the intent is classified; "full" also starts the answer call.
+  In "context" mode a combined classifier returns the language, so it is not detected here."""
+  with_language = mode == "full" or not get_combined_intent_language()
+
+  async def run():
+    prepared = await prepare_general_question(chat_id, prompt, with_language=with_language)
+    if mode == "full":
+      prepared["parsed"] = await _answer_general_question(prompt, prepared)
+    return prepared
 
-  messages = history
+  return Speculation("salesrep_general_question", run)
 
-  parsed = call_openai(messages, functions, "feed_advisory")
 
-  # store_message_faq(chat_id, prompt, parsed["response"], parsed["log_type"])
-  return parsed
+async def handle_general_questions_async(chat_id, prompt, language=None, speculation=None):
+  prepared = await speculation.claim() if speculation is not None else None
+  if prepared is None:
+    prepared = await prepare_general_question(chat_id, prompt, language)
+  if prepared["language"] is None:
+    prepared["language"] = await detect_conversation_language_async(chat_id, prompt, language)
+  return prepared.get("parsed") or await _answer_general_question(prompt, prepared)
 
   
-def handle_field_product_log(chat_id, user_id, prompt):
-  return handle_log_sales(
-    chat_id,
-    user_id,
-    prompt,
-    "prompts/ask_salesrep_product_field_log",
-    "incident_details",
-    "log_feed_issue",
-    lambda salesrep, user_id, form_data, parsed: salesrep.create_field_product_incident(
-      user_id, form_data, parsed["tag"]
-    )
-  )
-def handle_dealer_log(chat_id, user_id, prompt):
-  return handle_log_sales(
-    chat_id,
-    user_id,
-    prompt,
-    "prompts/ask_salesrep_dealer_log",
-    "incident_details",
-    "log_dealer_issue",
-    lambda salesrep, user_id, form_data, parsed: salesrep.create_dealer_incident(
-      user_id, form_data, parsed["tag"]
-    )
-  )
+def on_field_product_complete(salesrep, user_id, form_data, parsed):
+  salesrep.create_field_product_incident(user_id, form_data, parsed["tag"])
+
+def on_dealer_complete(salesrep, user_id, form_data, parsed):
+  salesrep.create_dealer_incident(user_id, form_data, parsed["tag"])
+
+def on_sales_complete(salesrep, user_id, form_data, parsed):
+  salesrep.create_sales_report(user_id, form_data)
+
+def on_farm_complete(salesrep, user_id, form_data, parsed):
+  visit_details = parsed["visit_details"]    
+  visit_type = visit_details["visit_type"]
+  ticket_number = visit_details.get("ticket_number")
+
+  if visit_type == "planned_visit":
+    ticket_number = salesrep.generate_ticket_number(user_id)
+    visit_details["ticket_number"] = ticket_number
+    form_data["ticket_number"] = ticket_number
+    salesrep.create_visit_report(user_id, form_data)
+
+  elif visit_type == "completed_visit" and ticket_number:
+    if salesrep.check_ticket_number_validity(ticket_number, user_id):
+      salesrep.update_visit_report(ticket_number, user_id, form_data)
+      parsed["visit_details"]["ticket_number"] = ticket_number
 
-def handle_sales_log(chat_id, user_id, prompt):
-  return handle_log_sales(
-    chat_id,
-    user_id,
-    prompt,
-    "prompts/ask_salesrep_sales_log",
-    "sales_details",
-    "log_sales_activity",
-    lambda salesrep, user_id, form_data, parsed: salesrep.create_sales_report(
-      user_id, form_data
-    )
-  )
 
-def handle_farm_log(chat_id, user_id, prompt):
-  def on_farm_complete(salesrep, user_id, form_data, parsed):
-    visit_details = parsed["visit_details"]    
-    visit_type = visit_details["visit_type"]
-    ticket_number = visit_details.get("ticket_number")
-
-    if visit_type == "planned_visit":
-      ticket_number = salesrep.generate_ticket_number(user_id)
-      visit_details["ticket_number"] = ticket_number
-      form_data["ticket_number"] = ticket_number
-      salesrep.create_visit_report(user_id, form_data)
-
-    elif visit_type == "completed_visit" and ticket_number:
-      if salesrep.check_ticket_number_validity(ticket_number, user_id):
-        salesrep.update_visit_report(ticket_number, user_id, form_data)
-        parsed["visit_details"]["ticket_number"] = ticket_number
-
-  return handle_log_sales(
-      chat_id,
-      user_id,
-      prompt,
-      "prompts/ask_salesrep_farm_log",
-      "visit_details",
-      "log_farm_visit",
-      on_farm_complete
-  )
 def handle_requested_file(response):
   
   # Sample response
@@ -156,6 +138,37 @@ def handle_support_forms(response):
       }
   }
 
-def get_intent(prompt, prompt_file, function_name):
-  return handle_intent(prompt, prompt_file, function_name)
+async def handle_field_product_log_async(chat_id, user_id, prompt, language=None):
+  return await handle_log_sales_async(
+    chat_id, user_id, prompt,
+    "ask_salesrep_product_field_log", "incident_details", "log_feed_issue",
+    on_field_product_complete, language=language
+  )
+
+async def handle_dealer_log_async(chat_id, user_id, prompt, language=None):
+  return await handle_log_sales_async(
+    chat_id, user_id, prompt,
+    "ask_salesrep_dealer_log", "incident_details", "log_dealer_issue",
+    on_dealer_complete, language=language
+  )
+
+async def handle_sales_log_async(chat_id, user_id, prompt, language=None):
+  return await handle_log_sales_async(
+    chat_id, user_id, prompt,
+    "ask_salesrep_sales_log", "sales_details", "log_sales_activity",
+    on_sales_complete, language=language
+  )
+
+async def handle_farm_log_async(chat_id, user_id, prompt, language=None):
+  return await handle_log_sales_async(
+    chat_id, user_id, prompt,
+    "ask_salesrep_farm_log", "visit_details", "log_farm_visit",
+    on_farm_complete, language=language
+  )
+
+async def get_intent_async(prompt, prompt_file, function_name):
+  return await handle_intent_async(prompt, prompt_file, function_name)
+
+async def get_intent_language_async(prompt, prompt_file):
+  return await handle_intent_language_async(prompt, prompt_file)
 
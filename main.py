@@ -1,13 +1,53 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from config.config import get_client_registry, get_warmup_settings
+from core.language_id import language_id_stats
+from core.language_memo import language_memo
+from core.classifier.intent_model import intent_model_stats
+from core.classifier.intent_rules import get_intent_rules
+from core.form_completion import completion_stats
+from core.form_flow import form_flow_stats
+from core.speculation import speculation_stats
+from core.faq_index import faq_index
+from core.llm_cache import llm_cache
+from core.prompt_registry import prompt_registry
+from core.request_scope import RequestScopeMiddleware
+from core.step_executor import step_metrics
+from core.warmup_core import get_warmup
 from exceptions.global_exception import GlobalException
+from llm.llm_gateway import llm_gateway
 from services import farmer_services, farmer_services_v2, salesrep_services, view_models_services, admin_services
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One set of backend clients per worker, shared by every request
+    registry = get_client_registry()
+    registry.open()
+
+    # Preload prompts, connections and reference tables before the first request
+    warmup_task = None
+    if get_warmup_settings()["background"]:
+        warmup_task = asyncio.create_task(run_in_threadpool(get_warmup().run))
+    else:
+        await run_in_threadpool(get_warmup().run)
+
+    yield
+
+    if warmup_task is not None and not warmup_task.done():
+        warmup_task.cancel()
+    await registry.aclose()
+
+
 app = FastAPI(
     title="My FastAPI App",
     description="A basic FastAPI routing template",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 
@@ -34,7 +74,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],                # Allows all HTTP methods
     allow_headers=["*"],                # Allows all headers
+    expose_headers=["X-DB-Queries", "X-DB-Dedup-Hits"],
 )
+# Per-request identity map for repeated reads; reports the request's data query count
+app.add_middleware(RequestScopeMiddleware)
 
 # Include routes from services
 app.include_router(farmer_services.router, prefix="/farmer", tags=["Farmer"])
@@ -50,3 +93,83 @@ app.include_router(admin_services.router,
 @app.get("/")
 async def helloworld():
     return {"message": "Hello World"}
+
+
+# Client/connection counts for this worker, used to confirm pool reuse
+@app.get("/health/clients")
+async def client_stats():
+    return {"message": "Success", "data": get_client_registry().stats()}
+
+
+# Per-step timings of the concurrent chat pipelines (count / mean / max per step)
+@app.get("/health/steps")
+async def step_stats():
+    return {"message": "Success", "data": step_metrics.snapshot()}
+
+
+# How often language detection was answered without the LLM detector
+@app.get("/health/language")
+async def language_stats():
+    return {"message": "Success", "data": {"identifier": language_id_stats.snapshot(), "memo": language_memo.stats()}}
+
+
+# Per-rule hit rates of the intent fast path and its agreement with the labelled sample
+@app.get("/health/intent-rules")
+async def intent_rule_stats():
+    rules = get_intent_rules()
+    return {"message": "Success", "data": rules.stats() if rules is not None else None}
+
+
+# Share of turns per chat role whose intent came from the local model instead of the LLM classifier
+@app.get("/health/intent-model")
+async def intent_model_health():
+    return {"message": "Success", "data": intent_model_stats.snapshot()}
+
+
+# How often a half-filled log form routed the turn without classification, and why the rest were reclassified
+@app.get("/health/form-flow")
+async def form_flow_health():
+    return {"message": "Success", "data": form_flow_stats.snapshot()}
+
+
+# Hit rate of the speculative general-question handler, and the tokens its discarded runs spent
+@app.get("/health/speculation")
+async def speculation_health():
+    return {"message": "Success", "data": speculation_stats.snapshot()}
+
+
+# Share of log forms finalised locally, without waiting for the LLM's log_complete
+@app.get("/health/log-completion")
+async def log_completion_health():
+    return {"message": "Success", "data": completion_stats.snapshot()}
+
+
+# Content hash of every loaded prompt/schema pair, to confirm which prompt version a worker serves
+@app.get("/health/prompts")
+async def prompt_hashes():
+    return {"message": "Success", "data": prompt_registry.hashes()}
+
+
+# Hit/miss counts of the exact-match LLM response cache, per function
+@app.get("/health/llm-cache")
+async def llm_cache_stats():
+    return {"message": "Success", "data": llm_cache.stats()}
+
+
+# Per-function LLM gateway counters (retries, hedges, failovers, breaker state, p50/p95); per-provider latency and cached-token usage
+@app.get("/health/llm")
+async def llm_gateway_stats():
+    return {"message": "Success", "data": llm_gateway.stats()}
+
+
+# Size and hit rate of the near-duplicate FAQ answer index
+@app.get("/health/faq")
+async def faq_index_stats():
+    return {"message": "Success", "data": faq_index.stats()}
+
+
+# Readiness probe: 503 until the startup warm-up has finished
+@app.get("/ready")
+async def readiness():
+    status = get_warmup().status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
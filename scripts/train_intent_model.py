@@ -0,0 +1,284 @@
+"""Train the local intent classifier (core/classifier/intent_model.py) for one chat role.
+
+Training rows are user messages labelled with the intent the LLM decided.
+Chat turns record it in the user message's metadata (`intent_id`,
+`intent_source`, `intent_role`), so they can be exported straight from
+chat_messages with --from-db, or read from a JSONL/CSV export (`message` or
+`text`, plus `intent` or the metadata). Unlabelled rows can be labelled by
+the LLM classifier with --label-with-llm.
+
+    python scripts/train_intent_model.py --role farmer --from-db --labels-output data/intent_labelled_farmer.jsonl
+    python scripts/train_intent_model.py --role salesrep --input data/intent_seed_salesrep.jsonl
+
+A deterministic share of the rows (--holdout) is kept out of training and
+written to --eval-output for benchmarks/bench_intent_model.py.
+
+The serving threshold is calibrated on the training rows by k-fold
+cross-validation: the lowest confidence at which the out-of-fold predictions
+of routable intents reach --target-precision (over at least --min-served
+rows). It is stored in the model file with the precision and coverage
+measured there; INTENT_MODEL_THRESHOLD overrides it. When no threshold
+reaches the target the model serves nothing.
+"""
+import argparse
+import csv
+import hashlib
+import json
+import math
+import os
+import random
+import sys
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.classifier.intent_model import IntentModel, features, scaled  # noqa: E402
+
+ROLE_DEFAULTS = {
+    # input, prompt file of the LLM classifier, intents whose handlers need nothing else from it.
+    # The classifiers return 1, 4, 5 or 6; 4-6 need its generated reply, guide or help request.
+    "farmer": ("data/intent_samples.jsonl", "ask_farmer_intent", "1"),
+    "salesrep": ("data/intent_seed_salesrep.jsonl", "ask_salesrep_intent", "1"),
+}
+
+
+def metadata_of(record):
+    metadata = record.get("message_metadata") or record.get("metadata") or {}
+    if isinstance(metadata, str):
+        try:
+            metadata = json.loads(metadata)
+        except ValueError:
+            metadata = {}
+    return metadata
+
+
+def to_row(record, role, sources):
+    text = (record.get("message") or record.get("text") or "").strip()
+    if not text:
+        return None
+    intent = record.get("intent")
+    metadata = metadata_of(record)
+    if intent is None and metadata.get("intent_id") is not None:
+        # Only intents the classifier decided are labels; chat modes picked in the app are not
+        if metadata.get("intent_source") not in sources or metadata.get("intent_role", role) != role:
+            return None
+        intent = metadata["intent_id"]
+    return {"text": text, "intent": int(intent) if intent is not None else None}
+
+
+def read_rows(path, role, sources):
+    with open(path, "r", encoding="utf-8") as file:
+        if path.endswith(".csv"):
+            records = list(csv.DictReader(file))
+        else:
+            records = [json.loads(line) for line in file if line.strip()]
+    rows = []
+    for record in records:
+        if record.get("role") not in (None, "", "user"):
+            continue
+        row = to_row(record, role, sources)
+        if row:
+            rows.append(row)
+    return rows
+
+
+def export_rows(role, sources, page_size=1000):
+    """User messages with a recorded intent, straight from chat_messages"""
+    from config.config import get_data_client
+
+    client = get_data_client()
+    rows = []
+    start = 0
+    while True:
+        response = client.table("chat_messages") \
+            .select("message, message_metadata") \
+            .eq("role", "user") \
+            .eq("message_metadata->>intent_role", role) \
+            .in_("message_metadata->>intent_source", list(sources)) \
+            .order("id") \
+            .range(start, start + page_size - 1) \
+            .execute()
+        batch = response.data or []
+        rows.extend(row for row in (to_row(record, role, sources) for record in batch) if row)
+        if len(batch) < page_size:
+            return rows
+        start += page_size
+
+
+def label_with_llm(rows, prompt_file):
+    from core.helper_core import handle_intent
+
+    for row in rows:
+        if row["intent"] is None:
+            row["intent"] = handle_intent(row["text"], prompt_file, "classify_intent")["id"]
+    return rows
+
+
+def is_holdout(text, share):
+    digest = hashlib.sha1(text.encode("utf-8")).digest()
+    return digest[0] / 256 < share
+
+
+def train(rows, intents, char_orders, word_orders, epochs, learning_rate, l2, max_features, seed=7):
+    """Multinomial logistic regression by SGD; returns (bias, weights)"""
+    vectors = [scaled(features(row["text"], char_orders, word_orders)) for row in rows]
+    document_frequency = Counter(gram for vector in vectors for gram in vector)
+    vocabulary = {gram for gram, _ in document_frequency.most_common(max_features)}
+    vectors = [{gram: value for gram, value in vector.items() if gram in vocabulary} for vector in vectors]
+    targets = [intents.index(row["intent"]) for row in rows]
+
+    size = len(intents)
+    bias = [0.0] * size
+    weights = {gram: [0.0] * size for gram in vocabulary}
+    order = list(range(len(rows)))
+    generator = random.Random(seed)
+    for epoch in range(epochs):
+        generator.shuffle(order)
+        rate = learning_rate / (1 + epoch * 0.1)
+        for index in order:
+            vector = vectors[index]
+            scores = list(bias)
+            for gram, value in vector.items():
+                for i, weight in enumerate(weights[gram]):
+                    scores[i] += weight * value
+            top = max(scores)
+            exps = [math.exp(score - top) for score in scores]
+            total = sum(exps)
+            gradient = [value / total for value in exps]
+            gradient[targets[index]] -= 1.0
+            for i in range(size):
+                bias[i] -= rate * gradient[i]
+            for gram, value in vector.items():
+                row = weights[gram]
+                for i in range(size):
+                    row[i] -= rate * (gradient[i] * value + l2 * row[i])
+    return bias, weights
+
+
+def fold_of(text, folds):
+    return int.from_bytes(hashlib.sha1(text.encode("utf-8")).digest()[1:5], "big") % folds
+
+
+def build_model(role, intents, routable, char_orders, word_orders, rows, bias, weights, min_weight):
+    return {
+        "role": role,
+        "intents": intents,
+        "routable": routable,
+        "char_orders": list(char_orders),
+        "word_orders": list(word_orders),
+        "trained_on": len(rows),
+        "bias": [round(value, 4) for value in bias],
+        # Features whose weights are all near zero add size but not accuracy
+        "weights": {
+            gram: [round(value, 4) for value in row]
+            for gram, row in sorted(weights.items()) if max(abs(value) for value in row) >= min_weight
+        },
+    }
+
+
+def out_of_fold(rows, folds, fit):
+    """(predicted intent, confidence, label) of every row, each from a model trained without its fold"""
+    predictions = []
+    for fold in range(folds):
+        training = [row for row in rows if fold_of(row["text"], folds) != fold]
+        model = IntentModel(fit(training))
+        for row in rows:
+            if fold_of(row["text"], folds) == fold:
+                predictions.append((*model.predict(row["text"]), row["intent"]))
+    return predictions
+
+
+def calibrate(predictions, routable, target_precision, min_served):
+    """Lowest threshold whose served (routable, confident) predictions reach the target precision"""
+    candidates = sorted({confidence for intent, confidence, _ in predictions if intent in routable})
+    for threshold in candidates:
+        served = [(intent, label) for intent, confidence, label in predictions
+                  if confidence >= threshold and intent in routable]
+        if len(served) < min_served:
+            break
+        precision = sum(intent == label for intent, label in served) / len(served)
+        if precision >= target_precision:
+            return {
+                "threshold": threshold,
+                "precision": round(precision, 3),
+                "coverage": round(len(served) / len(predictions), 3),
+                "served": len(served),
+            }
+    return {"threshold": None, "precision": None, "coverage": 0.0, "served": 0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--role", choices=sorted(ROLE_DEFAULTS), default="farmer")
+    parser.add_argument("--input", help="JSONL/CSV export (default: the role's seed file)")
+    parser.add_argument("--from-db", action="store_true", help="Export labelled user messages from chat_messages")
+    parser.add_argument("--sources", default="llm", help="intent_source values accepted as labels (comma separated)")
+    parser.add_argument("--output", help="Model file (default: data/intent_model_<role>.json)")
+    parser.add_argument("--eval-output", help="Held-out rows (default: data/intent_eval_<role>.jsonl)")
+    parser.add_argument("--labels-output", help="Write the (LLM-)labelled rows here")
+    parser.add_argument("--label-with-llm", action="store_true")
+    parser.add_argument("--routable", help="Intents the model may route (default depends on the role)")
+    parser.add_argument("--holdout", type=float, default=0.2)
+    parser.add_argument("--char-orders", default="2,3,4")
+    parser.add_argument("--word-orders", default="1,2")
+    parser.add_argument("--epochs", type=int, default=40)
+    parser.add_argument("--learning-rate", type=float, default=0.5)
+    parser.add_argument("--l2", type=float, default=1e-4)
+    parser.add_argument("--max-features", type=int, default=20000)
+    parser.add_argument("--min-weight", type=float, default=1e-3, help="Features below this weight are dropped")
+    parser.add_argument("--folds", type=int, default=5, help="Cross-validation folds for the threshold")
+    parser.add_argument("--target-precision", type=float, default=0.95)
+    parser.add_argument("--min-served", type=int, default=10, help="Fewest served rows a threshold is judged on")
+    args = parser.parse_args()
+
+    seed_path, prompt_file, routable = ROLE_DEFAULTS[args.role]
+    sources = {source.strip() for source in args.sources.split(",") if source.strip()}
+    output = args.output or f"data/intent_model_{args.role}.json"
+    eval_output = args.eval_output or f"data/intent_eval_{args.role}.jsonl"
+
+    rows = export_rows(args.role, sources) if args.from_db else read_rows(args.input or seed_path, args.role, sources)
+    if args.label_with_llm:
+        rows = label_with_llm(rows, prompt_file)
+    if args.labels_output:
+        with open(args.labels_output, "w", encoding="utf-8") as file:
+            for row in rows:
+                file.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+    rows = [row for row in rows if row["intent"] is not None]
+    held_out = [row for row in rows if is_holdout(row["text"], args.holdout)]
+    training = [row for row in rows if not is_holdout(row["text"], args.holdout)]
+
+    intents = sorted({row["intent"] for row in training})
+    routable = [int(intent) for intent in (args.routable or routable).split(",")]
+    char_orders = tuple(int(order) for order in args.char_orders.split(","))
+    word_orders = tuple(int(order) for order in args.word_orders.split(","))
+
+    def fit(fit_rows):
+        bias, weights = train(fit_rows, intents, char_orders, word_orders,
+                              args.epochs, args.learning_rate, args.l2, args.max_features)
+        return build_model(args.role, intents, routable, char_orders, word_orders, fit_rows, bias, weights,
+                           args.min_weight)
+
+    calibration = calibrate(out_of_fold(training, args.folds, fit), set(routable),
+                            args.target_precision, args.min_served)
+    model = fit(training)
+    model["threshold"] = calibration.pop("threshold")
+    model["calibration"] = {"folds": args.folds, "target_precision": args.target_precision, **calibration}
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(model, file, ensure_ascii=False, separators=(",", ":"))
+    with open(eval_output, "w", encoding="utf-8") as file:
+        for row in held_out:
+            file.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+    size_kb = os.path.getsize(output) / 1024
+    print(f"Trained {args.role} model on {len(training)} rows (intents {intents}), held out {len(held_out)}, "
+          f"{len(model['weights'])} features, model {size_kb:.0f} KB -> {output}")
+    if model["threshold"] is None:
+        print(f"No threshold reaches precision {args.target_precision} in cross-validation; the model serves nothing")
+    else:
+        print(f"Threshold {model['threshold']}: cross-validated precision {model['calibration']['precision']}, "
+              f"coverage {model['calibration']['coverage']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""Train the on-box language identifier (core/language_id.py) from a chat_messages export.
+
+The export is JSONL or CSV with the user text in `message` (or `text`) and,
+optionally, a `language` column. Rows without a label can be labelled by the
+LLM detector with --label-with-llm; those labels are written back to
+--labels-output so the next run does not pay for them again.
+
+    python scripts/train_language_model.py --input chat_messages.csv --label-with-llm \
+        --labels-output data/chat_messages_labelled.jsonl
+
+A deterministic share of the rows (--holdout) is kept out of training and
+written to --eval-output for benchmarks/bench_language_id.py.
+
+Scores are calibrated by k-fold cross-validation on the training rows: the
+posterior scale with the lowest out-of-fold log loss, then a serving
+threshold per language, the lowest confidence at which out-of-fold answers of
+that language reach --target-precision (over at least --min-served rows).
+Both are stored in the model file with the precision and coverage measured
+there; LANGUAGE_ID_THRESHOLD overrides the thresholds. A language without a
+threshold is never answered locally; those turns go to the LLM detector.
+"""
+import argparse
+import csv
+import hashlib
+import json
+import math
+import os
+import sys
+from collections import Counter, defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.language_id import LanguageIdentifier, char_ngrams  # noqa: E402
+
+SCALES = (1, 2, 4, 6, 8, 12, 16, 24, 32)
+
+
+def read_rows(path):
+    with open(path, "r", encoding="utf-8") as file:
+        if path.endswith(".csv"):
+            records = list(csv.DictReader(file))
+        else:
+            records = [json.loads(line) for line in file if line.strip()]
+    rows = []
+    for record in records:
+        # Only user turns say anything about the user's language
+        if record.get("sender_type") not in (None, "", "user"):
+            continue
+        text = (record.get("message") or record.get("text") or "").strip()
+        if text:
+            rows.append({"text": text, "language": record.get("language") or record.get("user_language")})
+    return rows
+
+
+def label_with_llm(rows):
+    from core.llm_common import detect_language_llm
+
+    for row in rows:
+        if not row["language"]:
+            row["language"] = detect_language_llm(row["text"])
+    return rows
+
+
+def is_holdout(text, share):
+    digest = hashlib.sha1(text.encode("utf-8")).digest()
+    return digest[0] / 256 < share
+
+
+def train(rows, orders, alpha, max_features):
+    counts = defaultdict(Counter)
+    documents = Counter()
+    for row in rows:
+        counts[row["language"]].update(char_ngrams(row["text"], orders))
+        documents[row["language"]] += 1
+
+    vocabulary = set()
+    for grams in counts.values():
+        vocabulary.update(grams)
+
+    languages = sorted(counts)
+    model = {
+        "orders": list(orders),
+        "languages": languages,
+        "priors": {},
+        "unseen": {},
+        "log_probs": {},
+        "trained_on": sum(documents.values()),
+    }
+    for language in languages:
+        grams = counts[language]
+        denominator = sum(grams.values()) + alpha * len(vocabulary)
+        model["priors"][language] = round(math.log(documents[language] / model["trained_on"]), 4)
+        model["unseen"][language] = round(math.log(alpha / denominator), 3)
+        # Rare n-grams add size but almost nothing to accuracy; they fall back to the unseen floor
+        model["log_probs"][language] = {
+            gram: round(math.log((count + alpha) / denominator), 3)
+            for gram, count in grams.most_common(max_features)
+        }
+    return model
+
+
+def fold_of(text, folds):
+    return int.from_bytes(hashlib.sha1(text.encode("utf-8")).digest()[1:5], "big") % folds
+
+
+def out_of_fold(rows, folds, orders, alpha, max_features):
+    """Per fold: a model trained without the fold, and the fold's rows"""
+    splits = []
+    for fold in range(folds):
+        training = [row for row in rows if fold_of(row["text"], folds) != fold]
+        held_out = [row for row in rows if fold_of(row["text"], folds) == fold]
+        if training and held_out:
+            splits.append((train(training, orders, alpha, max_features), held_out))
+    return splits
+
+
+def log_loss(identifier, rows):
+    loss = 0.0
+    for row in rows:
+        scores = identifier.scores(row["text"])
+        if not scores or row["language"] not in scores:
+            continue
+        top = max(scores.values())
+        log_total = top + math.log(sum(math.exp(score - top) for score in scores.values()))
+        loss -= scores[row["language"]] - log_total
+    return loss
+
+
+def calibrate_scale(splits):
+    """The posterior scale with the lowest out-of-fold log loss"""
+    best_scale, best_loss = None, None
+    for scale in SCALES:
+        loss = 0.0
+        for model, held_out in splits:
+            loss += log_loss(LanguageIdentifier({**model, "scale": scale}), held_out)
+        if best_loss is None or loss < best_loss:
+            best_scale, best_loss = scale, loss
+    return best_scale
+
+
+def calibrate_thresholds(splits, scale, target_precision, min_served):
+    """Per language: the lowest confidence at which out-of-fold answers of that language reach the target precision"""
+    predictions = []
+    for model, held_out in splits:
+        identifier = LanguageIdentifier({**model, "scale": scale})
+        predictions.extend((*identifier.identify(row["text"]), row["language"]) for row in held_out)
+
+    thresholds, answered = {}, []
+    for language in sorted({label for _, _, label in predictions}):
+        own = [(confidence, predicted == label) for predicted, confidence, label in predictions if predicted == language]
+        for threshold in sorted({confidence for confidence, _ in own}):
+            confident = [correct for confidence, correct in own if confidence >= threshold]
+            if len(confident) < min_served:
+                break
+            if sum(confident) / len(confident) >= target_precision:
+                thresholds[language] = threshold
+                answered.extend(confident)
+                break
+    return thresholds, {
+        "precision": round(sum(answered) / len(answered), 3) if answered else None,
+        "coverage": round(len(answered) / len(predictions), 3) if predictions else 0.0,
+        "answered": len(answered),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--input", default="data/language_seed.jsonl")
+    parser.add_argument("--output", default="data/language_model.json")
+    parser.add_argument("--eval-output", default="data/language_eval.jsonl")
+    parser.add_argument("--labels-output", help="Write the (LLM-)labelled rows here")
+    parser.add_argument("--label-with-llm", action="store_true")
+    parser.add_argument("--holdout", type=float, default=0.2)
+    parser.add_argument("--orders", default="1,2,3")
+    parser.add_argument("--alpha", type=float, default=1.0)
+    parser.add_argument("--max-features", type=int, default=1500)
+    parser.add_argument("--folds", type=int, default=5, help="Cross-validation folds for the calibration")
+    parser.add_argument("--target-precision", type=float, default=0.95)
+    parser.add_argument("--min-served", type=int, default=10, help="Fewest answered rows a language's threshold is judged on")
+    args = parser.parse_args()
+
+    rows = read_rows(args.input)
+    if args.label_with_llm:
+        rows = label_with_llm(rows)
+    if args.labels_output:
+        with open(args.labels_output, "w", encoding="utf-8") as file:
+            for row in rows:
+                file.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+    rows = [row for row in rows if row["language"]]
+    held_out = [row for row in rows if is_holdout(row["text"], args.holdout)]
+    training = [row for row in rows if not is_holdout(row["text"], args.holdout)]
+
+    orders = tuple(int(order) for order in args.orders.split(","))
+    model = train(training, orders, args.alpha, args.max_features)
+    splits = out_of_fold(training, args.folds, orders, args.alpha, args.max_features)
+    model["scale"] = calibrate_scale(splits)
+    model["thresholds"], calibration = calibrate_thresholds(splits, model["scale"], args.target_precision, args.min_served)
+    model["calibration"] = {"folds": args.folds, "target_precision": args.target_precision, **calibration}
+
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(model, file, ensure_ascii=False, separators=(",", ":"))
+    with open(args.eval_output, "w", encoding="utf-8") as file:
+        for row in held_out:
+            file.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+    size_kb = os.path.getsize(args.output) / 1024
+    print(f"Trained on {len(training)} rows ({len(model['languages'])} languages), "
+          f"held out {len(held_out)}, scale {model['scale']}, model {size_kb:.0f} KB -> {args.output}")
+    if not model["thresholds"]:
+        print(f"No language reaches precision {args.target_precision} in cross-validation; every turn goes to the LLM")
+    else:
+        print(f"Thresholds {model['thresholds']}: cross-validated precision {model['calibration']['precision']}, "
+              f"coverage {model['calibration']['coverage']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,11 @@
+from typing import Optional
+
 from fastapi import APIRouter, Query
 
 from models.faq_model import FAQBase, FAQUpdate
 from core.chat_core import Chat
 from core.admin_core import Admin
+from core.llm_usage import llm_usage
 
 import random
 
@@ -179,6 +182,21 @@ def faqs(faq_id: int):
     return {"message": "Something went wrong", "data": None}
 
 
+# LLM USAGE ROUTEs ------------------------------------------
+@router.get("/llm-usage")
+def llm_usage_stats(group_by: str = Query("intent,company_id,prompt"), company_id: Optional[int] = Query(None)):
+  """
+  Latency percentiles (p50/p95/p99), tokens and cost of recent LLM calls.
+  group_by: comma-separated of intent, company_id, role, prompt, function, model.
+  """
+  try:
+    dimensions = [dimension.strip() for dimension in group_by.split(",") if dimension.strip()]
+    return {"message": "Success", "data": llm_usage.snapshot(dimensions, company_id)}
+  except Exception as e:
+    print(f"An error occurred: {e}")
+    return {"message": "Something went wrong", "data": None}
+
+
 #@router.post("/request/collateral")
 def request_collateral():
   return 1
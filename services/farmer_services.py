@@ -33,7 +33,7 @@ def chat_service(body: ChatRequest):
         intent_id = body.intent_id
         intent = {}
         if (intent_id == None or intent_id == 0):
-            intent = get_intent(prompt, "prompts/ask_farmer_intent", "classify_intent")  
+            intent = get_intent(prompt, "ask_farmer_intent", "classify_intent")  
             intent_id = intent["id"]
         
         # Early return for out of scope       
@@ -1,12 +1,21 @@
 
+import asyncio
 from typing import Optional
 from fastapi import APIRouter, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 
-from core.chat_core import Chat
+from config.config import get_combined_intent_language, get_speculation_mode
+from core.chat_core import AsyncChat
+from core.chat_stream import stream_chat
+from core.classifier.intent_model import predict_intent, record_intent
+from core.classifier.intent_rules import match_intent_rules
+from core.company_core import AsyncCompany
+from core.form_flow import resume_flow
+from core.llm_usage import label_usage, label_usage_from, start_usage_turn
 from core.farmer_core_v2 import FarmerV2
 from exceptions.global_exception import GlobalException
 from llm.farmer_llm_handler import handle_local_practice_log
-from llm.farmer_llm_handler_v2 import get_intent, handle_general_questions, handle_health_log, handle_performance_log
+from llm.farmer_llm_handler_v2 import get_intent_async, get_intent_language_async, handle_general_questions_async, speculate_general_question, handle_health_log_async, handle_performance_log_async
 from models.chat_model import ChatRequest
 from models.feed_calculator_model import CreateFeedCalculatorPayload, FeedCalculationResponse, FeedCalculatorDto, UpdateFeedCalculatorPayload
 from models.feed_programs_model import FeedProgramPayload
@@ -15,34 +24,72 @@ from models.feed_programs_model import FeedProgramPayload
 router = APIRouter()
 
 @router.post("/chat-ai")
-def chat_service(body: ChatRequest):
+async def chat_service(body: ChatRequest):
+    return await run_chat_turn(body)
+
+
+# Same turn as /chat-ai as Server-Sent Events: `delta` events stream the reply text, `done` carries the full payload
+@router.post("/chat-ai/stream")
+async def chat_stream_service(body: ChatRequest):
+    return stream_chat("farmer_v2_chat_stream", lambda: run_chat_turn(body))
+
+
+async def run_chat_turn(body: ChatRequest):
     try:
-        chat = Chat()
+        chat = AsyncChat()
 
         chat_id = body.chat_id
         user_id = body.user_id
         prompt = body.prompt
         
-        chat_id = chat.create_conversation(user_id)
+        chat_id = await chat.create_conversation(user_id)
         
         if chat_id == None:
             raise Exception("Failed to create conversation")
+
+        # Label this turn's LLM usage; the company lookup is shared with the handler's through the request scope
+        start_usage_turn(role="farmer", user_id=user_id)
+        company_lookup = asyncio.ensure_future(AsyncCompany().get_user_company(user_id))
+        label_usage_from(company_lookup, "company_id")
             
         intent_id = body.intent_id
         intent = {}
+        language = None
+        source = "client"
+        speculation = None
+        if (intent_id == None or intent_id == 0):
+            # Follow-ups of a half-filled log form ("50 heads", "kahapon") go back to its handler
+            intent_id, source = await resume_flow(chat, chat_id, prompt, "farmer"), "flow"
         if (intent_id == None or intent_id == 0):
-            intent = get_intent(prompt, "prompts/ask_farmer_intent", "classify_intent")  
+            # Greetings, thanks and plain reports are classified by rule, then confident cases by the local model
+            intent, source = match_intent_rules(prompt), "rule"
+            if intent is None:
+                intent, source = predict_intent("farmer", prompt), "model"
+            if intent is None and get_speculation_mode() != "off":
+                # General questions are the most common route; get a head start while the LLM classifies
+                speculation = speculate_general_question(chat_id, user_id, prompt, get_speculation_mode())
+            if intent is None and get_combined_intent_language():
+                # One call returns intent and language; handlers then skip detect_language
+                intent, source = await get_intent_language_async(prompt, "ask_farmer_intent"), "llm"
+                language = intent.pop("user_language", None)
+            elif intent is None:
+                intent, source = await get_intent_async(prompt, "ask_farmer_intent", "classify_intent"), "llm"
             intent_id = intent["id"]
+        record_intent("farmer", intent_id, source, intent.get("confidence"))
+        label_usage(intent=intent_id)
+        if speculation is not None and intent_id != 1:
+            speculation.discard()
         
         # Early return for out of scope       
         if (intent_id == 6): 
             return {"message": "Success", "data": intent}
       
         dispatch = {
-            1: lambda: handle_general_questions(chat_id, user_id, prompt),
-            2: lambda: handle_health_log(chat_id, user_id, prompt),
-            7: lambda: handle_performance_log(chat_id, user_id, prompt),
-            3: lambda: handle_local_practice_log(chat_id, user_id, prompt)
+            1: lambda: handle_general_questions_async(chat_id, user_id, prompt, language, speculation),
+            2: lambda: handle_health_log_async(chat_id, user_id, prompt, language),
+            7: lambda: handle_performance_log_async(chat_id, user_id, prompt, language),
+            # Legacy v1 handler (sync Farmer), kept off the event loop
+            3: lambda: run_in_threadpool(handle_local_practice_log, chat_id, user_id, prompt)
             # 5: lambda: handle_support_forms(intent),
             # 7: lambda: handle_general_log(chat_id, user_id, prompt)
         }
@@ -51,7 +98,7 @@ def chat_service(body: ChatRequest):
         if handler is None:
             raise Exception("Handler for intent not found")
 
-        return {"message": "Success", "data": handler()}
+        return {"message": "Success", "data": await handler()}
 
     except Exception as e:
         print(f"An error occurred: {e}")
@@ -1,62 +1,108 @@
+import asyncio
+
 from fastapi import APIRouter, Query
 
+from config.config import get_combined_intent_language, get_speculation_mode
 from models.chat_model import ChatRequest
-from core.chat_core import Chat
+from core.chat_core import AsyncChat
+from core.chat_stream import stream_chat
+from core.classifier.intent_model import predict_intent, record_intent
+from core.company_core import AsyncCompany
+from core.form_flow import resume_flow
+from core.llm_usage import label_usage, label_usage_from, start_usage_turn
 from core.salesrep_core import SalesRep
 from llm.salesrep_llm_handler import (
-  get_intent,
-  handle_general_questions,
-  handle_field_product_log,
-  handle_dealer_log,
+  get_intent_async,
+  get_intent_language_async,
+  handle_general_questions_async,
+  handle_field_product_log_async,
+  handle_dealer_log_async,
   handle_requested_file,
   handle_support_forms,
-  handle_sales_log,
-  handle_farm_log,
+  handle_sales_log_async,
+  handle_farm_log_async,
+  speculate_general_question,
 )
 
 
 router = APIRouter()
 
 @router.post("/chat")
-def chat_service(body: ChatRequest):
+async def chat_service(body: ChatRequest):
+  return await run_chat_turn(body)
+
+# Same turn as /chat as Server-Sent Events: `delta` events stream the reply text, `done` carries the full payload
+@router.post("/chat/stream")
+async def chat_stream_service(body: ChatRequest):
+  return stream_chat("salesrep_chat_stream", lambda: run_chat_turn(body))
+
+async def run_chat_turn(body: ChatRequest):
   try:
-    chat = Chat()
+    chat = AsyncChat()
 
     chat_id = body.chat_id
     user_id = body.user_id
     prompt = body.prompt
     
-    chat_id = chat.create_conversation(user_id)
+    chat_id = await chat.create_conversation(user_id)
         
     if chat_id == None:
       raise Exception("Failed to create conversation")
+
+    # Label this turn's LLM usage; the company lookup is shared with the handler's through the request scope
+    start_usage_turn(role="salesrep", user_id=user_id)
+    company_lookup = asyncio.ensure_future(AsyncCompany().get_user_company(user_id))
+    label_usage_from(company_lookup, "company_id")
         
     intent_id = body.intent_id
     intent = {}
+    language = None
+    source = "client"
+    speculation = None
+    if (intent_id == None or intent_id == 0):
+      # Follow-ups of a half-filled report go back to its handler
+      intent_id, source = await resume_flow(chat, chat_id, prompt, "salesrep"), "flow"
     if (intent_id == None or intent_id == 0):
-      intent = get_intent(prompt, "prompts/ask_salesrep_intent", "classify_intent")    
+      # Confident cases are classified by the local model, without the LLM
+      intent, source = predict_intent("salesrep", prompt), "model"
+      if intent is None and get_speculation_mode() != "off":
+        # General questions are the most common route; get a head start while the LLM classifies
+        speculation = speculate_general_question(chat_id, prompt, get_speculation_mode())
+      if intent is None and get_combined_intent_language():
+        # One call returns intent and language; handlers then skip detect_language
+        intent, source = await get_intent_language_async(prompt, "ask_salesrep_intent"), "llm"
+        language = intent.pop("user_language", None)
+      elif intent is None:
+        intent, source = await get_intent_async(prompt, "ask_salesrep_intent", "classify_intent"), "llm"
       intent_id = intent["id"]
+    record_intent("salesrep", intent_id, source, intent.get("confidence"))
+    label_usage(intent=intent_id)
+    if speculation is not None and intent_id != 1:
+      speculation.discard()
   
     # Early return for out of scope       
     if (intent_id == 6):        
       return {"message": "Success", "data": intent}
 
     dispatch = {
-      1: lambda: handle_general_questions(chat_id, prompt),
-      2: lambda: handle_dealer_log(chat_id, user_id, prompt),
-      3: lambda: handle_field_product_log(chat_id, user_id, prompt),
-      4: lambda: handle_requested_file(intent),
-      5: lambda: handle_support_forms(intent),
-      7: lambda: handle_sales_log(chat_id, user_id, prompt),
-      8: lambda: handle_farm_log(chat_id, user_id, prompt),
-      
+      1: lambda: handle_general_questions_async(chat_id, prompt, language, speculation),
+      2: lambda: handle_dealer_log_async(chat_id, user_id, prompt, language),
+      3: lambda: handle_field_product_log_async(chat_id, user_id, prompt, language),
+      7: lambda: handle_sales_log_async(chat_id, user_id, prompt, language),
+      8: lambda: handle_farm_log_async(chat_id, user_id, prompt, language),
     }
 
+    # Canned file/support responses need no I/O
+    if intent_id == 4:
+      return {"message": "Success", "data": handle_requested_file(intent)}
+    if intent_id == 5:
+      return {"message": "Success", "data": handle_support_forms(intent)}
+
     handler = dispatch.get(intent_id)
     if handler is None:
       raise Exception("Handler for intent not found")
 
-    return {"message": "Success", "data": handler()}    
+    return {"message": "Success", "data": await handler()}    
   except Exception as e:
     print(f"An error occurred: {e}")
     return {"message": "Something went wrong", "data": None, "error": f"{e}"}
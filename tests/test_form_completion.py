@@ -0,0 +1,67 @@
+from datetime import date
+
+import pytest
+
+from core.form_completion import local_completion
+from core.form_extract import extract_fields
+from core.form_flow import FLOW_KEY, PENDING_KEY
+from core.prompt_registry import get_prompt
+
+TODAY = date(2026, 10, 14)
+
+
+@pytest.fixture
+def functions():
+    return get_prompt("ask_farmer_log").functions
+
+
+def complete(prompt, functions, form_data, language="English"):
+    extracted = extract_fields("report_details", prompt, TODAY)
+    return local_completion(prompt, functions, "report_details", form_data, extracted, language)
+
+
+def test_yes_to_a_form_complete_before_this_turn_is_logged_locally(functions):
+    form_data = {FLOW_KEY: 7, "notes": "Weekly check", "mortality_count": "2", "average_weight_kg": "1.4"}
+
+    parsed = complete("oo po", functions, form_data, language="Tagalog")
+
+    assert parsed["next_action"] == "log_complete"
+    assert parsed["completed_locally"]
+    assert parsed["report_details"] == {"notes": "Weekly check", "mortality_count": "2", "average_weight_kg": "1.4"}
+    assert "Mortality count: 2" in parsed["response"]
+    assert parsed["response"].startswith("Salamat po!")
+
+
+@pytest.mark.parametrize("prompt", ["actually 3 died", "is that all you need?"])
+def test_other_replies_to_a_complete_form_go_to_the_llm(functions, prompt):
+    form_data = {"notes": "Weekly check", "mortality_count": "2", "average_weight_kg": "1.4"}
+
+    assert complete(prompt, functions, form_data) is None
+    # Values already in the form are never overwritten
+    assert form_data["mortality_count"] == "2"
+
+
+def test_yes_to_an_incomplete_form_goes_to_the_llm(functions):
+    assert complete("yes", functions, {"notes": "Weekly check", "mortality_count": "2"}) is None
+
+
+def test_values_read_by_pattern_are_read_back_before_they_are_logged(functions):
+    form_data = {"notes": "Weekly check", "mortality_count": "2"}
+
+    read_back = complete("1.4 kg", functions, form_data)
+    assert read_back["next_action"] == "ask_next"
+    assert form_data[PENDING_KEY] == ["average_weight_kg"]
+    assert "Average weight kg: 1.4" in read_back["response"]
+
+    parsed = complete("yes", functions, form_data)
+    assert parsed["next_action"] == "log_complete"
+    assert parsed["report_details"]["average_weight_kg"] == "1.4"
+    assert parsed["report_details"]["notes"] == "Weekly check Average weight kg: 1.4"
+
+
+def test_rejected_read_back_drops_the_pending_values(functions):
+    form_data = {"notes": "Weekly check", "mortality_count": "2"}
+    complete("1.4 kg", functions, form_data)
+
+    assert complete("no, it was 1.6", functions, form_data) is None
+    assert form_data == {"notes": "Weekly check", "mortality_count": "2"}
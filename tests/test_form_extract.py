@@ -0,0 +1,42 @@
+from datetime import date
+
+import pytest
+
+from core.form_extract import extract_fields, extract_report_details
+
+TODAY = date(2026, 10, 14)
+
+
+@pytest.mark.parametrize("text, expected", [
+    # A weight next to a body-weight word is the average weight, grams converted to kg
+    ("average weight 1.2 kg", {"average_weight_kg": "1.2"}),
+    ("ABW 850 g", {"average_weight_kg": "0.85"}),
+    ("bigat ay 1,5 kg", {"average_weight_kg": "1.5"}),
+    # Next to a feed word it is feed intake
+    ("feed intake 25 kg today", {"feed_intake_kg": "25"}),
+    ("pakain 25 kg a day", {"feed_intake_kg": "25"}),
+    # With both words, each weight goes to the keyword nearest before it
+    ("timbang 1.5 kilos at pakain 40 kg", {"average_weight_kg": "1.5", "feed_intake_kg": "40"}),
+    ("feed intake 40 kg, average weight 1.8 kg", {"feed_intake_kg": "40", "average_weight_kg": "1.8"}),
+    # A bare weight is a body weight only when it is bird sized
+    ("1.2 kg", {"average_weight_kg": "1.2"}),
+    ("45 kg", {}),
+])
+def test_weight_goes_to_the_field_its_keyword_names(text, expected):
+    assert extract_report_details(text, TODAY) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("used 2 bags of 50kg", {"bags_used": "2"}),
+    ("4 bags, 50kg sacks", {"bags_used": "4"}),
+    ("naubos 3 sako, 50kg bawat sako", {"bags_used": "3"}),
+    ("naubos na patuka 2 bags na 50 kg, timbang 0.9 kg", {"bags_used": "2", "average_weight_kg": "0.9"}),
+])
+def test_bag_sizes_are_not_read_as_weights(text, expected):
+    assert extract_report_details(text, TODAY) == expected
+
+
+def test_weights_are_only_read_for_the_report_form():
+    assert "average_weight_kg" not in extract_fields("incident_details", "5 birds died, timbang 1.1 kg", TODAY)
+    assert extract_fields("report_details", "may 5 na patay, timbang 1.1kg", TODAY) == {
+        "mortality_count": "5", "average_weight_kg": "1.1"}
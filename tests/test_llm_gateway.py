@@ -0,0 +1,205 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from config.config import get_llm_gateway_settings
+from core.llm_cache import LLMResponseCache
+from llm import llm_gateway as gateway_module
+from llm.llm_gateway import LLMGateway
+from llm.llm_providers import LLMProvider, ProviderUnavailable
+
+FUNCTIONS = {"name": "feed_advisory", "parameters": {"type": "object", "properties": {}}}
+MESSAGES = [{"role": "user", "content": "How often should I feed piglets?"}]
+CANNED = {"response": "Please try again in a moment.", "log_type": "other", "fallback": True}
+
+
+class ScriptedProvider(LLMProvider):
+    """Plays back one outcome per call: a result dict, an exception to raise, or (seconds, outcome) to wait first"""
+
+    def __init__(self, name, outcomes):
+        super().__init__()
+        self.name = name
+        self.model = f"{name}-model"
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def _next(self):
+        self.calls += 1
+        outcome = self.outcomes.pop(0) if len(self.outcomes) > 1 else self.outcomes[0]
+        return outcome if isinstance(outcome, tuple) else (0, outcome)
+
+    @staticmethod
+    def _result(outcome):
+        if isinstance(outcome, Exception):
+            raise outcome
+        return dict(outcome)
+
+    def call(self, messages, functions, function_name, timeout):
+        delay, outcome = self._next()
+        time.sleep(delay)
+        return self._result(outcome)
+
+    async def call_async(self, messages, functions, function_name, timeout):
+        delay, outcome = self._next()
+        await asyncio.sleep(delay)
+        return self._result(outcome)
+
+
+@pytest.fixture
+def make_gateway(tmp_path):
+    fallbacks_path = tmp_path / "llm_fallbacks.json"
+    fallbacks_path.write_text(json.dumps({"feed_advisory": CANNED}))
+
+    def make(primary, secondary=None, **overrides):
+        settings = {
+            **get_llm_gateway_settings(),
+            "deadline_seconds": 5.0,
+            "deadlines": {},
+            "max_retries": 2,
+            "retries": {},
+            "retry_base_seconds": 0.001,
+            "retry_max_seconds": 0.002,
+            "hedge_functions": [],
+            "breaker_failures": 2,
+            "breaker_reset_seconds": 0.05,
+            "fallback_provider": "",
+            "fallbacks_path": str(fallbacks_path),
+            "primary_budget_seconds": 0.1,
+            "primary_budgets": {},
+            **overrides,
+        }
+        gateway = LLMGateway(settings)
+        gateway.primary = primary
+        gateway.secondary = secondary
+        return gateway
+
+    return make
+
+
+def test_retryable_errors_are_retried_until_an_answer(make_gateway):
+    primary = ScriptedProvider("primary", [ProviderUnavailable("busy"), ProviderUnavailable("busy"), {"response": "ok"}])
+    gateway = make_gateway(primary)
+
+    assert gateway.call(MESSAGES, FUNCTIONS, "feed_advisory", cache=False) == {"response": "ok"}
+    state = gateway.state("feed_advisory")
+    assert primary.calls == 3
+    assert state.counters["retries"] == 2
+    assert state.breaker.state == "closed"
+
+
+def test_exhausted_retries_return_the_canned_reply_and_count_a_failure(make_gateway):
+    primary = ScriptedProvider("primary", [ProviderUnavailable("down")])
+    gateway = make_gateway(primary)
+
+    assert gateway.call(MESSAGES, FUNCTIONS, "feed_advisory", cache=False) == CANNED
+    state = gateway.state("feed_advisory")
+    assert primary.calls == 3
+    assert state.counters["failures"] == 1
+    assert state.counters["fallbacks"] == 1
+    assert state.breaker.consecutive_failures == 1
+
+
+def test_breaker_opens_rejects_and_closes_after_a_successful_trial(make_gateway):
+    primary = ScriptedProvider("primary", [ProviderUnavailable("down")])
+    gateway = make_gateway(primary, max_retries=0)
+    state = gateway.state("feed_advisory")
+
+    gateway.call(MESSAGES, FUNCTIONS, "feed_advisory", cache=False)
+    gateway.call(MESSAGES, FUNCTIONS, "feed_advisory", cache=False)
+    assert state.breaker.state == "open"
+
+    calls = primary.calls
+    assert gateway.call(MESSAGES, FUNCTIONS, "feed_advisory", cache=False) == CANNED
+    assert primary.calls == calls
+    assert state.counters["rejected"] == 1
+
+    time.sleep(0.06)
+    primary.outcomes = [{"response": "back"}]
+    assert gateway.call(MESSAGES, FUNCTIONS, "feed_advisory", cache=False) == {"response": "back"}
+    assert state.breaker.state == "closed"
+    assert state.breaker.consecutive_failures == 0
+
+
+def test_failed_trial_reopens_the_breaker(make_gateway):
+    primary = ScriptedProvider("primary", [ProviderUnavailable("down")])
+    gateway = make_gateway(primary, max_retries=0, breaker_failures=1)
+    state = gateway.state("feed_advisory")
+
+    gateway.call(MESSAGES, FUNCTIONS, "feed_advisory", cache=False)
+    time.sleep(0.06)
+    assert gateway.call(MESSAGES, FUNCTIONS, "feed_advisory", cache=False) == CANNED
+    assert state.breaker.state == "open"
+    assert not state.breaker.allow()
+
+
+def test_non_retryable_error_is_raised_and_leaves_the_breaker_alone(make_gateway):
+    primary = ScriptedProvider("primary", [ProviderUnavailable("down")])
+    gateway = make_gateway(primary, max_retries=0, breaker_failures=1)
+    state = gateway.state("feed_advisory")
+    gateway.call(MESSAGES, FUNCTIONS, "feed_advisory", cache=False)
+    time.sleep(0.06)
+
+    primary.outcomes = [ValueError("bad arguments")]
+    with pytest.raises(ValueError):
+        gateway.call(MESSAGES, FUNCTIONS, "feed_advisory", cache=False)
+    # Not closed by an error that says nothing about the provider, and the trial slot is free again
+    assert state.breaker.state == "half_open"
+    assert state.breaker.allow()
+    assert primary.calls == 2
+
+
+def test_slow_request_is_hedged_and_the_duplicate_wins(make_gateway):
+    primary = ScriptedProvider("primary", [(1.0, {"response": "slow"}), {"response": "fast"}])
+    gateway = make_gateway(primary, hedge_functions=["feed_advisory"], hedge_min_samples=5)
+    state = gateway.state("feed_advisory")
+    for _ in range(5):
+        state.latency.add(20)
+
+    start = time.perf_counter()
+    result = asyncio.run(gateway.call_async(MESSAGES, FUNCTIONS, "feed_advisory", cache=False))
+
+    assert result == {"response": "fast"}
+    assert time.perf_counter() - start < 0.5
+    assert state.counters["hedges"] == 1
+    assert state.counters["hedge_wins"] == 1
+
+
+def test_hedged_request_that_fails_everywhere_falls_back(make_gateway):
+    primary = ScriptedProvider("primary", [(0.2, ProviderUnavailable("first")), ProviderUnavailable("hedge")])
+    gateway = make_gateway(primary, max_retries=0, hedge_functions=["feed_advisory"], hedge_min_samples=5)
+    state = gateway.state("feed_advisory")
+    for _ in range(5):
+        state.latency.add(20)
+
+    assert asyncio.run(gateway.call_async(MESSAGES, FUNCTIONS, "feed_advisory", cache=False)) == CANNED
+    assert state.counters["hedges"] == 1
+    assert state.counters["hedge_wins"] == 0
+    assert state.breaker.consecutive_failures == 1
+
+
+def test_hedge_is_not_sent_without_enough_latency_samples(make_gateway):
+    primary = ScriptedProvider("primary", [(0.05, {"response": "only"})])
+    gateway = make_gateway(primary, hedge_functions=["feed_advisory"], hedge_min_samples=5)
+
+    assert asyncio.run(gateway.call_async(MESSAGES, FUNCTIONS, "feed_advisory", cache=False)) == {"response": "only"}
+    assert primary.calls == 1
+    assert gateway.state("feed_advisory").counters["hedges"] == 0
+
+
+def test_failover_answers_are_not_cached_under_the_primary_model(make_gateway, monkeypatch):
+    monkeypatch.setattr(gateway_module, "llm_cache", LLMResponseCache(ttls={"feed_advisory": 60}))
+    monkeypatch.setattr(gateway_module, "cache_enabled", lambda function_name, cache=True: cache)
+    primary = ScriptedProvider("primary", [ProviderUnavailable("down")])
+    secondary = ScriptedProvider("secondary", [{"response": "from the fallback"}])
+    gateway = make_gateway(primary, secondary, max_retries=0)
+
+    assert asyncio.run(gateway.call_async(MESSAGES, FUNCTIONS, "feed_advisory")) == {"response": "from the fallback"}
+    assert gateway.state("feed_advisory").counters["failover_wins"] == 1
+
+    primary.outcomes = [{"response": "from the primary"}]
+    assert asyncio.run(gateway.call_async(MESSAGES, FUNCTIONS, "feed_advisory")) == {"response": "from the primary"}
+    assert asyncio.run(gateway.call_async(MESSAGES, FUNCTIONS, "feed_advisory")) == {"response": "from the primary"}
+    assert primary.calls == 2
+    assert secondary.calls == 1
@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+from core.partial_json import StringFieldStream
+
+
+def stream_in_pieces(arguments, size, field="response"):
+    stream = StringFieldStream(field)
+    pieces = [stream.feed(arguments[i:i + size]) for i in range(0, len(arguments), size)]
+    return stream, pieces
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 7, 64])
+@pytest.mark.parametrize("value", [
+    'Feed "twice" a day\nthen check the drinkers',
+    "C:\\feeds\\starter \\\\ grower",
+    "Café · 50 kg · ₱1,200",
+    "Healthy flock \U0001F414\U0001F437 and \U0001F9EA tested",
+])
+def test_split_escapes_decode_to_the_full_value(value, size):
+    arguments = json.dumps({"log_type": "feeding", "response": value, "next_action": "none"})
+    stream, pieces = stream_in_pieces(arguments, size)
+
+    assert "".join(pieces) == value
+    assert stream.done
+    for piece in pieces:
+        # A surrogate pair split across fragments must never reach the client as a lone half
+        piece.encode("utf-8")
+
+
+def test_text_is_forwarded_before_the_object_is_complete():
+    stream = StringFieldStream("response")
+
+    assert stream.feed('{"response": "Feed tw') == "Feed tw"
+    assert stream.feed('ice a day\\') == "ice a day"
+    assert stream.feed('n", "log_type"') == "\n"
+    assert stream.done
+    assert stream.feed(': "feeding"}') == ""
+
+
+def test_high_surrogate_is_held_until_its_low_half_arrives():
+    stream = StringFieldStream("response")
+
+    assert stream.feed('{"response": "ok \\ud83d') == "ok "
+    assert stream.feed("\\udc1") == ""
+    assert stream.feed('4 done"}') == "\U0001F414 done"
+
+
+def test_same_key_in_nested_objects_and_other_values_is_ignored():
+    arguments = json.dumps({
+        "details": {"response": "nested"},
+        "note": 'says "response": "fake"',
+        "response": "top level",
+    })
+    _, pieces = stream_in_pieces(arguments, 4)
+
+    assert "".join(pieces) == "top level"
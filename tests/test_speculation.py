@@ -0,0 +1,96 @@
+import asyncio
+
+from core.chat_stream import response_stream
+from core.speculation import Speculation, speculation_stats
+
+
+def outcomes(name):
+    return speculation_stats.snapshot()[name]
+
+
+def test_claim_forwards_the_held_back_stream_in_order():
+    async def prepare():
+        queue = response_stream.get()
+        for piece in ("Feed ", "twice ", "a day."):
+            queue.put_nowait(piece)
+            await asyncio.sleep(0.01)
+        return {"history": [], "language": "English"}
+
+    async def turn():
+        queue = asyncio.Queue()
+        response_stream.set(queue)
+        speculation = Speculation("test_claim", prepare)
+        await asyncio.sleep(0.015)
+        # Nothing reaches the client before the speculation is claimed
+        assert queue.empty()
+        result = await speculation.claim()
+        return speculation, result, [queue.get_nowait() for _ in range(queue.qsize())]
+
+    speculation, result, streamed = asyncio.run(turn())
+
+    assert result == {"history": [], "language": "English"}
+    assert streamed == ["Feed ", "twice ", "a day."]
+    assert speculation.outcome == "hit"
+    assert outcomes("test_claim")["hit"] == 1
+
+
+def test_discard_cancels_work_in_flight_and_counts_it():
+    cancelled = []
+
+    async def prepare():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def turn():
+        speculation = Speculation("test_discard", prepare)
+        await asyncio.sleep(0.01)
+        speculation.discard()
+        # A second discard does not count it again
+        speculation.discard()
+        await asyncio.sleep(0)
+        return speculation
+
+    speculation = asyncio.run(turn())
+
+    assert speculation.outcome == "miss"
+    assert cancelled == [True]
+    stats = outcomes("test_discard")
+    assert stats["miss"] == 1
+    assert stats["wasted"]["cancelled_in_flight"] == 1
+
+
+def test_failed_speculation_is_claimed_as_none():
+    async def prepare():
+        raise RuntimeError("history read failed")
+
+    async def turn():
+        speculation = Speculation("test_failed", prepare)
+        return speculation, await speculation.claim()
+
+    speculation, result = asyncio.run(turn())
+
+    assert result is None
+    assert speculation.outcome == "failed"
+    assert outcomes("test_failed")["failed"] == 1
+
+
+def test_unclaimed_speculation_is_abandoned_when_the_turn_ends():
+    async def prepare():
+        await asyncio.sleep(5)
+
+    async def turn():
+        return Speculation("test_abandoned", prepare)
+
+    async def main():
+        speculation = await asyncio.create_task(turn())
+        await asyncio.sleep(0)
+        return speculation
+
+    speculation = asyncio.run(main())
+
+    assert speculation.outcome == "abandoned"
+    assert speculation.task.cancelled()
+    assert outcomes("test_abandoned")["abandoned"] == 1
@@ -0,0 +1,83 @@
+import asyncio
+import time
+
+import pytest
+
+from core.step_executor import StepExecutor
+
+
+def sleeping(seconds, value):
+    async def step(*_):
+        await asyncio.sleep(seconds)
+        return value
+    return step
+
+
+def test_independent_steps_run_concurrently():
+    executor = StepExecutor("test")
+    executor.add("company", sleeping(0.1, 1))
+    executor.add("history", sleeping(0.1, 2))
+    executor.add("language", sleeping(0.1, 3))
+
+    start = time.perf_counter()
+    results = asyncio.run(executor.run())
+
+    assert results == {"company": 1, "history": 2, "language": 3}
+    assert time.perf_counter() - start < 0.25
+    assert set(executor.timings) == {"company", "history", "language"}
+
+
+def test_dependent_step_receives_results_in_declared_order():
+    seen = []
+
+    async def context(history, company):
+        seen.append((history, company))
+        return "context"
+
+    executor = StepExecutor("test")
+    executor.add("company", sleeping(0.05, "company"))
+    executor.add("history", sleeping(0.01, "history"))
+    executor.add("context", context, depends_on=["history", "company"])
+    results = asyncio.run(executor.run())
+
+    assert seen == [("history", "company")]
+    assert results["context"] == "context"
+    assert executor.timings["context"]["start_ms"] >= executor.timings["company"]["duration_ms"]
+
+
+def test_failure_propagates_and_cancels_remaining_steps():
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append("slow")
+            raise
+
+    async def broken():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("company lookup failed")
+
+    async def never(_):
+        raise AssertionError("a step depending on a failed step must not run")
+
+    executor = StepExecutor("test")
+    executor.add("slow", slow)
+    executor.add("company", broken)
+    executor.add("dependent", never, depends_on=["company"])
+
+    start = time.perf_counter()
+    with pytest.raises(RuntimeError, match="company lookup failed"):
+        asyncio.run(executor.run())
+
+    assert executor.failed_step == "company"
+    assert cancelled == ["slow"]
+    assert time.perf_counter() - start < 1
+    assert executor.total_ms is not None
+
+
+def test_unknown_dependency_is_rejected():
+    executor = StepExecutor("test")
+    with pytest.raises(ValueError, match="unknown step 'history'"):
+        executor.add("context", sleeping(0, None), depends_on=["history"])